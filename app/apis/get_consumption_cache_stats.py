@@ -0,0 +1,36 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import Optional
+
+from app.utils.cache import get_cache_stats
+
+# Cache Stats API - hit/miss counters of the Redis response cache, per consumption API
+class CacheStatsQuery(BaseModel):
+    api_name: Optional[str] = None
+
+class CacheStatsResponse(BaseModel):
+    api_name: str
+    hits: int
+    misses: int
+    errors: int
+    not_modified: int = 0
+    hit_ratio: float
+
+def get_cache_stats_query(client, params: CacheStatsQuery):
+    """Query function for response cache metrics (reads Redis, not ClickHouse)."""
+    rows = []
+    for api_name, counters in sorted(get_cache_stats().items()):
+        if params.api_name and api_name != params.api_name:
+            continue
+        lookups = counters["hits"] + counters["misses"]
+        rows.append({
+            "api_name": api_name,
+            **counters,
+            "hit_ratio": counters["hits"] / lookups if lookups else 0.0,
+        })
+    return rows
+
+get_consumption_cache_stats = ConsumptionApi[CacheStatsQuery, CacheStatsResponse](
+    name="getConsumptionCacheStats",
+    query_function=get_cache_stats_query
+)
@@ -0,0 +1,51 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+from app.utils.query_stats import get_query_stats, query_log_stats
+
+# Query Stats API - per-API latency histograms (this worker) plus rows/bytes read from system.query_log
+class QueryStatsQuery(BaseModel):
+    api_name: Optional[str] = None
+    minutes_back: Optional[int] = 60
+
+class QueryStatsResponse(BaseModel):
+    api_name: str
+    queries: int = 0
+    errors: int = 0
+    too_expensive: int = 0
+    slow_queries: int = 0
+    result_rows: int = 0
+    avg_ms: float = 0.0
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    max_ms: float = 0.0
+    latency_histogram: Dict[str, int] = {}
+    logged_queries: int = 0
+    rows_read: int = 0
+    bytes_read: int = 0
+    server_p95_ms: Optional[float] = None
+
+def get_query_stats_query(client, params: QueryStatsQuery):
+    """Query function merging in-process query timings with system.query_log read stats."""
+    local_stats = get_query_stats()
+    server_stats = query_log_stats(client, int(params.minutes_back or 60))
+    rows = []
+    for api_name in sorted(set(local_stats) | set(server_stats)):
+        if params.api_name and api_name != params.api_name:
+            continue
+        server = server_stats.get(api_name, {})
+        rows.append({
+            "api_name": api_name,
+            **local_stats.get(api_name, {}),
+            "logged_queries": int(server.get("logged_queries", 0)),
+            "rows_read": int(server.get("rows_read", 0)),
+            "bytes_read": int(server.get("bytes_read", 0)),
+            "server_p95_ms": server.get("server_p95_ms"),
+        })
+    return rows
+
+get_consumption_query_stats = ConsumptionApi[QueryStatsQuery, QueryStatsResponse](
+    name="getConsumptionQueryStats",
+    query_function=get_query_stats_query
+)
@@ -0,0 +1,27 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import Optional
+
+from app.utils.single_flight import get_single_flight_stats
+
+# Single-flight Stats API - per-key request coalescing counters (this worker)
+class SingleFlightStatsQuery(BaseModel):
+    api_name: Optional[str] = None
+    limit: Optional[int] = 100
+
+class SingleFlightStatsResponse(BaseModel):
+    api_name: str
+    params: str
+    executions: int
+    coalesced: int
+    max_followers: int
+    last_seen: float
+
+def get_single_flight_stats_query(client, params: SingleFlightStatsQuery):
+    """Query function for single-flight metrics, most coalesced keys first (no ClickHouse access)."""
+    return get_single_flight_stats(params.api_name)[: int(params.limit or 100)]
+
+get_consumption_single_flight_stats = ConsumptionApi[SingleFlightStatsQuery, SingleFlightStatsResponse](
+    name="getConsumptionSingleFlightStats",
+    query_function=get_single_flight_stats_query
+)
@@ -3,6 +3,13 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
+from app.utils.cache import cached_query
+from app.utils.guardrails import INTERACTIVE_LIMITS
+from app.utils.pagination import keyset_predicate, paginate
+from app.utils.projection import select_columns
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+
 # Define the response model for a Shopify customer
 class ShopifyCustomer(BaseModel):
     id: str
@@ -20,42 +27,58 @@ class ShopifyCustomer(BaseModel):
     province: Optional[str] = None
     country: Optional[str] = None
     zip: Optional[str] = None
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
 
 # Define the query parameters model
 class CustomersByEmailQuery(BaseModel):
     email: Optional[str] = None
     limit: Optional[int] = 10
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    fields: Optional[str] = None  # comma-separated subset of ShopifyCustomer fields
 
 # Query handler to get customers by email; returns rows validated against ShopifyCustomer
+@cached_query("getCustomersByEmail", tables=["shopify_customers"], ttl=10)
+@single_flight("getCustomersByEmail")
+@instrumented("getCustomersByEmail", limits=INTERACTIVE_LIMITS)
 def get_customers_by_email(client, params: CustomersByEmailQuery):
     """
     Lookup Shopify customers by email address or return all customers with pagination
     
     Args:
         client: Database client for executing queries
-        params: Contains email (optional) and limit parameters
+        params: Contains email (optional), limit, cursor and fields parameters
         
     Returns:
-        CustomersByEmailResponse containing a list of matching customers
+        A page of matching customers; the last row carries next_cursor when more exist
     """
-    # Set default limit (cap at 100)
+    # Set default page size (cap at 100); use cursor to page further
     limit = int(min(params.limit or 10, 100))
 
     # Build LIKE pattern; if no email provided, '%%' returns all
     email_pattern = f"%{params.email or ''}%"
+    args = {"email": email_pattern}
+    where_sql_parts = ["email LIKE {email}"]
+
+    # Resume after the last id of the previous page
+    cursor_sql = keyset_predicate(params.cursor, ["id"], args)
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+
+    # Select only the requested columns (id is always needed for paging)
+    columns = select_columns(ShopifyCustomer, params.fields, required=["id"])
 
     # Execute parameterized query; Moose validates rows against ShopifyCustomer
-    return client.query.execute(
+    rows = client.query.execute(
         (
-            "SELECT id, email, first_name, last_name, phone, created_at, updated_at, "
-            "verified_email, state, address1, address2, city, province, country, zip "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_customers "
-            "WHERE email LIKE {email} "
+            f"WHERE {' AND '.join(where_sql_parts)} "
             "ORDER BY id "
             "LIMIT {limit}"
         ),
-        {"email": email_pattern, "limit": limit},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, ["id"])
 
 # Create the consumption API
 get_customers_by_email_api = ConsumptionApi[CustomersByEmailQuery, ShopifyCustomer](
@@ -0,0 +1,95 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+from app.utils.cache import cached_query
+from app.utils.guardrails import ANALYTICAL_LIMITS
+from app.utils.pagination import keyset_predicate, paginate
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+
+# Customer Lifetime Value API - reads the shopify_customer_ltv rollup view
+class CustomerLTVQuery(BaseModel):
+    customer_id: Optional[str] = None
+    min_orders: Optional[int] = None
+    min_total_spent: Optional[float] = None
+    order_by: Optional[str] = "total_spent"  # total_spent, order_count, last_order_at
+    limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+
+class CustomerLTVResponse(BaseModel):
+    customer_id: str
+    order_count: int
+    total_spent: float
+    average_order_value: float
+    first_order_at: Optional[datetime] = None
+    last_order_at: Optional[datetime] = None
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
+
+@cached_query("getShopifyCustomerLTV", tables=["shopify_orders"], ttl=60)
+@single_flight("getShopifyCustomerLTV")
+@instrumented("getShopifyCustomerLTV", limits=ANALYTICAL_LIMITS)
+def get_customer_ltv_query(client, params: CustomerLTVQuery):
+    """Query function for top-N customers by lifetime value, with order-count and spend thresholds."""
+    where_sql_parts = []
+    having_sql_parts = []
+    args = {"limit": params.limit or 100}
+
+    if params.customer_id:
+        where_sql_parts.append("customer_id = {customer_id}")
+        args["customer_id"] = params.customer_id
+    if params.min_orders is not None:
+        having_sql_parts.append("order_count >= {min_orders}")
+        args["min_orders"] = int(params.min_orders)
+    if params.min_total_spent is not None:
+        having_sql_parts.append("total_spent >= {min_total_spent}")
+        args["min_total_spent"] = float(params.min_total_spent)
+
+    # Only allow ordering by known aggregate columns
+    order_by = params.order_by if params.order_by in ("total_spent", "order_count", "last_order_at") else "total_spent"
+
+    # Keyset on (metric, customer_id); the cursor is only valid for the same order_by
+    cursor_key = [order_by, "customer_id"]
+    cursor_sql = keyset_predicate(
+        params.cursor, cursor_key, args, descending=True,
+        datetime_columns=("last_order_at",),
+    )
+    if cursor_sql:
+        having_sql_parts.append(cursor_sql)
+
+    where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    having_clause = f"HAVING {' AND '.join(having_sql_parts)}" if having_sql_parts else ""
+    limit = int(args["limit"])
+
+    rows = client.query.execute(
+        (
+            "SELECT customer_id, "
+            "count() as order_count, "
+            "sum(order_total) as total_spent, "
+            "total_spent / order_count as average_order_value, "
+            "min(placed_at) as first_order_at, "
+            "max(placed_at) as last_order_at "
+            "FROM ("
+            "SELECT customer_id, id, "
+            "argMaxMerge(total_price) AS order_total, "
+            "argMaxMerge(test) AS is_test, "
+            "minMerge(created_at) AS placed_at "
+            "FROM shopify_customer_ltv "
+            f"{where_clause} "
+            "GROUP BY customer_id, id"
+            ") "
+            "WHERE NOT is_test "
+            "GROUP BY customer_id "
+            f"{having_clause} "
+            f"ORDER BY {order_by} DESC, customer_id DESC "
+            "LIMIT {limit}"
+        ),
+        {**args, "limit": limit + 1},
+    )
+    return paginate(rows, limit, cursor_key)
+
+get_shopify_customer_ltv = ConsumptionApi[CustomerLTVQuery, CustomerLTVResponse](
+    name="getShopifyCustomerLTV",
+    query_function=get_customer_ltv_query
+)
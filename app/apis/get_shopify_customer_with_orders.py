@@ -0,0 +1,124 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+from app.utils.cache import cached_query
+from app.utils.guardrails import ANALYTICAL_LIMITS
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+
+# Customer with Orders API - profile, order aggregates and N most recent orders in one query
+class CustomerWithOrdersQuery(BaseModel):
+    customer_id: Optional[str] = None
+    email: Optional[str] = None
+    orders_limit: Optional[int] = 10
+
+class CustomerOrderSummary(BaseModel):
+    id: str
+    name: Optional[str] = None
+    created_at: Optional[datetime] = None
+    total_price: Optional[float] = None
+    currency: Optional[str] = None
+    financial_status: Optional[str] = None
+    fulfillment_status: Optional[str] = None
+
+class CustomerWithOrdersResponse(BaseModel):
+    id: str
+    email: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+    created_at: Optional[datetime] = None
+    verified_email: Optional[bool] = None
+    state: Optional[str] = None
+    city: Optional[str] = None
+    province: Optional[str] = None
+    country: Optional[str] = None
+    order_count: int
+    total_spent: float
+    average_order_value: Optional[float] = None
+    first_order_at: Optional[datetime] = None
+    last_order_at: Optional[datetime] = None
+    recent_orders: List[CustomerOrderSummary] = []
+
+# Tuple layout of recent_orders elements (matches the SELECT below)
+RECENT_ORDER_FIELDS = list(CustomerOrderSummary.model_fields)
+
+@cached_query("getShopifyCustomerWithOrders", tables=["shopify_customers", "shopify_orders"], ttl=10)
+@single_flight("getShopifyCustomerWithOrders")
+@instrumented("getShopifyCustomerWithOrders", limits=ANALYTICAL_LIMITS)
+def get_customer_with_orders_query(client, params: CustomerWithOrdersQuery):
+    """Query function for a customer profile plus order aggregates and recent orders.
+
+    Aggregates come from the shopify_customer_ltv rollup and recent orders from
+    shopify_orders (LIMIT n BY customer); everything is joined in a single query.
+    Both base-table reads use FINAL, so a re-ingested customer or order appears once in its
+    latest version, and test orders are left out of recent_orders as they are of the rollup.
+    """
+    if params.customer_id:
+        customer_filter = "id = {customer_id}"
+        args = {"customer_id": params.customer_id}
+    elif params.email:
+        customer_filter = "email = {email}"
+        args = {"email": params.email}
+    else:
+        raise ValueError("customer_id or email is required")
+    args["orders_limit"] = int(params.orders_limit or 10)
+
+    rows = client.query.execute(
+        (
+            "WITH customer AS ("
+            "SELECT id, email, first_name, last_name, phone, created_at, verified_email, state, city, province, country "
+            "FROM shopify_customers FINAL "
+            f"WHERE {customer_filter} "
+            "ORDER BY id "
+            "LIMIT 1"
+            ") "
+            "SELECT c.id AS id, c.email AS email, c.first_name AS first_name, c.last_name AS last_name, "
+            "c.phone AS phone, c.created_at AS created_at, c.verified_email AS verified_email, c.state AS state, "
+            "c.city AS city, c.province AS province, c.country AS country, "
+            "l.order_count AS order_count, l.total_spent AS total_spent, "
+            "if(l.order_count = 0, NULL, l.total_spent / l.order_count) AS average_order_value, "
+            "if(l.order_count = 0, NULL, l.first_order_at) AS first_order_at, "
+            "if(l.order_count = 0, NULL, l.last_order_at) AS last_order_at, "
+            "r.recent_orders AS recent_orders "
+            "FROM customer AS c "
+            "LEFT JOIN ("
+            "SELECT customer_id, count() AS order_count, sum(order_total) AS total_spent, "
+            "min(placed_at) AS first_order_at, max(placed_at) AS last_order_at "
+            "FROM ("
+            "SELECT customer_id, id, argMaxMerge(total_price) AS order_total, argMaxMerge(test) AS is_test, "
+            "minMerge(created_at) AS placed_at "
+            "FROM shopify_customer_ltv "
+            "WHERE customer_id IN (SELECT id FROM customer) "
+            "GROUP BY customer_id, id"
+            ") "
+            "WHERE NOT is_test "
+            "GROUP BY customer_id"
+            ") AS l ON l.customer_id = c.id "
+            "LEFT JOIN ("
+            "SELECT customer_id, "
+            "arrayReverseSort(o -> o.3, groupArray((id, name, created_at, total_price, currency, financial_status, fulfillment_status))) AS recent_orders "
+            "FROM ("
+            "SELECT assumeNotNull(customer_id) AS customer_id, id, name, created_at, total_price, currency, financial_status, fulfillment_status "
+            "FROM shopify_orders FINAL "
+            "WHERE customer_id IN (SELECT id FROM customer) "
+            "AND (test = false OR test IS NULL) "
+            "ORDER BY created_at DESC "
+            "LIMIT {orders_limit} BY customer_id"
+            ") "
+            "GROUP BY customer_id"
+            ") AS r ON r.customer_id = c.id"
+        ),
+        args,
+    )
+    return [
+        {**row, "recent_orders": [dict(zip(RECENT_ORDER_FIELDS, order)) for order in row.get("recent_orders") or []]}
+        for row in rows
+    ]
+
+get_shopify_customer_with_orders = ConsumptionApi[CustomerWithOrdersQuery, CustomerWithOrdersResponse](
+    name="getShopifyCustomerWithOrders",
+    query_function=get_customer_with_orders_query
+)
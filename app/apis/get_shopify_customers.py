@@ -3,11 +3,27 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
+from app.utils.batch import batch_values, in_predicate
+from app.utils.cache import cached_query
+from app.utils.guardrails import ANALYTICAL_LIMITS, INTERACTIVE_LIMITS
+from app.utils.pagination import NULL_DATETIME, keyset_predicate, order_by_sql, paginate
+from app.utils.projection import select_columns
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+
+# Sort key of getShopifyCustomerActivity (newest first)
+ACTIVITY_CURSOR_KEY = ["created_at", "id"]
+ACTIVITY_NULLABLE = {"created_at": NULL_DATETIME}
+
 # Customer Lookup API - by email or ID
 class CustomerLookupQuery(BaseModel):
     email: Optional[str] = None
+    emails: Optional[str] = None  # comma-separated batch of emails
     customer_id: Optional[str] = None
+    customer_ids: Optional[str] = None  # comma-separated batch of customer IDs
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    fields: Optional[str] = None  # comma-separated subset of CustomerResponse fields
 
 class CustomerResponse(BaseModel):
     id: str
@@ -25,29 +41,45 @@ class CustomerResponse(BaseModel):
     province: Optional[str] = None
     country: Optional[str] = None
     zip: Optional[str] = None
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
 
+@cached_query("getShopifyCustomerLookup", tables=["shopify_customers"], ttl=10)
+@single_flight("getShopifyCustomerLookup")
+@instrumented("getShopifyCustomerLookup", limits=INTERACTIVE_LIMITS)
 def get_customer_lookup_query(client, params: CustomerLookupQuery):
-    """Query function for customer lookup by email or ID (parameterized)."""
+    """Query function for customer lookup by email or ID (parameterized).
+
+    emails / customer_ids resolve a whole batch with one IN (...) query.
+    """
     where_sql_parts = []
     args = {"limit": params.limit or 100}
-    if params.email:
-        where_sql_parts.append("email = {email}")
-        args["email"] = params.email
-    if params.customer_id:
-        where_sql_parts.append("id = {customer_id}")
-        args["customer_id"] = params.customer_id
+    emails = batch_values(params.email, params.emails)
+    if emails:
+        where_sql_parts.append(in_predicate("email", emails, args, "email"))
+    customer_ids = batch_values(params.customer_id, params.customer_ids)
+    if customer_ids:
+        where_sql_parts.append(in_predicate("id", customer_ids, args, "customer_id"))
+    # Make sure a batch is not truncated by the default page size
+    batch_size = max(len(emails), len(customer_ids))
+    if batch_size:
+        args["limit"] = max(int(args["limit"]), batch_size)
+    cursor_sql = keyset_predicate(params.cursor, ["id"], args)
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
     where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
-    return client.query.execute(
+    limit = int(args["limit"])
+    columns = select_columns(CustomerResponse, params.fields, required=["id"])
+    rows = client.query.execute(
         (
-            "SELECT id, email, first_name, last_name, phone, created_at, updated_at, "
-            "verified_email, state, address1, address2, city, province, country, zip "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_customers "
             f"{where_clause} "
             "ORDER BY id "
             "LIMIT {limit}"
         ),
-        {**args, "limit": int(args["limit"])},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, ["id"])
 
 # Customer Segmentation API - by location
 class CustomerSegmentationQuery(BaseModel):
@@ -55,7 +87,12 @@ class CustomerSegmentationQuery(BaseModel):
     province: Optional[str] = None
     country: Optional[str] = None
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    fields: Optional[str] = None  # comma-separated subset of CustomerResponse fields
 
+@cached_query("getShopifyCustomerSegmentation", tables=["shopify_customers"], ttl=30)
+@single_flight("getShopifyCustomerSegmentation")
+@instrumented("getShopifyCustomerSegmentation", limits=ANALYTICAL_LIMITS)
 def get_customer_segmentation_query(client, params: CustomerSegmentationQuery):
     """Query function for customer segmentation by location (parameterized)."""
     where_sql_parts = []
@@ -69,39 +106,124 @@ def get_customer_segmentation_query(client, params: CustomerSegmentationQuery):
     if params.country:
         where_sql_parts.append("country = {country}")
         args["country"] = params.country
+    cursor_sql = keyset_predicate(params.cursor, ["id"], args)
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
     where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
-    return client.query.execute(
+    limit = int(args["limit"])
+    columns = select_columns(CustomerResponse, params.fields, required=["id"])
+    rows = client.query.execute(
         (
-            "SELECT id, email, first_name, last_name, phone, created_at, updated_at, "
-            "verified_email, state, address1, address2, city, province, country, zip "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_customers "
             f"{where_clause} "
             "ORDER BY id "
             "LIMIT {limit}"
         ),
-        {**args, "limit": int(args["limit"])},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, ["id"])
 
 # Customer Activity API - recent customers by created_at
 class CustomerActivityQuery(BaseModel):
     days_back: Optional[int] = 30
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    fields: Optional[str] = None  # comma-separated subset of CustomerResponse fields
 
+@cached_query("getShopifyCustomerActivity", tables=["shopify_customers"], ttl=30)
+@single_flight("getShopifyCustomerActivity")
+@instrumented("getShopifyCustomerActivity", limits=ANALYTICAL_LIMITS)
 def get_customer_activity_query(client, params: CustomerActivityQuery):
     """Query function for recent customer activity (parameterized)."""
-    return client.query.execute(
+    where_sql_parts = ["created_at >= now() - INTERVAL {days_back} DAY"]
+    args = {"days_back": int(params.days_back or 30)}
+    cursor_sql = keyset_predicate(
+        params.cursor, ACTIVITY_CURSOR_KEY, args, descending=True,
+        datetime_columns=("created_at",), nullable=ACTIVITY_NULLABLE,
+    )
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    limit = int(params.limit or 100)
+    columns = select_columns(CustomerResponse, params.fields, required=ACTIVITY_CURSOR_KEY)
+    rows = client.query.execute(
         (
-            "SELECT id, email, first_name, last_name, phone, created_at, updated_at, "
-            "verified_email, state, address1, address2, city, province, country, zip "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_customers "
-            "WHERE created_at >= now() - INTERVAL {days_back} DAY "
-            "ORDER BY created_at DESC "
+            f"WHERE {' AND '.join(where_sql_parts)} "
+            f"ORDER BY {order_by_sql(ACTIVITY_CURSOR_KEY, descending=True, nullable=ACTIVITY_NULLABLE)} "
+            "LIMIT {limit}"
+        ),
+        {**args, "limit": limit + 1},
+    )
+    return paginate(rows, limit, ACTIVITY_CURSOR_KEY)
+
+# Customer Segment Summary API - per-region/state aggregates from the shopify_customer_segments rollup
+class CustomerSegmentSummaryQuery(BaseModel):
+    group_by: Optional[str] = "country"  # country, province, city, state
+    city: Optional[str] = None
+    province: Optional[str] = None
+    country: Optional[str] = None
+    new_days: Optional[int] = 30  # window for new_customers
+    limit: Optional[int] = 100
+
+class CustomerSegmentSummaryResponse(BaseModel):
+    segment: str
+    customers: int
+    verified_customers: int
+    verified_ratio: float
+    new_customers: int
+
+SEGMENT_GROUP_COLUMNS = ("country", "province", "city", "state")
+
+@cached_query("getShopifyCustomerSegmentSummary", tables=["shopify_customers"], ttl=60)
+@single_flight("getShopifyCustomerSegmentSummary")
+@instrumented("getShopifyCustomerSegmentSummary", limits=ANALYTICAL_LIMITS)
+def get_customer_segment_summary_query(client, params: CustomerSegmentSummaryQuery):
+    """Query function for customer counts, verified ratio and new customers per segment.
+
+    One small row per group instead of the raw customer rows getShopifyCustomerSegmentation returns.
+    """
+    if params.group_by not in SEGMENT_GROUP_COLUMNS:
+        raise ValueError(f"group_by must be one of: {', '.join(SEGMENT_GROUP_COLUMNS)}")
+    where_sql_parts = []
+    args = {"limit": params.limit or 100, "new_days": int(params.new_days or 30)}
+    if params.city:
+        where_sql_parts.append("city = {city}")
+        args["city"] = params.city
+    if params.province:
+        where_sql_parts.append("province = {province}")
+        args["province"] = params.province
+    if params.country:
+        where_sql_parts.append("country = {country}")
+        args["country"] = params.country
+    where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    return client.query.execute(
+        (
+            f"SELECT {params.group_by} AS segment, "
+            "count() AS customers, "
+            "countIf(verified_email) AS verified_customers, "
+            "if(customers = 0, 0, verified_customers / customers) AS verified_ratio, "
+            "countIf(created_day >= today() - {new_days}) AS new_customers "
+            "FROM ("
+            "SELECT created_day, id, "
+            "argMaxMerge(country) AS country, "
+            "argMaxMerge(province) AS province, "
+            "argMaxMerge(city) AS city, "
+            "argMaxMerge(state) AS state, "
+            "argMaxMerge(verified_email) AS verified_email "
+            "FROM shopify_customer_segments "
+            "GROUP BY created_day, id"
+            ") "
+            f"{where_clause} "
+            "GROUP BY segment "
+            "ORDER BY customers DESC, segment "
             "LIMIT {limit}"
         ),
-        {"days_back": int(params.days_back or 30), "limit": int(params.limit or 100)},
+        {**args, "limit": int(args["limit"])},
     )
 
-# Create the three consumption APIs
+# Create the consumption APIs
 get_shopify_customer_lookup = ConsumptionApi[CustomerLookupQuery, CustomerResponse](
     name="getShopifyCustomerLookup",
     query_function=get_customer_lookup_query
@@ -117,3 +239,8 @@ get_shopify_customer_activity = ConsumptionApi[CustomerActivityQuery, CustomerRe
     query_function=get_customer_activity_query
 )
 
+get_shopify_customer_segment_summary = ConsumptionApi[CustomerSegmentSummaryQuery, CustomerSegmentSummaryResponse](
+    name="getShopifyCustomerSegmentSummary",
+    query_function=get_customer_segment_summary_query
+)
+
@@ -0,0 +1,50 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+from app.utils.cache import API_TABLES, data_etag, get_table_modified, get_table_state
+
+# Data Version API - ETag / Last-Modified watermark per API or table set (reads Redis, not ClickHouse)
+class DataVersionQuery(BaseModel):
+    api_name: Optional[str] = None  # a cached API, e.g. getShopifyInventoryLevels
+    tables: Optional[str] = None    # or a comma-separated table set, e.g. shopify_orders
+
+class DataVersionResponse(BaseModel):
+    name: str
+    tables: List[str]
+    etag: str
+    last_modified: Optional[datetime] = None
+
+def get_data_version_query(client, params: DataVersionQuery):
+    """Query function for the data watermark of an API's tables.
+
+    The etag changes whenever one of the tables is ingested into (and once more when the
+    new rows have settled), so a poller can watch it and refetch when it moves. It is not
+    the `if_none_match` value: that etag also covers the query parameters and comes back
+    with each response of the API itself.
+    """
+    if params.tables:
+        targets = {params.tables: [t.strip() for t in params.tables.split(",") if t.strip()]}
+    elif params.api_name:
+        if params.api_name not in API_TABLES:
+            raise ValueError(f"Unknown api_name: {params.api_name}")
+        targets = {params.api_name: API_TABLES[params.api_name]}
+    else:
+        targets = dict(sorted(API_TABLES.items()))
+
+    results = []
+    for name, tables in targets.items():
+        versions, settled = get_table_state(tables)
+        results.append({
+            "name": name,
+            "tables": tables,
+            "etag": data_etag(tables, versions, settled),
+            "last_modified": get_table_modified(tables),
+        })
+    return results
+
+get_shopify_data_version = ConsumptionApi[DataVersionQuery, DataVersionResponse](
+    name="getShopifyDataVersion",
+    query_function=get_data_version_query
+)
@@ -3,8 +3,20 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
+from app.utils.cache import cached_query
+from app.utils.guardrails import INTERACTIVE_LIMITS
+from app.utils.pagination import NULL_DATETIME, NULL_STRING, keyset_predicate, order_by_sql, paginate
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+
+# Sort key of getShopifyInventoryLevels (newest first)
+INVENTORY_CURSOR_KEY = ["updated_at", "location_id", "sku"]
+INVENTORY_NULLABLE = {"updated_at": NULL_DATETIME, "sku": NULL_STRING}
+
 class InventoryLevelsQuery(BaseModel):
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
 
 class InventoryLevelsResponse(BaseModel):
     sku: str
@@ -13,18 +25,34 @@ class InventoryLevelsResponse(BaseModel):
     location_id: str
     location_name: Optional[str]
     updated_at: datetime
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
 
+@cached_query("getShopifyInventoryLevels", tables=["shopify_inventory_levels"], ttl=5)
+@single_flight("getShopifyInventoryLevels")
+@instrumented("getShopifyInventoryLevels", limits=INTERACTIVE_LIMITS)
 def get_shopify_inventory_levels_query(client, params: InventoryLevelsQuery):
     """Query function for retrieving Shopify inventory levels (parameterized)."""
-    return client.query.execute(
+    where_sql_parts = []
+    args = {}
+    cursor_sql = keyset_predicate(
+        params.cursor, INVENTORY_CURSOR_KEY, args, descending=True,
+        datetime_columns=("updated_at",), nullable=INVENTORY_NULLABLE,
+    )
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    limit = int(params.limit or 100)
+    rows = client.query.execute(
         (
             "SELECT sku, tracked, available, location_id, location_name, updated_at "
             "FROM shopify_inventory_levels "
-            "ORDER BY updated_at DESC "
+            f"{where_clause} "
+            f"ORDER BY {order_by_sql(INVENTORY_CURSOR_KEY, descending=True, nullable=INVENTORY_NULLABLE)} "
             "LIMIT {limit}"
         ),
-        {"limit": int(params.limit or 100)},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, INVENTORY_CURSOR_KEY)
 
 get_shopify_inventory_levels = ConsumptionApi[InventoryLevelsQuery, InventoryLevelsResponse](
     name="getShopifyInventoryLevels",
@@ -0,0 +1,109 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+from app.utils.cache import cached_query
+from app.utils.guardrails import ANALYTICAL_LIMITS
+from app.utils.pagination import keyset_predicate, paginate
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+
+# Inventory by Location API - totals per location from shopify_inventory_location_totals
+class InventoryByLocationQuery(BaseModel):
+    location_id: Optional[str] = None
+    limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
+
+class InventoryByLocationResponse(BaseModel):
+    location_id: str
+    location_name: Optional[str] = None
+    sku_count: int
+    total_available: float
+    out_of_stock_skus: int
+    updated_at: Optional[datetime] = None
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
+
+@cached_query("getShopifyInventoryByLocation", tables=["shopify_inventory_levels"], ttl=10)
+@single_flight("getShopifyInventoryByLocation")
+@instrumented("getShopifyInventoryByLocation", limits=ANALYTICAL_LIMITS)
+def get_inventory_by_location_query(client, params: InventoryByLocationQuery):
+    """Query function for total available inventory per location (parameterized)."""
+    where_sql_parts = []
+    args = {"limit": params.limit or 100}
+    if params.location_id:
+        where_sql_parts.append("location_id = {location_id}")
+        args["location_id"] = params.location_id
+    cursor_sql = keyset_predicate(params.cursor, ["location_id"], args)
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    limit = int(args["limit"])
+    rows = client.query.execute(
+        (
+            "SELECT location_id, location_name, sku_count, total_available, out_of_stock_skus, updated_at "
+            "FROM shopify_inventory_location_totals "
+            f"{where_clause} "
+            "ORDER BY location_id "
+            "LIMIT {limit}"
+        ),
+        {**args, "limit": limit + 1},
+    )
+    return paginate(rows, limit, ["location_id"])
+
+# Low Stock API - SKUs below a threshold, optionally at one location
+class LowStockQuery(BaseModel):
+    location_id: Optional[str] = None
+    threshold: Optional[float] = 5
+    tracked_only: Optional[bool] = True
+    limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
+
+class LowStockResponse(BaseModel):
+    sku: str
+    location_id: str
+    location_name: Optional[str] = None
+    available: float
+    tracked: bool
+    updated_at: Optional[datetime] = None
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
+
+@cached_query("getShopifyLowStock", tables=["shopify_inventory_levels"], ttl=10)
+@single_flight("getShopifyLowStock")
+@instrumented("getShopifyLowStock", limits=ANALYTICAL_LIMITS)
+def get_low_stock_query(client, params: LowStockQuery):
+    """Query function for SKUs whose latest available quantity is below a threshold (parameterized)."""
+    where_sql_parts = ["available < {threshold}"]
+    args = {"threshold": float(params.threshold if params.threshold is not None else 5), "limit": params.limit or 100}
+    if params.location_id:
+        where_sql_parts.append("location_id = {location_id}")
+        args["location_id"] = params.location_id
+    if params.tracked_only:
+        where_sql_parts.append("tracked = true")
+    cursor_sql = keyset_predicate(params.cursor, ["available", "location_id", "sku"], args)
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    limit = int(args["limit"])
+    rows = client.query.execute(
+        (
+            "SELECT sku, location_id, location_name, available, tracked, updated_at "
+            "FROM shopify_inventory_latest_levels "
+            f"WHERE {' AND '.join(where_sql_parts)} "
+            "ORDER BY available ASC, location_id, sku "
+            "LIMIT {limit}"
+        ),
+        {**args, "limit": limit + 1},
+    )
+    return paginate(rows, limit, ["available", "location_id", "sku"])
+
+get_shopify_inventory_by_location = ConsumptionApi[InventoryByLocationQuery, InventoryByLocationResponse](
+    name="getShopifyInventoryByLocation",
+    query_function=get_inventory_by_location_query
+)
+
+get_shopify_low_stock = ConsumptionApi[LowStockQuery, LowStockResponse](
+    name="getShopifyLowStock",
+    query_function=get_low_stock_query
+)
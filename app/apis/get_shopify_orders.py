@@ -1,14 +1,71 @@
 from moose_lib import ConsumptionApi
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
+from app.utils.batch import batch_values, in_predicate
+from app.utils.cache import cached_query
+from app.utils.guardrails import ANALYTICAL_LIMITS, INTERACTIVE_LIMITS
+from app.utils.pagination import NULL_DATETIME, keyset_predicate, order_by_sql, paginate
+from app.utils.projection import select_columns
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+from app.views.customer_dictionary import customer_attribute
+
+# Keyset for all list-style order APIs (matches their ORDER BY); orders without
+# created_at sort after the oldest ones
+ORDER_CURSOR_KEY = ["created_at", "id"]
+ORDER_NULLABLE = {"created_at": NULL_DATETIME}
+ORDER_SORT_SQL = order_by_sql(ORDER_CURSOR_KEY, descending=True, nullable=ORDER_NULLABLE)
+
+# Customer attributes looked up in shopify_customers_dict (include_customer=true or via fields)
+CUSTOMER_ENRICHMENT = {
+    "customer_country": customer_attribute("country"),
+    "customer_province": customer_attribute("province"),
+    "customer_state": customer_attribute("state"),
+    "customer_verified_email": customer_attribute("verified_email"),
+}
+
+def reads_customer_dictionary(params) -> bool:
+    """True if the request selects CUSTOMER_ENRICHMENT columns.
+
+    shopify_customers_dict reloads on its own schedule, not on ingest, so these requests are
+    left out of etag / not_modified answers and only cached for the TTL.
+    """
+    if getattr(params, "include_customer", False):
+        return True
+    return any(f in CUSTOMER_ENRICHMENT for f in batch_values(None, getattr(params, "fields", None)))
+
+def add_tag_filters(params, where_sql_parts: list, args: dict) -> None:
+    """tags=a,b requires every tag (has); any_tag=a,b requires at least one (hasAny).
+
+    Both compile to functions the bloom-filter index on tags can use.
+    """
+    for i, tag in enumerate(batch_values(None, params.tags)):
+        where_sql_parts.append(f"has(tags, {{tag_{i}}})")
+        args[f"tag_{i}"] = tag
+    any_tags = batch_values(None, params.any_tag)
+    if any_tags:
+        placeholders = []
+        for i, tag in enumerate(any_tags):
+            args[f"any_tag_{i}"] = tag
+            placeholders.append(f"{{any_tag_{i}}}")
+        where_sql_parts.append(f"hasAny(tags, [{', '.join(placeholders)}])")
+
 # Order Lookup API - by ID or order number
 class OrderLookupQuery(BaseModel):
     order_id: Optional[str] = None
+    order_ids: Optional[str] = None  # comma-separated batch of order IDs
     order_number: Optional[str] = None
+    order_numbers: Optional[str] = None  # comma-separated batch of order numbers
     name: Optional[str] = None
+    tags: Optional[str] = None     # comma-separated; order must have all of them
+    any_tag: Optional[str] = None  # comma-separated; order must have at least one
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
+    fields: Optional[str] = None  # comma-separated subset of OrderResponse fields
+    include_customer: Optional[bool] = False  # add customer_* attributes from the customers dictionary
 
 class OrderResponse(BaseModel):
     id: str
@@ -23,7 +80,7 @@ class OrderResponse(BaseModel):
     customer_id: Optional[str] = None
     customer_email: Optional[str] = None
     test: Optional[bool] = None
-    tags: Optional[str] = None
+    tags: List[str] = []
     note: Optional[str] = None
     billing_city: Optional[str] = None
     billing_province: Optional[str] = None
@@ -31,44 +88,81 @@ class OrderResponse(BaseModel):
     shipping_city: Optional[str] = None
     shipping_province: Optional[str] = None
     shipping_country: Optional[str] = None
+    # CUSTOMER_ENRICHMENT, only with include_customer=true or when named in fields
+    customer_country: Optional[str] = None
+    customer_province: Optional[str] = None
+    customer_state: Optional[str] = None
+    customer_verified_email: Optional[bool] = None
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
 
+@cached_query("getShopifyOrderLookup", tables=["shopify_orders"], ttl=10, unversioned=reads_customer_dictionary)
+@single_flight("getShopifyOrderLookup")
+@instrumented("getShopifyOrderLookup", limits=INTERACTIVE_LIMITS)
 def get_order_lookup_query(client, params: OrderLookupQuery):
-    """Query function for order lookup by ID, order number, or name."""
+    """Query function for order lookup by ID, order number, or name.
+
+    order_ids / order_numbers resolve a whole batch with one IN (...) query.
+    """
     where_sql_parts = []
     args = {"limit": params.limit or 100}
     
-    if params.order_id:
-        where_sql_parts.append("id = {order_id}")
-        args["order_id"] = params.order_id
-    if params.order_number:
-        where_sql_parts.append("order_number = {order_number}")
-        args["order_number"] = params.order_number
+    order_ids = batch_values(params.order_id, params.order_ids)
+    if order_ids:
+        where_sql_parts.append(in_predicate("id", order_ids, args, "order_id"))
+    order_numbers = batch_values(params.order_number, params.order_numbers)
+    if order_numbers:
+        where_sql_parts.append(in_predicate("order_number", order_numbers, args, "order_number"))
+    # Make sure a batch is not truncated by the default page size
+    batch_size = max(len(order_ids), len(order_numbers))
+    if batch_size:
+        args["limit"] = max(int(args["limit"]), batch_size)
     if params.name:
         where_sql_parts.append("name = {name}")
         args["name"] = params.name
     
+    add_tag_filters(params, where_sql_parts, args)
+    cursor_sql = keyset_predicate(
+        params.cursor, ORDER_CURSOR_KEY, args, descending=True,
+        datetime_columns=("created_at",), nullable=ORDER_NULLABLE,
+    )
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    
     where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    limit = int(args["limit"])
+    columns = select_columns(
+        OrderResponse, params.fields, required=ORDER_CURSOR_KEY,
+        computed=CUSTOMER_ENRICHMENT, include_computed=bool(params.include_customer),
+    )
     
-    return client.query.execute(
+    rows = client.query.execute(
         (
-            "SELECT id, name, order_number, created_at, updated_at, total_price, currency, "
-            "financial_status, fulfillment_status, customer_id, customer_email, test, tags, note, "
-            "billing_city, billing_province, billing_country, shipping_city, shipping_province, shipping_country "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_orders "
             f"{where_clause} "
-            "ORDER BY created_at DESC "
+            f"ORDER BY {ORDER_SORT_SQL} "
             "LIMIT {limit}"
         ),
-        {**args, "limit": int(args["limit"])},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, ORDER_CURSOR_KEY)
 
 # Orders by Date Range API
 class OrdersByDateQuery(BaseModel):
     start_date: Optional[str] = None  # YYYY-MM-DD format
     end_date: Optional[str] = None    # YYYY-MM-DD format
     days_back: Optional[int] = None   # Alternative to date range
+    tags: Optional[str] = None     # comma-separated; order must have all of them
+    any_tag: Optional[str] = None  # comma-separated; order must have at least one
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
+    fields: Optional[str] = None  # comma-separated subset of OrderResponse fields
+    include_customer: Optional[bool] = False  # add customer_* attributes from the customers dictionary
 
+@cached_query("getShopifyOrdersByDate", tables=["shopify_orders"], ttl=15, unversioned=reads_customer_dictionary)
+@single_flight("getShopifyOrdersByDate")
+@instrumented("getShopifyOrdersByDate", limits=ANALYTICAL_LIMITS)
 def get_orders_by_date_query(client, params: OrdersByDateQuery):
     """Query function for orders by date range or recent days."""
     where_sql_parts = []
@@ -82,27 +176,48 @@ def get_orders_by_date_query(client, params: OrdersByDateQuery):
         where_sql_parts.append("created_at >= now() - INTERVAL {days_back} DAY")
         args["days_back"] = int(params.days_back)
     
+    add_tag_filters(params, where_sql_parts, args)
+    cursor_sql = keyset_predicate(
+        params.cursor, ORDER_CURSOR_KEY, args, descending=True,
+        datetime_columns=("created_at",), nullable=ORDER_NULLABLE,
+    )
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    
     where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    limit = int(args["limit"])
+    columns = select_columns(
+        OrderResponse, params.fields, required=ORDER_CURSOR_KEY,
+        computed=CUSTOMER_ENRICHMENT, include_computed=bool(params.include_customer),
+    )
     
-    return client.query.execute(
+    rows = client.query.execute(
         (
-            "SELECT id, name, order_number, created_at, updated_at, total_price, currency, "
-            "financial_status, fulfillment_status, customer_id, customer_email, test, tags, note, "
-            "billing_city, billing_province, billing_country, shipping_city, shipping_province, shipping_country "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_orders "
             f"{where_clause} "
-            "ORDER BY created_at DESC "
+            f"ORDER BY {ORDER_SORT_SQL} "
             "LIMIT {limit}"
         ),
-        {**args, "limit": int(args["limit"])},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, ORDER_CURSOR_KEY)
 
 # Orders by Customer API
 class OrdersByCustomerQuery(BaseModel):
     customer_id: Optional[str] = None
     customer_email: Optional[str] = None
+    tags: Optional[str] = None     # comma-separated; order must have all of them
+    any_tag: Optional[str] = None  # comma-separated; order must have at least one
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
+    fields: Optional[str] = None  # comma-separated subset of OrderResponse fields
+    include_customer: Optional[bool] = False  # add customer_* attributes from the customers dictionary
 
+@cached_query("getShopifyOrdersByCustomer", tables=["shopify_orders"], ttl=10, unversioned=reads_customer_dictionary)
+@single_flight("getShopifyOrdersByCustomer")
+@instrumented("getShopifyOrdersByCustomer", limits=ANALYTICAL_LIMITS)
 def get_orders_by_customer_query(client, params: OrdersByCustomerQuery):
     """Query function for orders by customer ID or email."""
     where_sql_parts = []
@@ -115,28 +230,49 @@ def get_orders_by_customer_query(client, params: OrdersByCustomerQuery):
         where_sql_parts.append("customer_email = {customer_email}")
         args["customer_email"] = params.customer_email
     
+    add_tag_filters(params, where_sql_parts, args)
+    cursor_sql = keyset_predicate(
+        params.cursor, ORDER_CURSOR_KEY, args, descending=True,
+        datetime_columns=("created_at",), nullable=ORDER_NULLABLE,
+    )
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    
     where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    limit = int(args["limit"])
+    columns = select_columns(
+        OrderResponse, params.fields, required=ORDER_CURSOR_KEY,
+        computed=CUSTOMER_ENRICHMENT, include_computed=bool(params.include_customer),
+    )
     
-    return client.query.execute(
+    rows = client.query.execute(
         (
-            "SELECT id, name, order_number, created_at, updated_at, total_price, currency, "
-            "financial_status, fulfillment_status, customer_id, customer_email, test, tags, note, "
-            "billing_city, billing_province, billing_country, shipping_city, shipping_province, shipping_country "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_orders "
             f"{where_clause} "
-            "ORDER BY created_at DESC "
+            f"ORDER BY {ORDER_SORT_SQL} "
             "LIMIT {limit}"
         ),
-        {**args, "limit": int(args["limit"])},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, ORDER_CURSOR_KEY)
 
 # Orders by Status API
 class OrdersByStatusQuery(BaseModel):
     financial_status: Optional[str] = None
     fulfillment_status: Optional[str] = None
     exclude_test: Optional[bool] = True
+    tags: Optional[str] = None     # comma-separated; order must have all of them
+    any_tag: Optional[str] = None  # comma-separated; order must have at least one
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
+    fields: Optional[str] = None  # comma-separated subset of OrderResponse fields
+    include_customer: Optional[bool] = False  # add customer_* attributes from the customers dictionary
 
+@cached_query("getShopifyOrdersByStatus", tables=["shopify_orders"], ttl=15, unversioned=reads_customer_dictionary)
+@single_flight("getShopifyOrdersByStatus")
+@instrumented("getShopifyOrdersByStatus", limits=ANALYTICAL_LIMITS)
 def get_orders_by_status_query(client, params: OrdersByStatusQuery):
     """Query function for orders by financial or fulfillment status."""
     where_sql_parts = []
@@ -151,39 +287,130 @@ def get_orders_by_status_query(client, params: OrdersByStatusQuery):
     if params.exclude_test:
         where_sql_parts.append("(test = false OR test IS NULL)")
     
+    add_tag_filters(params, where_sql_parts, args)
+    cursor_sql = keyset_predicate(
+        params.cursor, ORDER_CURSOR_KEY, args, descending=True,
+        datetime_columns=("created_at",), nullable=ORDER_NULLABLE,
+    )
+    if cursor_sql:
+        where_sql_parts.append(cursor_sql)
+    
     where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    limit = int(args["limit"])
+    columns = select_columns(
+        OrderResponse, params.fields, required=ORDER_CURSOR_KEY,
+        computed=CUSTOMER_ENRICHMENT, include_computed=bool(params.include_customer),
+    )
     
-    return client.query.execute(
+    rows = client.query.execute(
         (
-            "SELECT id, name, order_number, created_at, updated_at, total_price, currency, "
-            "financial_status, fulfillment_status, customer_id, customer_email, test, tags, note, "
-            "billing_city, billing_province, billing_country, shipping_city, shipping_province, shipping_country "
+            f"SELECT {', '.join(columns)} "
             "FROM shopify_orders "
             f"{where_clause} "
-            "ORDER BY created_at DESC "
+            f"ORDER BY {ORDER_SORT_SQL} "
             "LIMIT {limit}"
         ),
-        {**args, "limit": int(args["limit"])},
+        {**args, "limit": limit + 1},
     )
+    return paginate(rows, limit, ORDER_CURSOR_KEY)
 
 # Order Analytics API - aggregated data
 class OrderAnalyticsQuery(BaseModel):
     days_back: Optional[int] = 30
     group_by: Optional[str] = "day"  # day, week, month
     currency: Optional[str] = None
+    approx: Optional[bool] = False  # sampled, approximate aggregates (fixed cost for long ranges)
+    sample: Optional[float] = None  # 0 < sample <= 1: fraction; integer >= 2: approximate rows to read
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
 
 class OrderAnalyticsResponse(BaseModel):
     date_period: str
     total_orders: int
     total_revenue: float
     average_order_value: float
+    median_order_value: Optional[float] = None
+    p90_order_value: Optional[float] = None
+    unique_customers: Optional[int] = None  # approximate mode, only when the whole range was read
     currency: Optional[str] = None
+    sample_rate: float = 1.0  # effective fraction of data read (1.0 = exact)
 
+# Rows read per query when approx=true and no sample is given
+DEFAULT_APPROX_SAMPLE_ROWS = 1_000_000
+
+def sample_clause(params: OrderAnalyticsQuery) -> str:
+    """Validated SAMPLE clause; a literal because ClickHouse does not take parameters there."""
+    if params.sample is None:
+        return f"SAMPLE {DEFAULT_APPROX_SAMPLE_ROWS}"
+    sample = float(params.sample)
+    if sample <= 0:
+        raise ValueError("sample must be > 0")
+    if sample <= 1:
+        return f"SAMPLE {sample!r}"
+    if not sample.is_integer():
+        raise ValueError("sample must be a fraction in (0, 1] or a whole number of rows >= 2")
+    return f"SAMPLE {int(sample)}"
+
+@cached_query("getShopifyOrderAnalytics", tables=["shopify_orders"], ttl=30)
+@single_flight("getShopifyOrderAnalytics")
+@instrumented("getShopifyOrderAnalytics", limits=ANALYTICAL_LIMITS)
 def get_order_analytics_query(client, params: OrderAnalyticsQuery):
-    """Query function for order analytics and aggregations."""
+    """Query function for order analytics.
+
+    Exact mode reads the shopify_orders_daily_rollup view: each order's latest total is merged
+    from its argMax state (one narrow row per order, so re-ingested orders count once), test
+    orders are dropped, and the totals are aggregated into one row per (period, currency).
+
+    Approximate mode (approx=true or sample=...) reads the shopify_orders_sample table FINAL
+    with SAMPLE (so re-ingested orders count once), scales counts and sums by _sample_factor, uses quantileTDigest, and reports the
+    effective sample_rate. The sample is of orders, so distinct customers do not scale up
+    with it: unique_customers (uniqCombined) is only reported when the sample covered every row.
+    """
+    if params.approx or params.sample is not None:
+        return get_order_analytics_approx_query(client, params)
+
+    args = {"days_back": int(params.days_back or 30)}
+    
+    # Determine date grouping (rollup rows carry the order's day)
+    date_trunc = "day"
+    if params.group_by == "week":
+        date_trunc = "toMonday(day)"
+    elif params.group_by == "month":
+        date_trunc = "toStartOfMonth(day)"
+    
+    currency_filter = ""
+    if params.currency:
+        currency_filter = "AND currency = {currency}"
+        args["currency"] = params.currency
+    
+    return client.query.execute(
+        (
+            f"SELECT toString({date_trunc}) as date_period, "
+            "count() as total_orders, "
+            "sum(order_total) as total_revenue, "
+            "avg(order_total) as average_order_value, "
+            "(quantiles(0.5, 0.9)(order_total) as order_value_quantiles)[1] as median_order_value, "
+            "order_value_quantiles[2] as p90_order_value, "
+            "currency "
+            "FROM ("
+            "SELECT currency, day, id, "
+            "argMaxMerge(total_price) AS order_total, "
+            "argMaxMerge(test) AS is_test "
+            "FROM shopify_orders_daily_rollup "
+            "WHERE day >= toDate(now() - INTERVAL {days_back} DAY) "
+            f"{currency_filter} "
+            "GROUP BY currency, day, id"
+            ") "
+            "WHERE NOT is_test "
+            "GROUP BY date_period, currency "
+            "ORDER BY date_period DESC, currency"
+        ),
+        args,
+    )
+
+def get_order_analytics_approx_query(client, params: OrderAnalyticsQuery):
+    """Sampled variant of get_order_analytics_query (see its docstring)."""
     args = {"days_back": int(params.days_back or 30)}
     
-    # Determine date grouping
     date_trunc = "toDate(created_at)"
     if params.group_by == "week":
         date_trunc = "toMonday(created_at)"
@@ -197,17 +424,22 @@ def get_order_analytics_query(client, params: OrderAnalyticsQuery):
     
     return client.query.execute(
         (
-            f"SELECT {date_trunc} as date_period, "
-            "count(*) as total_orders, "
-            "sum(total_price) as total_revenue, "
+            f"SELECT toString({date_trunc}) as date_period, "
+            "toUInt64(round(sum(_sample_factor))) as total_orders, "
+            "sum(total_price * _sample_factor) as total_revenue, "
             "avg(total_price) as average_order_value, "
-            "any(currency) as currency "
-            "FROM shopify_orders "
+            "quantileTDigest(0.5)(total_price) as median_order_value, "
+            "quantileTDigest(0.9)(total_price) as p90_order_value, "
+            "if(any(_sample_factor) = 1, uniqCombined(customer_id), NULL) as unique_customers, "
+            "currency, "
+            "1 / any(_sample_factor) as sample_rate "
+            # FINAL: a re-ingested order is a second row until the ReplacingMergeTree merges
+            "FROM shopify_orders_sample FINAL "
+            f"{sample_clause(params)} "
             "WHERE created_at >= now() - INTERVAL {days_back} DAY "
-            "AND (test = false OR test IS NULL) "
             f"{currency_filter} "
-            "GROUP BY date_period "
-            "ORDER BY date_period DESC"
+            "GROUP BY date_period, currency "
+            "ORDER BY date_period DESC, currency"
         ),
         args,
     )
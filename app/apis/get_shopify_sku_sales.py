@@ -0,0 +1,100 @@
+from moose_lib import ConsumptionApi
+from pydantic import BaseModel
+from typing import Optional
+
+from app.utils.cache import cached_query
+from app.utils.guardrails import ANALYTICAL_LIMITS
+from app.utils.pagination import keyset_predicate, paginate
+from app.utils.query_stats import instrumented
+from app.utils.single_flight import single_flight
+
+# SKU Sales API - units, revenue and orders per SKU from the shopify_sku_sales_daily rollup
+class SkuSalesQuery(BaseModel):
+    sku: Optional[str] = None
+    start_date: Optional[str] = None  # YYYY-MM-DD format
+    end_date: Optional[str] = None    # YYYY-MM-DD format
+    days_back: Optional[int] = 30     # used when no date range is given
+    currency: Optional[str] = None
+    order_by: Optional[str] = "revenue"  # revenue, units, orders
+    limit: Optional[int] = 100
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    if_none_match: Optional[str] = None  # etag from the previous response ("*" on the first poll); opts into the etag envelope
+
+class SkuSalesResponse(BaseModel):
+    sku: str
+    currency: str
+    title: Optional[str] = None
+    units: int
+    revenue: float
+    orders: int
+    average_unit_price: Optional[float] = None
+    next_cursor: Optional[str] = None  # set on the last row when another page exists
+
+@cached_query("getShopifySkuSales", tables=["shopify_order_line_items"], ttl=60)
+@single_flight("getShopifySkuSales")
+@instrumented("getShopifySkuSales", limits=ANALYTICAL_LIMITS)
+def get_sku_sales_query(client, params: SkuSalesQuery):
+    """Query function for top-selling SKUs over a date range (one row per SKU and currency)."""
+    where_sql_parts = []
+    having_sql_parts = []
+    args = {"limit": params.limit or 100}
+
+    if params.start_date and params.end_date:
+        where_sql_parts.append("day >= toDate({start_date}) AND day <= toDate({end_date})")
+        args["start_date"] = params.start_date
+        args["end_date"] = params.end_date
+    elif params.days_back:
+        where_sql_parts.append("day >= today() - {days_back}")
+        args["days_back"] = int(params.days_back)
+    if params.sku:
+        where_sql_parts.append("sku = {sku}")
+        args["sku"] = params.sku
+    if params.currency:
+        where_sql_parts.append("currency = {currency}")
+        args["currency"] = params.currency
+
+    # Only allow ordering by known aggregate columns
+    order_by = params.order_by if params.order_by in ("revenue", "units", "orders") else "revenue"
+
+    # Keyset on (metric, sku, currency); the cursor is only valid for the same order_by
+    cursor_key = [order_by, "sku", "currency"]
+    cursor_sql = keyset_predicate(params.cursor, cursor_key, args, descending=True)
+    if cursor_sql:
+        having_sql_parts.append(cursor_sql)
+
+    where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    having_clause = f"HAVING {' AND '.join(having_sql_parts)}" if having_sql_parts else ""
+    limit = int(args["limit"])
+
+    rows = client.query.execute(
+        (
+            "SELECT sku, currency, "
+            "anyLast(item_title) as title, "
+            "sum(item_quantity) as units, "
+            "sum(item_total) as revenue, "
+            "uniqExact(order_id) as orders, "
+            "if(units > 0, revenue / units, NULL) as average_unit_price "
+            "FROM ("
+            "SELECT sku, day, currency, order_id, id, "
+            "argMaxMerge(title) AS item_title, "
+            "argMaxMerge(quantity) AS item_quantity, "
+            "argMaxMerge(discounted_total) AS item_total, "
+            "argMaxMerge(test) AS is_test "
+            "FROM shopify_sku_sales_daily "
+            f"{where_clause} "
+            "GROUP BY sku, day, currency, order_id, id"
+            ") "
+            "WHERE NOT is_test "
+            "GROUP BY sku, currency "
+            f"{having_clause} "
+            f"ORDER BY {order_by} DESC, sku DESC, currency DESC "
+            "LIMIT {limit}"
+        ),
+        {**args, "limit": limit + 1},
+    )
+    return paginate(rows, limit, cursor_key)
+
+get_shopify_sku_sales = ConsumptionApi[SkuSalesQuery, SkuSalesResponse](
+    name="getShopifySkuSales",
+    query_function=get_sku_sales_query
+)
@@ -0,0 +1,15 @@
+from moose_lib import ClickHouseCodec, clickhouse_decimal
+from typing import Annotated
+from datetime import datetime
+
+# Compact ClickHouse column types shared by the Shopify datamodels.
+# LowCardinality dictionary-encodes repetitive strings (currencies, statuses, regions),
+# Decimal keeps money exact in 8 bytes instead of a float, and Delta+ZSTD shrinks
+# mostly-increasing timestamps.
+
+LowCardinalityStr = Annotated[str, "LowCardinality"]
+
+# Decimal64 with sub-unit precision (some currencies use 3 decimals)
+Money = clickhouse_decimal(18, 4)
+
+Timestamp = Annotated[datetime, ClickHouseCodec("Delta, ZSTD")]
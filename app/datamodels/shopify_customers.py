@@ -1,7 +1,8 @@
 from moose_lib import IngestPipeline, IngestPipelineConfig, OlapConfig
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+
+from app.datamodels.column_types import LowCardinalityStr, Timestamp
 
 class ShopifyCustomers(BaseModel):
     id: str
@@ -9,16 +10,16 @@ class ShopifyCustomers(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     phone: Optional[str] = None
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
+    created_at: Optional[Timestamp] = None
+    updated_at: Optional[Timestamp] = None
     verified_email: Optional[bool] = None
-    state: Optional[str] = None
+    state: Optional[LowCardinalityStr] = None
     # Flattened address fields
     address1: Optional[str] = None
     address2: Optional[str] = None
     city: Optional[str] = None
-    province: Optional[str] = None
-    country: Optional[str] = None
+    province: Optional[LowCardinalityStr] = None
+    country: Optional[LowCardinalityStr] = None
     zip: Optional[str] = None
 
 config = IngestPipelineConfig(
@@ -1,15 +1,16 @@
 from moose_lib import IngestPipeline, IngestPipelineConfig, OlapConfig
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+
+from app.datamodels.column_types import LowCardinalityStr, Timestamp
 
 class ShopifyInventoryLevels(BaseModel):
     sku: Optional[str] = None
-    location_id: str
-    updated_at: Optional[datetime] = None
+    location_id: LowCardinalityStr
+    updated_at: Optional[Timestamp] = None
     available: Optional[float] = None
     tracked: bool
-    location_name: Optional[str] = None
+    location_name: Optional[LowCardinalityStr] = None
 
 config = IngestPipelineConfig(
     table=OlapConfig(
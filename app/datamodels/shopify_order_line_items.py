@@ -0,0 +1,38 @@
+from moose_lib import IngestPipeline, IngestPipelineConfig, OlapConfig
+from pydantic import BaseModel
+from typing import Optional
+
+from app.datamodels.column_types import LowCardinalityStr, Money, Timestamp
+
+# Shopify order line items, one row per line item of an order.
+# Produced from shopify_raw_orders by app/ingest/shopify_transforms.py; order-level columns
+# (created_at, currency, test) are copied onto each row so product analytics need no join.
+
+class ShopifyOrderLineItems(BaseModel):
+    id: str
+    order_id: str
+    order_created_at: Optional[Timestamp] = None
+    sku: Optional[str] = None
+    title: Optional[str] = None
+    vendor: Optional[LowCardinalityStr] = None
+    product_id: Optional[str] = None
+    variant_id: Optional[str] = None
+    quantity: int = 0
+    unit_price: Optional[Money] = None        # original unit price, shop currency
+    discounted_total: Optional[Money] = None  # line total after discounts, shop currency
+    currency: Optional[LowCardinalityStr] = None
+    test: Optional[bool] = None
+
+config = IngestPipelineConfig(
+    table=OlapConfig(
+        order_by_fields=["order_id", "id"],
+        deduplicate=True
+    ),
+    stream=True,
+    ingest=True
+)
+
+pipeline = IngestPipeline[ShopifyOrderLineItems](
+    "shopify_order_line_items",
+    config
+)
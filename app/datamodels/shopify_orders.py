@@ -1,7 +1,8 @@
-from moose_lib import IngestPipeline, IngestPipelineConfig, OlapConfig
+from moose_lib import IngestPipeline, IngestPipelineConfig, OlapConfig, SqlResource
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+
+from app.datamodels.column_types import LowCardinalityStr, Money, Timestamp
 
 # Shopify Orders data model for ingesting order information
 
@@ -9,23 +10,23 @@ class ShopifyOrders(BaseModel):
     id: str
     name: Optional[str] = None
     order_number: Optional[str] = None
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
-    processed_at: Optional[datetime] = None
-    cancelled_at: Optional[datetime] = None
-    closed_at: Optional[datetime] = None
+    created_at: Optional[Timestamp] = None
+    updated_at: Optional[Timestamp] = None
+    processed_at: Optional[Timestamp] = None
+    cancelled_at: Optional[Timestamp] = None
+    closed_at: Optional[Timestamp] = None
     
     # Financial information
-    total_price: Optional[float] = None
-    subtotal_price: Optional[float] = None
-    total_tax: Optional[float] = None
-    total_discounts: Optional[float] = None
-    currency: Optional[str] = None
-    presentment_currency: Optional[str] = None
+    total_price: Optional[Money] = None
+    subtotal_price: Optional[Money] = None
+    total_tax: Optional[Money] = None
+    total_discounts: Optional[Money] = None
+    currency: Optional[LowCardinalityStr] = None
+    presentment_currency: Optional[LowCardinalityStr] = None
     
     # Status fields
-    financial_status: Optional[str] = None
-    fulfillment_status: Optional[str] = None
+    financial_status: Optional[LowCardinalityStr] = None
+    fulfillment_status: Optional[LowCardinalityStr] = None
     confirmation_number: Optional[str] = None
     
     # Customer information
@@ -37,23 +38,23 @@ class ShopifyOrders(BaseModel):
     billing_address1: Optional[str] = None
     billing_address2: Optional[str] = None
     billing_city: Optional[str] = None
-    billing_province: Optional[str] = None
-    billing_country: Optional[str] = None
+    billing_province: Optional[LowCardinalityStr] = None
+    billing_country: Optional[LowCardinalityStr] = None
     billing_zip: Optional[str] = None
     
     # Address information (flattened shipping address)
     shipping_address1: Optional[str] = None
     shipping_address2: Optional[str] = None
     shipping_city: Optional[str] = None
-    shipping_province: Optional[str] = None
-    shipping_country: Optional[str] = None
+    shipping_province: Optional[LowCardinalityStr] = None
+    shipping_country: Optional[LowCardinalityStr] = None
     shipping_zip: Optional[str] = None
     
     # Order metadata
     test: Optional[bool] = None
-    tags: Optional[str] = None
+    tags: List[str] = []
     note: Optional[str] = None
-    source_name: Optional[str] = None
+    source_name: Optional[LowCardinalityStr] = None
     referring_site: Optional[str] = None
     
     # Line items summary
@@ -73,3 +74,14 @@ pipeline = IngestPipeline[ShopifyOrders](
     "shopify_orders",
     config
 )
+
+# Bloom-filter skip index on tags so has()/hasAny() tag filters skip granules
+tags_index = SqlResource(
+    "shopify_orders_tags_bloom_index",
+    setup=[
+        "ALTER TABLE shopify_orders ADD INDEX IF NOT EXISTS tags_bloom tags TYPE bloom_filter(0.01) GRANULARITY 4",
+        "ALTER TABLE shopify_orders MATERIALIZE INDEX tags_bloom",
+    ],
+    teardown=["ALTER TABLE shopify_orders DROP INDEX IF EXISTS tags_bloom"],
+    pulls_data_from=[pipeline.table],
+)
@@ -0,0 +1,145 @@
+from moose_lib import IngestPipeline, IngestPipelineConfig, StreamConfig
+from pydantic import BaseModel
+from typing import List, Optional
+
+# Raw Shopify GraphQL nodes, ingested as-is by app/scripts/shopify_ingest.py.
+# These pipelines have a stream but no table: the transforms in app/ingest/shopify_transforms.py
+# flatten each node into shopify_orders (+ shopify_order_line_items) / shopify_customers /
+# shopify_inventory_levels, so the
+# flattening scales with stream partitions and consumers instead of running in the client.
+# Field names follow the Admin GraphQL API (camelCase) so nodes can be forwarded untouched.
+
+class RawMoney(BaseModel):
+    amount: Optional[str] = None
+    currencyCode: Optional[str] = None
+
+class RawMoneyBag(BaseModel):
+    shopMoney: Optional[RawMoney] = None
+
+class RawMailingAddress(BaseModel):
+    address1: Optional[str] = None
+    address2: Optional[str] = None
+    city: Optional[str] = None
+    province: Optional[str] = None
+    country: Optional[str] = None
+    zip: Optional[str] = None
+
+class RawOrderCustomer(BaseModel):
+    id: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+
+class RawId(BaseModel):
+    id: Optional[str] = None
+
+class RawLineItem(BaseModel):
+    id: Optional[str] = None
+    sku: Optional[str] = None
+    title: Optional[str] = None
+    vendor: Optional[str] = None
+    quantity: Optional[int] = None
+    product: Optional[RawId] = None
+    variant: Optional[RawId] = None
+    originalUnitPriceSet: Optional[RawMoneyBag] = None
+    discountedTotalSet: Optional[RawMoneyBag] = None
+
+class RawLineItemEdge(BaseModel):
+    node: Optional[RawLineItem] = None
+
+class RawPageInfo(BaseModel):
+    hasNextPage: Optional[bool] = None
+    endCursor: Optional[str] = None
+
+# The ingest script follows pageInfo and merges every page into edges before forwarding
+class RawLineItemConnection(BaseModel):
+    edges: List[RawLineItemEdge] = []
+    pageInfo: Optional[RawPageInfo] = None
+
+class RawShopifyOrder(BaseModel):
+    id: str
+    name: Optional[str] = None
+    orderNumber: Optional[int] = None  # Order.number, an Int in the Admin API
+    createdAt: Optional[str] = None
+    updatedAt: Optional[str] = None
+    processedAt: Optional[str] = None
+    cancelledAt: Optional[str] = None
+    closedAt: Optional[str] = None
+    currentTotalPriceSet: Optional[RawMoneyBag] = None
+    subtotalPriceSet: Optional[RawMoneyBag] = None
+    totalTaxSet: Optional[RawMoneyBag] = None
+    totalDiscountsSet: Optional[RawMoneyBag] = None
+    presentmentCurrencyCode: Optional[str] = None
+    displayFinancialStatus: Optional[str] = None
+    displayFulfillmentStatus: Optional[str] = None
+    confirmationNumber: Optional[str] = None
+    customer: Optional[RawOrderCustomer] = None
+    billingAddress: Optional[RawMailingAddress] = None
+    shippingAddress: Optional[RawMailingAddress] = None
+    test: Optional[bool] = None
+    tags: List[str] = []
+    note: Optional[str] = None
+    sourceName: Optional[str] = None
+    referringSite: Optional[str] = None
+    lineItems: Optional[RawLineItemConnection] = None
+
+class RawShopifyCustomer(BaseModel):
+    id: str
+    email: Optional[str] = None
+    firstName: Optional[str] = None
+    lastName: Optional[str] = None
+    phone: Optional[str] = None
+    createdAt: Optional[str] = None
+    updatedAt: Optional[str] = None
+    verifiedEmail: Optional[bool] = None
+    state: Optional[str] = None
+    defaultAddress: Optional[RawMailingAddress] = None
+
+class RawLocation(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+
+class RawInventoryQuantity(BaseModel):
+    name: Optional[str] = None
+    quantity: Optional[float] = None
+
+class RawInventoryLevel(BaseModel):
+    location: Optional[RawLocation] = None
+    quantities: List[RawInventoryQuantity] = []
+
+class RawInventoryLevelEdge(BaseModel):
+    node: Optional[RawInventoryLevel] = None
+
+# Paged like lineItems: every page is merged into edges before forwarding
+class RawInventoryLevelConnection(BaseModel):
+    edges: List[RawInventoryLevelEdge] = []
+    pageInfo: Optional[RawPageInfo] = None
+
+class RawShopifyInventoryItem(BaseModel):
+    id: Optional[str] = None  # needed to fetch further inventoryLevels pages
+    sku: Optional[str] = None
+    tracked: Optional[bool] = None
+    inventoryLevels: Optional[RawInventoryLevelConnection] = None
+    # Set by the client: GraphQL has no per-level timestamp, so this becomes updated_at
+    fetchedAt: Optional[str] = None
+
+# Stream-only pipelines; parallelism sets the partition count the transforms scale across
+config = IngestPipelineConfig(
+    table=False,
+    stream=StreamConfig(parallelism=4),
+    ingest=True
+)
+
+raw_orders_pipeline = IngestPipeline[RawShopifyOrder](
+    "shopify_raw_orders",
+    config
+)
+
+raw_customers_pipeline = IngestPipeline[RawShopifyCustomer](
+    "shopify_raw_customers",
+    config
+)
+
+raw_inventory_items_pipeline = IngestPipeline[RawShopifyInventoryItem](
+    "shopify_raw_inventory_items",
+    config
+)
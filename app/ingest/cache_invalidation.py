@@ -0,0 +1,52 @@
+"""
+Stream consumers that bump the per-table data version used by the API response cache.
+
+Records landing on an ingest stream increment the version of their table, so cached
+responses that read that table (directly or through a rollup view) stop being served.
+Bumps are debounced to one per table every CACHE_BUMP_INTERVAL_SECONDS per process, so a
+burst of records costs one Redis round trip rather than one per row.
+The stream-to-table sync runs alongside these consumers, so a bump can land before the
+rows do; responses are neither cached nor answered as not-modified for
+CACHE_SYNC_GRACE_SECONDS after a bump (see app/utils/cache.py). A record skipped by the
+debounce arrived at most one interval after the last bump, so the grace window must cover
+the sync delay plus the interval.
+"""
+import logging
+import os
+import time
+
+import redis
+
+from app.datamodels.shopify_inventory_levels import pipeline as shopify_inventory_levels_pipeline
+from app.datamodels.shopify_customers import pipeline as shopify_customers_pipeline
+from app.datamodels.shopify_orders import pipeline as shopify_orders_pipeline
+from app.datamodels.shopify_order_line_items import pipeline as shopify_order_line_items_pipeline
+from app.utils.cache import bump_table_version
+
+logger = logging.getLogger(__name__)
+
+# Minimum time between two version bumps of the same table
+BUMP_INTERVAL_SECONDS = float(os.getenv("CACHE_BUMP_INTERVAL_SECONDS", "1"))
+
+
+def invalidate_table(table: str):
+    last_bump = 0.0
+
+    def consumer(record) -> None:
+        nonlocal last_bump
+        now = time.monotonic()
+        if now - last_bump < BUMP_INTERVAL_SECONDS:
+            return
+        try:
+            bump_table_version(table)
+            last_bump = now
+        except redis.RedisError as e:
+            # last_bump is left alone, so the next record tries again
+            logger.warning("cache_invalidation_failed table=%s error=%s", table, e)
+    return consumer
+
+
+shopify_inventory_levels_pipeline.stream.add_consumer(invalidate_table("shopify_inventory_levels"))
+shopify_customers_pipeline.stream.add_consumer(invalidate_table("shopify_customers"))
+shopify_orders_pipeline.stream.add_consumer(invalidate_table("shopify_orders"))
+shopify_order_line_items_pipeline.stream.add_consumer(invalidate_table("shopify_order_line_items"))
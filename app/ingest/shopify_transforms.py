@@ -0,0 +1,161 @@
+"""
+Streaming transforms that flatten raw Shopify GraphQL nodes into the table models.
+
+    shopify_raw_orders          -> shopify_orders
+                                -> shopify_order_line_items (one row per line item)
+    shopify_raw_customers       -> shopify_customers
+    shopify_raw_inventory_items -> shopify_inventory_levels (one row per location)
+
+They run in Moose's streaming workers, one consumer per stream partition, so flattening
+scales with the partition count instead of the ingest client. Their output lands on the
+regular table streams, where cache invalidation and the table sync pick it up as before.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.datamodels.shopify_customers import ShopifyCustomers, pipeline as shopify_customers_pipeline
+from app.datamodels.shopify_inventory_levels import ShopifyInventoryLevels, pipeline as shopify_inventory_levels_pipeline
+from app.datamodels.shopify_order_line_items import ShopifyOrderLineItems, pipeline as shopify_order_line_items_pipeline
+from app.datamodels.shopify_orders import ShopifyOrders, pipeline as shopify_orders_pipeline
+from app.datamodels.shopify_raw import (
+    RawMailingAddress,
+    RawMoneyBag,
+    RawShopifyCustomer,
+    RawShopifyInventoryItem,
+    RawShopifyOrder,
+    raw_customers_pipeline,
+    raw_inventory_items_pipeline,
+    raw_orders_pipeline,
+)
+
+
+def shop_amount(money: Optional[RawMoneyBag]) -> Optional[str]:
+    """Shop-currency amount of a MoneyBag as a decimal string (kept exact for Decimal columns)."""
+    if money is None or money.shopMoney is None:
+        return None
+    return money.shopMoney.amount or None
+
+
+def flatten_order(order: RawShopifyOrder) -> ShopifyOrders:
+    customer = order.customer
+    billing = order.billingAddress or RawMailingAddress()
+    shipping = order.shippingAddress or RawMailingAddress()
+    shop_money = order.currentTotalPriceSet.shopMoney if order.currentTotalPriceSet else None
+    line_items = [edge.node for edge in (order.lineItems.edges if order.lineItems else []) if edge.node]
+    total_quantity = sum(item.quantity or 0 for item in line_items)
+
+    return ShopifyOrders(
+        id=order.id,
+        name=order.name,
+        order_number=str(order.orderNumber) if order.orderNumber is not None else None,
+        created_at=order.createdAt,
+        updated_at=order.updatedAt,
+        processed_at=order.processedAt,
+        cancelled_at=order.cancelledAt,
+        closed_at=order.closedAt,
+        total_price=shop_amount(order.currentTotalPriceSet),
+        subtotal_price=shop_amount(order.subtotalPriceSet),
+        total_tax=shop_amount(order.totalTaxSet),
+        total_discounts=shop_amount(order.totalDiscountsSet),
+        currency=shop_money.currencyCode if shop_money else None,
+        presentment_currency=order.presentmentCurrencyCode,
+        financial_status=order.displayFinancialStatus,
+        fulfillment_status=order.displayFulfillmentStatus,
+        confirmation_number=order.confirmationNumber,
+        customer_id=customer.id if customer else None,
+        customer_email=customer.email if customer else None,
+        customer_phone=customer.phone if customer else None,
+        billing_address1=billing.address1,
+        billing_address2=billing.address2,
+        billing_city=billing.city,
+        billing_province=billing.province,
+        billing_country=billing.country,
+        billing_zip=billing.zip,
+        shipping_address1=shipping.address1,
+        shipping_address2=shipping.address2,
+        shipping_city=shipping.city,
+        shipping_province=shipping.province,
+        shipping_country=shipping.country,
+        shipping_zip=shipping.zip,
+        test=order.test,
+        tags=order.tags or [],
+        note=order.note,
+        source_name=order.sourceName,
+        referring_site=order.referringSite,
+        total_line_items_quantity=total_quantity if total_quantity > 0 else None,
+        # NULL rather than 0 when the line_items group was dropped from the fetch
+        line_items_count=len(line_items) if order.lineItems is not None else None,
+    )
+
+
+def explode_line_items(order: RawShopifyOrder) -> List[ShopifyOrderLineItems]:
+    """One row per line item; the client has already merged every lineItems page into edges."""
+    shop_money = order.currentTotalPriceSet.shopMoney if order.currentTotalPriceSet else None
+    rows = []
+    for edge in order.lineItems.edges if order.lineItems else []:
+        item = edge.node
+        if item is None or not item.id:
+            continue
+        rows.append(ShopifyOrderLineItems(
+            id=item.id,
+            order_id=order.id,
+            order_created_at=order.createdAt,
+            sku=item.sku,
+            title=item.title,
+            vendor=item.vendor,
+            product_id=item.product.id if item.product else None,
+            variant_id=item.variant.id if item.variant else None,
+            quantity=item.quantity or 0,
+            unit_price=shop_amount(item.originalUnitPriceSet),
+            discounted_total=shop_amount(item.discountedTotalSet),
+            currency=shop_money.currencyCode if shop_money else None,
+            test=order.test,
+        ))
+    return rows
+
+
+def flatten_customer(customer: RawShopifyCustomer) -> ShopifyCustomers:
+    address = customer.defaultAddress or RawMailingAddress()
+    return ShopifyCustomers(
+        id=customer.id,
+        email=customer.email,
+        first_name=customer.firstName,
+        last_name=customer.lastName,
+        phone=customer.phone,
+        created_at=customer.createdAt,
+        updated_at=customer.updatedAt,
+        verified_email=customer.verifiedEmail,
+        state=customer.state,
+        address1=address.address1,
+        address2=address.address2,
+        city=address.city,
+        province=address.province,
+        country=address.country,
+        zip=address.zip,
+    )
+
+
+def flatten_inventory_item(item: RawShopifyInventoryItem) -> List[ShopifyInventoryLevels]:
+    """One inventory level row per location holding the item."""
+    updated_at = item.fetchedAt or datetime.now(timezone.utc)
+    rows = []
+    for edge in item.inventoryLevels.edges if item.inventoryLevels else []:
+        level = edge.node
+        if level is None or level.location is None or not level.location.id:
+            continue
+        available = next((q.quantity for q in level.quantities if q.name == "available"), None)
+        rows.append(ShopifyInventoryLevels(
+            sku=item.sku,
+            tracked=bool(item.tracked),
+            available=available,
+            location_id=level.location.id,
+            location_name=level.location.name,
+            updated_at=updated_at,
+        ))
+    return rows
+
+
+raw_orders_pipeline.stream.add_transform(shopify_orders_pipeline.stream, flatten_order)
+raw_orders_pipeline.stream.add_transform(shopify_order_line_items_pipeline.stream, explode_line_items)
+raw_customers_pipeline.stream.add_transform(shopify_customers_pipeline.stream, flatten_customer)
+raw_inventory_items_pipeline.stream.add_transform(shopify_inventory_levels_pipeline.stream, flatten_inventory_item)
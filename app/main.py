@@ -8,6 +8,21 @@ Register datamodels, views, and apis here when added.
 from app.datamodels.shopify_inventory_levels import pipeline as shopify_inventory_levels_pipeline  # noqa: F401
 from app.datamodels.shopify_customers import pipeline as shopify_customers_pipeline  # noqa: F401
 from app.datamodels.shopify_orders import pipeline as shopify_orders_pipeline  # noqa: F401
+from app.datamodels.shopify_order_line_items import pipeline as shopify_order_line_items_pipeline  # noqa: F401
+from app.datamodels.shopify_raw import raw_orders_pipeline, raw_customers_pipeline, raw_inventory_items_pipeline  # noqa: F401
+
+# Views / Materialized Views
+from app.views.order_daily_rollup import order_daily_rollup_mv, order_daily_rollup_backfill  # noqa: F401
+from app.views.customer_ltv import customer_ltv_mv, customer_ltv_backfill  # noqa: F401
+from app.views.customer_segment_rollup import customer_segment_rollup_mv, customer_segment_rollup_backfill  # noqa: F401
+from app.views.sku_sales_rollup import sku_sales_rollup_mv, sku_sales_rollup_backfill  # noqa: F401
+from app.views.order_sample import orders_sample  # noqa: F401
+from app.views.customer_dictionary import customers_dictionary, orders_enriched_view  # noqa: F401
+from app.views.inventory_rollups import inventory_latest_mv, inventory_latest_levels_view, inventory_location_totals_view  # noqa: F401
+
+# Stream consumers / transforms
+from app.ingest import cache_invalidation  # noqa: F401
+from app.ingest import shopify_transforms  # noqa: F401
 
 # If you add more pipelines or APIs, import them here to ensure they are discoverable
 
@@ -19,10 +34,20 @@ from app.datamodels.shopify_orders import pipeline as shopify_orders_pipeline  #
 import app.datamodels.shopify_inventory_levels as shopify_inventory_levels_datamodels
 import app.datamodels.shopify_customers as shopify_customers_datamodels
 import app.datamodels.shopify_orders as shopify_orders_datamodels
+import app.datamodels.shopify_raw as shopify_raw_datamodels
+import app.datamodels.shopify_order_line_items as shopify_order_line_items_datamodels
 
 import app.apis.__init__ as __init___apis
 import app.apis.get_customers_by_email as get_customers_by_email_apis
 import app.apis.get_shopify_customers as get_shopify_customers_apis
 import app.apis.get_shopify_inventory_levels as get_shopify_inventory_levels_apis
 import app.apis.get_shopify_orders as get_shopify_orders_apis
+import app.apis.get_shopify_customer_ltv as get_shopify_customer_ltv_apis
+import app.apis.get_shopify_inventory_rollups as get_shopify_inventory_rollups_apis
+import app.apis.get_shopify_customer_with_orders as get_shopify_customer_with_orders_apis
+import app.apis.get_consumption_cache_stats as get_consumption_cache_stats_apis
+import app.apis.get_consumption_query_stats as get_consumption_query_stats_apis
+import app.apis.get_consumption_single_flight_stats as get_consumption_single_flight_stats_apis
+import app.apis.get_shopify_data_version as get_shopify_data_version_apis
+import app.apis.get_shopify_sku_sales as get_shopify_sku_sales_apis
 
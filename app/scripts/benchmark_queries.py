@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the consumption API query functions on synthetic Shopify data.
+
+For each scale (default 1M, 10M and 50M orders) the script recreates a scratch database
+on a local ClickHouse server (e.g. `clickhouse server` from the standalone binary, or the
+Moose dev container), creates the datamodel tables plus the rollups, sample table and
+dictionary the APIs read, and loads deterministic synthetic data generated server-side:
+`rows` orders with two line items each, rows/5 customers and rows/10 inventory snapshots. Every query function in
+app/apis is then run with representative parameters through BenchClient, a stand-in for
+the Moose client, and the median latency, rows read and bytes read of each case are
+reported. Response cache, single-flight and instrumentation wrappers are bypassed.
+
+    python app/scripts/benchmark_queries.py
+    python app/scripts/benchmark_queries.py --scales 1000000 --repeat 10 --json bench-1m.json
+    python app/scripts/benchmark_queries.py --scales 10000000 --only orders_by_date,order_analytics_day
+
+Connection settings come from CLICKHOUSE_* / [clickhouse_config]; data goes to --database
+(default shopify_bench), which is dropped and recreated for every scale.
+
+Table DDL is generated from the datamodel and view models and their OlapConfig (column types,
+engine, sorting key), so it follows schema changes; rollup selects, views, the sample table
+and the dictionary come from app/views.
+"""
+import argparse
+import inspect
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from types import UnionType
+from typing import Annotated, Any, Callable, Dict, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+import orjson
+from dotenv import load_dotenv
+
+from clickhouse_http import ClickHouseHttp, load_clickhouse_config
+
+# Query functions and view definitions live in the app package at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Synthetic data spans this many seconds before now(), so days_back filters hit real rows
+DATA_SPAN_SECONDS = 2 * 365 * 86400
+LOCATION_COUNT = 50
+
+# Fresh numbers on every run: no query cache, and the summary header is only sent
+# (complete) once the query has finished
+BENCH_SETTINGS = {"use_query_cache": 0, "wait_end_of_query": 1}
+
+# Python types of datamodel fields and the ClickHouse types Moose creates for them
+SCALAR_TYPES = {str: "String", int: "Int64", float: "Float64", bool: "Bool", datetime: "DateTime", date: "Date"}
+
+
+def _decimal_args(meta: Any) -> Optional[Tuple[int, int]]:
+    """(precision, scale) of a clickhouse_decimal() Field, which may nest its constraints."""
+    for item in [meta, *getattr(meta, "metadata", [])]:
+        precision, scale = getattr(item, "max_digits", None), getattr(item, "decimal_places", None)
+        if precision is not None and scale is not None:
+            return precision, scale
+    return None
+
+
+def column_type(annotation: Any) -> str:
+    """ClickHouse column type (with its CODEC, if any) of a datamodel field annotation."""
+    nullable = low_cardinality = False
+    codec = decimal = aggregate = None
+    while True:
+        origin = get_origin(annotation)
+        if origin is Annotated:
+            annotation, *metadata = get_args(annotation)
+            for meta in metadata:
+                if meta == "LowCardinality":
+                    low_cardinality = True
+                elif hasattr(meta, "agg_func"):
+                    aggregate = meta
+                elif type(meta).__name__ == "ClickHouseCodec":
+                    codec = meta.expression
+                else:
+                    decimal = _decimal_args(meta) or decimal
+        elif origin in (Union, UnionType) and type(None) in get_args(annotation):
+            nullable = True
+            annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+        else:
+            break
+    if aggregate is not None:
+        params = "".join(f", {column_type(param)}" for param in aggregate.param_types)
+        return f"AggregateFunction({aggregate.agg_func}{params})"
+    if get_origin(annotation) in (list, List):
+        base = f"Array({column_type(get_args(annotation)[0])})"
+    elif decimal is not None:
+        base = f"Decimal({decimal[0]}, {decimal[1]})"
+    else:
+        base = SCALAR_TYPES[annotation]
+    if nullable:
+        base = f"Nullable({base})"
+    if low_cardinality:
+        base = f"LowCardinality({base})"
+    return f"{base} CODEC({codec})" if codec else base
+
+
+def table_ddl(name: str, model: Any, config: Any) -> str:
+    """CREATE TABLE for a datamodel or view model and its OlapConfig, as Moose creates it."""
+    hints = get_type_hints(model, include_extras=True)
+    columns = {field: column_type(hints[field]) for field in model.model_fields}
+    if getattr(config, "engine", None) is not None:
+        engine = config.engine.name
+    else:
+        engine = "ReplacingMergeTree" if config.deduplicate else "MergeTree"
+    order_by = list(config.order_by_fields)
+    ddl = (
+        f"CREATE TABLE {name} ({', '.join(f'{c} {t}' for c, t in columns.items())}) "
+        f"ENGINE = {engine} ORDER BY ({', '.join(order_by)})"
+    )
+    if any("Nullable(" in columns[c] for c in order_by):
+        ddl += " SETTINGS allow_nullable_key = 1"
+    return ddl
+
+
+def schema_ddl() -> List[str]:
+    """Base tables from app/datamodels, then the materialized-view targets from app/views."""
+    from app.datamodels import shopify_customers, shopify_inventory_levels, shopify_order_line_items, shopify_orders
+    from app.views import customer_ltv, customer_segment_rollup, inventory_rollups, order_daily_rollup, sku_sales_rollup
+
+    tables = [
+        ("shopify_orders", shopify_orders.ShopifyOrders, shopify_orders.config.table),
+        ("shopify_customers", shopify_customers.ShopifyCustomers, shopify_customers.config.table),
+        ("shopify_inventory_levels", shopify_inventory_levels.ShopifyInventoryLevels, shopify_inventory_levels.config.table),
+        ("shopify_order_line_items", shopify_order_line_items.ShopifyOrderLineItems, shopify_order_line_items.config.table),
+    ]
+    for model, mv in (
+        (order_daily_rollup.OrderDailyRollup, order_daily_rollup.order_daily_rollup_mv),
+        (customer_ltv.CustomerLifetimeValue, customer_ltv.customer_ltv_mv),
+        (customer_segment_rollup.CustomerSegmentRollup, customer_segment_rollup.customer_segment_rollup_mv),
+        (inventory_rollups.InventoryLatestByLocation, inventory_rollups.inventory_latest_mv),
+        (sku_sales_rollup.SkuSalesDaily, sku_sales_rollup.sku_sales_rollup_mv),
+    ):
+        tables.append((mv.target_table.name, model, mv.target_table.config))
+    return [table_ddl(name, model, config) for name, model, config in tables]
+
+ORDERS_INSERT = (
+    "INSERT INTO shopify_orders (id, name, order_number, created_at, updated_at, processed_at, "
+    "total_price, subtotal_price, total_tax, total_discounts, currency, presentment_currency, "
+    "financial_status, fulfillment_status, customer_id, customer_email, billing_city, billing_province, "
+    "billing_country, shipping_city, shipping_province, shipping_country, test, tags, source_name, "
+    "total_line_items_quantity, line_items_count) "
+    "SELECT concat('gid://shopify/Order/', toString(number)), "
+    "concat('#', toString(1000 + number)), toString(1000 + number), "
+    "created, created + cityHash64(number, 1) % 604800, created + cityHash64(number, 2) % 600, "
+    "price, round(price / 1.1, 2), round(price - price / 1.1, 2), if(cityHash64(number, 4) % 5 = 0, 5, 0), "
+    "currency, currency, "
+    "['PAID', 'PAID', 'PAID', 'PENDING', 'REFUNDED', 'PARTIALLY_REFUNDED', 'AUTHORIZED'][cityHash64(number, 6) % 7 + 1], "
+    "['FULFILLED', 'FULFILLED', 'UNFULFILLED', 'PARTIALLY_FULFILLED'][cityHash64(number, 7) % 4 + 1], "
+    "concat('gid://shopify/Customer/', toString(customer)), concat('customer', toString(customer), '@example.com'), "
+    "concat('City ', toString(customer % 500)), concat('Province ', toString(customer % 60)), country, "
+    "concat('City ', toString(customer % 500)), concat('Province ', toString(customer % 60)), country, "
+    "cityHash64(number, 12) % 100 = 0, "
+    "arraySlice(['wholesale', 'vip', 'subscription', 'gift', 'b2b'], cityHash64(number, 13) % 5 + 1, cityHash64(number, 14) % 3), "
+    "['web', 'web', 'pos', 'shopify_draft_order', 'iphone'][cityHash64(number, 11) % 5 + 1], "
+    "cityHash64(number, 15) % 10 + 1, cityHash64(number, 16) % 5 + 1 "
+    "FROM ("
+    "SELECT number, "
+    "toDateTime(now() - {span:UInt32}) + intDiv(number * {span:UInt64}, {rows:UInt64}) AS created, "
+    "round((cityHash64(number, 3) % 50000) / 100, 2) AS price, "
+    "['USD', 'USD', 'USD', 'CAD', 'EUR', 'GBP', 'AUD'][cityHash64(number, 5) % 7 + 1] AS currency, "
+    "cityHash64(number, 8) % {customers:UInt64} AS customer, "
+    "['United States', 'United States', 'Canada', 'Germany', 'United Kingdom', 'Australia', 'France'][customer % 7 + 1] AS country "
+    "FROM numbers({rows:UInt64}))"
+)
+
+CUSTOMERS_INSERT = (
+    "INSERT INTO shopify_customers (id, email, first_name, last_name, created_at, updated_at, "
+    "verified_email, state, city, province, country) "
+    "SELECT concat('gid://shopify/Customer/', toString(number)), concat('customer', toString(number), '@example.com'), "
+    "concat('First', toString(number % 1000)), concat('Last', toString(number % 5000)), "
+    "created, created + cityHash64(number, 1) % 2592000, cityHash64(number, 2) % 10 < 8, "
+    "['ENABLED', 'ENABLED', 'DISABLED', 'INVITED'][cityHash64(number, 3) % 4 + 1], "
+    "concat('City ', toString(number % 500)), concat('Province ', toString(number % 60)), "
+    "['United States', 'United States', 'Canada', 'Germany', 'United Kingdom', 'Australia', 'France'][number % 7 + 1] "
+    "FROM (SELECT number, toDateTime(now() - {span:UInt32}) + intDiv(number * {span:UInt64}, {customers:UInt64}) AS created "
+    "FROM numbers({customers:UInt64}))"
+)
+
+INVENTORY_INSERT = (
+    "INSERT INTO shopify_inventory_levels (sku, location_id, updated_at, available, tracked, location_name) "
+    "SELECT concat('SKU-', toString(number % {skus:UInt64})), "
+    "concat('gid://shopify/Location/', toString(location)), "
+    "toDateTime(now() - {span:UInt32}) + intDiv(number * {span:UInt64}, {snapshots:UInt64}), "
+    "toFloat64(cityHash64(number, 1) % 120) - 10, cityHash64(number, 2) % 10 != 0, "
+    "concat('Warehouse ', toString(location)) "
+    "FROM (SELECT number, intDiv(number, {skus:UInt64}) % {locations:UInt64} AS location FROM numbers({snapshots:UInt64}))"
+)
+
+
+# Two line items per order; order columns are recomputed from the order number with the
+# same expressions as ORDERS_INSERT (no join against shopify_orders)
+LINE_ITEMS_INSERT = (
+    "INSERT INTO shopify_order_line_items (id, order_id, order_created_at, sku, title, vendor, product_id, "
+    "variant_id, quantity, unit_price, discounted_total, currency, test) "
+    "SELECT concat('gid://shopify/LineItem/', toString(number)), concat('gid://shopify/Order/', toString(o)), "
+    "toDateTime(now() - {span:UInt32}) + intDiv(o * {span:UInt64}, {rows:UInt64}), "
+    "concat('SKU-', toString(product)), concat('Product ', toString(product)), "
+    "concat('Vendor ', toString(product % 40)), concat('gid://shopify/Product/', toString(product)), "
+    "concat('gid://shopify/ProductVariant/', toString(product)), qty, round(line_total / qty, 2), line_total, "
+    "['USD', 'USD', 'USD', 'CAD', 'EUR', 'GBP', 'AUD'][cityHash64(o, 5) % 7 + 1], cityHash64(o, 12) % 100 = 0 "
+    "FROM (SELECT number, intDiv(number, 2) AS o, cityHash64(number, 21) % {skus:UInt64} AS product, "
+    "cityHash64(number, 22) % 3 + 1 AS qty, round((cityHash64(o, 3) % 50000) / 200, 2) AS line_total "
+    "FROM numbers({line_items:UInt64}))"
+)
+
+
+def clickhouse_type(value: Any) -> str:
+    """Parameter type the Moose client would bind for a Python value."""
+    if isinstance(value, str):
+        return "String"
+    if isinstance(value, int):
+        return "Int64"
+    if isinstance(value, float):
+        return "Float64"
+    raise TypeError(f"Unsupported query parameter type: {type(value).__name__}")
+
+
+class BenchQuery:
+    """Stand-in for the Moose `client.query`: `{name}` placeholders become typed server-side parameters."""
+
+    def __init__(self, ch: ClickHouseHttp) -> None:
+        self.ch = ch
+        self.read_rows = 0
+        self.read_bytes = 0
+
+    def execute(self, sql: str, variables: Dict[str, Any]) -> List[Dict[str, Any]]:
+        placeholders = {name: f"{{{name}:{clickhouse_type(value)}}}" for name, value in variables.items()}
+        values = {name: int(value) if isinstance(value, bool) else value for name, value in variables.items()}
+        rows, summary = self.ch.query_with_summary(sql.format_map(placeholders), values, BENCH_SETTINGS)
+        self.read_rows += int(summary.get("read_rows", 0))
+        self.read_bytes += int(summary.get("read_bytes", 0))
+        return rows
+
+
+class BenchClient:
+    def __init__(self, ch: ClickHouseHttp) -> None:
+        self.query = BenchQuery(ch)
+
+
+def create_schema(ch: ClickHouseHttp) -> None:
+    from app.datamodels.shopify_orders import tags_index
+    from app.views import customer_ltv, customer_segment_rollup, inventory_rollups, order_daily_rollup, sku_sales_rollup
+    from app.views.customer_dictionary import create_sql as customers_dictionary_sql
+    from app.views.order_sample import orders_sample
+
+    for ddl in schema_ddl():
+        ch.command(ddl)
+    for target, module in (
+        ("shopify_orders_daily_rollup", order_daily_rollup),
+        ("shopify_customer_ltv", customer_ltv),
+        ("shopify_customer_segments", customer_segment_rollup),
+        ("shopify_inventory_latest", inventory_rollups),
+        ("shopify_sku_sales_daily", sku_sales_rollup),
+    ):
+        ch.command(f"CREATE MATERIALIZED VIEW {target}_mv TO {target} AS {module.select_sql}")
+    ch.command(f"CREATE VIEW shopify_inventory_latest_levels AS {inventory_rollups.latest_levels_sql}")
+    ch.command(f"CREATE VIEW shopify_inventory_location_totals AS {inventory_rollups.location_totals_sql}")
+    for statement in list(orders_sample.setup) + list(tags_index.setup):
+        ch.command(statement)
+    ch.command(customers_dictionary_sql)
+
+
+def load_data(ch: ClickHouseHttp, rows: int) -> Dict[str, float]:
+    customers = max(rows // 5, 1)
+    snapshots = max(rows // 10, 1)
+    skus = max(snapshots // (LOCATION_COUNT * 4), 1)
+    params = {
+        "rows": rows, "customers": customers, "snapshots": snapshots, "skus": skus, "line_items": rows * 2,
+        "locations": LOCATION_COUNT, "span": DATA_SPAN_SECONDS,
+    }
+    timings = {}
+    for table, sql in (
+        ("shopify_customers", CUSTOMERS_INSERT),
+        ("shopify_orders", ORDERS_INSERT),
+        ("shopify_inventory_levels", INVENTORY_INSERT),
+        ("shopify_order_line_items", LINE_ITEMS_INSERT),
+    ):
+        start = time.perf_counter()
+        ch.command(sql, params)
+        timings[table] = time.perf_counter() - start
+    ch.command("SYSTEM RELOAD DICTIONARY shopify_customers_dict")
+    return timings
+
+
+def bench_cases(rows: int) -> List[Tuple[str, Callable, Any]]:
+    """(case name, query function, params) for every consumption query function."""
+    from app.apis import get_customers_by_email as by_email
+    from app.apis import get_shopify_customer_ltv as ltv
+    from app.apis import get_shopify_customer_with_orders as with_orders
+    from app.apis import get_shopify_customers as customers
+    from app.apis import get_shopify_inventory_levels as inventory
+    from app.apis import get_shopify_inventory_rollups as inventory_rollups
+    from app.apis import get_shopify_orders as orders
+    from app.apis import get_shopify_sku_sales as sku_sales
+
+    customer_count = max(rows // 5, 1)
+    order_id = f"gid://shopify/Order/{rows // 2}"
+    customer = customer_count // 2
+    customer_id = f"gid://shopify/Customer/{customer}"
+    email = f"customer{customer}@example.com"
+    order_batch = ",".join(f"gid://shopify/Order/{n}" for n in range(0, rows, max(rows // 50, 1)))
+    email_batch = ",".join(f"customer{n}@example.com" for n in range(0, customer_count, max(customer_count // 50, 1)))
+
+    return [
+        ("order_lookup_id", orders.get_order_lookup_query, orders.OrderLookupQuery(order_id=order_id)),
+        ("order_lookup_batch_50", orders.get_order_lookup_query, orders.OrderLookupQuery(order_ids=order_batch)),
+        (
+            "order_lookup_with_customer", orders.get_order_lookup_query,
+            orders.OrderLookupQuery(order_id=order_id, include_customer=True),
+        ),
+        ("orders_by_date", orders.get_orders_by_date_query, orders.OrdersByDateQuery(days_back=7)),
+        ("orders_by_date_any_tag", orders.get_orders_by_date_query, orders.OrdersByDateQuery(days_back=30, any_tag="vip,b2b")),
+        ("orders_by_customer_id", orders.get_orders_by_customer_query, orders.OrdersByCustomerQuery(customer_id=customer_id)),
+        ("orders_by_customer_email", orders.get_orders_by_customer_query, orders.OrdersByCustomerQuery(customer_email=email)),
+        (
+            "orders_by_status", orders.get_orders_by_status_query,
+            orders.OrdersByStatusQuery(financial_status="PAID", fulfillment_status="UNFULFILLED"),
+        ),
+        ("order_analytics_day", orders.get_order_analytics_query, orders.OrderAnalyticsQuery(days_back=30, group_by="day")),
+        ("order_analytics_month", orders.get_order_analytics_query, orders.OrderAnalyticsQuery(days_back=730, group_by="month")),
+        (
+            "order_analytics_approx", orders.get_order_analytics_query,
+            orders.OrderAnalyticsQuery(days_back=730, group_by="month", approx=True),
+        ),
+        ("customer_lookup_email", customers.get_customer_lookup_query, customers.CustomerLookupQuery(email=email)),
+        ("customer_lookup_batch_50", customers.get_customer_lookup_query, customers.CustomerLookupQuery(emails=email_batch)),
+        (
+            "customer_segmentation", customers.get_customer_segmentation_query,
+            customers.CustomerSegmentationQuery(country="Canada"),
+        ),
+        ("customer_activity", customers.get_customer_activity_query, customers.CustomerActivityQuery(days_back=30)),
+        (
+            "customer_segment_summary", customers.get_customer_segment_summary_query,
+            customers.CustomerSegmentSummaryQuery(group_by="province", country="Canada"),
+        ),
+        ("customers_by_email", by_email.get_customers_by_email, by_email.CustomersByEmailQuery(email=email)),
+        ("customer_ltv_top", ltv.get_customer_ltv_query, ltv.CustomerLTVQuery(min_orders=2, order_by="total_spent")),
+        ("customer_ltv_id", ltv.get_customer_ltv_query, ltv.CustomerLTVQuery(customer_id=customer_id)),
+        (
+            "customer_with_orders", with_orders.get_customer_with_orders_query,
+            with_orders.CustomerWithOrdersQuery(email=email, orders_limit=10),
+        ),
+        ("inventory_levels", inventory.get_shopify_inventory_levels_query, inventory.InventoryLevelsQuery()),
+        (
+            "inventory_by_location", inventory_rollups.get_inventory_by_location_query,
+            inventory_rollups.InventoryByLocationQuery(),
+        ),
+        (
+            "inventory_low_stock", inventory_rollups.get_low_stock_query,
+            inventory_rollups.LowStockQuery(location_id="gid://shopify/Location/1", threshold=5),
+        ),
+        ("sku_sales_top", sku_sales.get_sku_sales_query, sku_sales.SkuSalesQuery(days_back=90, order_by="revenue")),
+        ("sku_sales_one_sku", sku_sales.get_sku_sales_query, sku_sales.SkuSalesQuery(sku="SKU-1", days_back=365)),
+    ]
+
+
+def run_case(ch: ClickHouseHttp, query_function: Callable, params: Any, repeat: int) -> Dict[str, Any]:
+    """Median/min/max latency plus rows and bytes read of `repeat` runs of the undecorated function."""
+    raw_function = inspect.unwrap(query_function)
+    timings = []
+    for _ in range(max(repeat, 1)):
+        client = BenchClient(ch)
+        start = time.perf_counter()
+        result = raw_function(client, params)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "read_rows": client.query.read_rows,
+        "read_bytes": client.query.read_bytes,
+        "result_rows": len(result) if hasattr(result, "__len__") else 0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark consumption query functions on synthetic data")
+    parser.add_argument("--scales", default="1000000,10000000,50000000", help="Comma-separated order counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (median reported)")
+    parser.add_argument("--database", default="shopify_bench", help="Scratch database (dropped and recreated)")
+    parser.add_argument("--only", default=None, help="Comma-separated case names to run")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # The customers dictionary's source must point at the scratch database
+    os.environ["CLICKHOUSE_DB"] = args.database
+    cfg = load_clickhouse_config()
+    admin = ClickHouseHttp({**cfg, "database": "default"}, timeout=3600)
+    ch = ClickHouseHttp(cfg, timeout=3600)
+    only = {name.strip() for name in args.only.split(",")} if args.only else None
+
+    results: List[Dict[str, Any]] = []
+    try:
+        for rows in (int(s) for s in args.scales.split(",") if s.strip()):
+            admin.command(f"DROP DATABASE IF EXISTS {args.database}")
+            admin.command(f"CREATE DATABASE {args.database}")
+            create_schema(ch)
+            load_timings = load_data(ch, rows)
+            loaded = ", ".join(f"{table} {seconds:.1f}s" for table, seconds in load_timings.items())
+            print(f"\n== {rows:,} orders (loaded: {loaded}) ==")
+            print(f"{'case':<28} {'median ms':>10} {'min ms':>9} {'max ms':>9} {'rows read':>14} {'MiB read':>10} {'result':>7}")
+            for name, query_function, params in bench_cases(rows):
+                if only and name not in only:
+                    continue
+                stats = run_case(ch, query_function, params, args.repeat)
+                results.append({"scale": rows, "case": name, **stats})
+                print(
+                    f"{name:<28} {stats['median_ms']:>10.1f} {stats['min_ms']:>9.1f} {stats['max_ms']:>9.1f} "
+                    f"{stats['read_rows']:>14,} {stats['read_bytes'] / (1 << 20):>10.1f} {stats['result_rows']:>7}"
+                )
+    finally:
+        if not args.keep:
+            admin.command(f"DROP DATABASE IF EXISTS {args.database}")
+
+    if args.json_path:
+        with open(args.json_path, "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
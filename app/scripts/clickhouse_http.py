@@ -0,0 +1,128 @@
+"""
+Minimal ClickHouse HTTP-interface helpers for the scripts in this folder.
+
+Connection settings default to [clickhouse_config] in moose.config.toml and can be
+overridden with CLICKHOUSE_* environment variables. Queries use ClickHouse server-side
+parameters (`{name:Type}` placeholders, sent as `param_<name>`), never string formatting.
+"""
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+import requests
+
+
+def load_clickhouse_config() -> Dict[str, Any]:
+    use_ssl = os.getenv("CLICKHOUSE_USE_SSL", "false").lower() in ("1", "true", "yes")
+    return {
+        "host": os.getenv("CLICKHOUSE_HOST", "localhost"),
+        "port": int(os.getenv("CLICKHOUSE_PORT", "18123")),
+        "database": os.getenv("CLICKHOUSE_DB", "local"),
+        "user": os.getenv("CLICKHOUSE_USER", "panda"),
+        "password": os.getenv("CLICKHOUSE_PASSWORD", "pandapass"),
+        "use_ssl": use_ssl,
+    }
+
+
+class ClickHouseHttp:
+    """Thin wrapper over the ClickHouse HTTP interface using a pooled requests.Session."""
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None, timeout: int = 300) -> None:
+        self.cfg = cfg or load_clickhouse_config()
+        scheme = "https" if self.cfg["use_ssl"] else "http"
+        self.url = f"{scheme}://{self.cfg['host']}:{self.cfg['port']}/"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (self.cfg["user"], self.cfg["password"])
+
+    def _params(self, params: Optional[Dict[str, Any]], settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        query_params: Dict[str, Any] = {"database": self.cfg["database"]}
+        for name, value in (params or {}).items():
+            query_params[f"param_{name}"] = value
+        query_params.update(settings or {})
+        return query_params
+
+    def stream(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        settings: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 1 << 20,
+    ) -> Iterator[bytes]:
+        """Run `sql` and yield the raw response body in chunks (never buffered whole)."""
+        with self.session.post(
+            self.url,
+            params=self._params(params, settings),
+            data=sql.encode(),
+            stream=True,
+            timeout=self.timeout,
+        ) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    yield chunk
+
+    def query_rows(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        settings: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Run a small query and return its rows as dicts (FORMAT JSONEachRow is appended)."""
+        rows, _ = self.query_with_summary(sql, params, settings)
+        return rows
+
+    def query_with_summary(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        settings: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Like query_rows, plus the parsed X-ClickHouse-Summary header (read_rows, read_bytes, ...).
+
+        The summary is only complete when the server waits for the end of the query before
+        answering; pass `wait_end_of_query=1` in `settings` when the counters matter.
+        """
+        r = self.session.post(
+            self.url,
+            params=self._params(params, settings),
+            data=f"{sql} FORMAT JSONEachRow".encode(),
+            timeout=self.timeout,
+        )
+        r.raise_for_status()
+        rows = [orjson.loads(line) for line in r.content.splitlines() if line]
+        return rows, self._summary(r)
+
+    @staticmethod
+    def _summary(r: requests.Response) -> Dict[str, Any]:
+        summary = r.headers.get("X-ClickHouse-Summary")
+        return {k: int(v) if str(v).isdigit() else v for k, v in orjson.loads(summary).items()} if summary else {}
+
+    def command(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        settings: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+    ) -> Dict[str, Any]:
+        """Run a statement (DDL, INSERT ... SELECT, or INSERT with `data` as the body).
+
+        Returns the parsed X-ClickHouse-Summary header (read_rows, read_bytes, written_rows, ...).
+        """
+        query_params = self._params(params, settings)
+        if data is not None:
+            # With a body, the statement itself travels in the query string
+            query_params["query"] = sql
+            body = data
+        else:
+            body = sql.encode()
+        r = self.session.post(self.url, params=query_params, data=body, timeout=self.timeout)
+        r.raise_for_status()
+        return self._summary(r)
+
+    def table_columns(self, table: str) -> List[str]:
+        rows = self.query_rows(
+            "SELECT name FROM system.columns WHERE database = {database:String} AND table = {table:String} ORDER BY position",
+            {"database": self.cfg["database"], "table": table},
+        )
+        return [row["name"] for row in rows]
@@ -0,0 +1,103 @@
+"""
+Direct ClickHouse backfill sink for shopify_ingest.py (`--sink clickhouse`).
+
+Instead of posting one record at a time to /ingest/{model} and going through the stream,
+raw Shopify nodes are flattened in-process by the same transforms the streaming workers
+run (app/ingest/shopify_transforms.py), validated by the same datamodels, and inserted in
+large JSONEachRow batches over the ClickHouse HTTP interface ([clickhouse_config], or
+CLICKHOUSE_* env vars). The target tables are unchanged, so ReplacingMergeTree collapses
+re-inserted ids exactly as it does for stream-synced rows, and the rollup and inventory
+materialized views fire on every insert. Each flush bumps the table's cache version, like the
+stream consumers in app/ingest/cache_invalidation.py.
+"""
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import orjson
+import redis
+import structlog
+from pydantic import BaseModel
+
+from clickhouse_http import ClickHouseHttp
+# shopify_graphql puts the repository root on sys.path for the app package
+import shopify_graphql  # noqa: F401
+
+from app.datamodels.shopify_raw import RawShopifyCustomer, RawShopifyInventoryItem, RawShopifyOrder  # noqa: E402
+from app.ingest.shopify_transforms import (  # noqa: E402
+    explode_line_items,
+    flatten_customer,
+    flatten_inventory_item,
+    flatten_order,
+)
+from app.utils.cache import bump_table_version  # noqa: E402
+
+log = structlog.get_logger("shopify_moose_sink")
+
+# Raw model per resource and the (table, transform) pairs its nodes feed
+SINK_TARGETS: Dict[str, Tuple[Type[BaseModel], List[Tuple[str, Callable[[Any], Any]]]]] = {
+    "orders": (RawShopifyOrder, [("shopify_orders", flatten_order), ("shopify_order_line_items", explode_line_items)]),
+    "customers": (RawShopifyCustomer, [("shopify_customers", flatten_customer)]),
+    "inventory": (RawShopifyInventoryItem, [("shopify_inventory_levels", flatten_inventory_item)]),
+}
+
+# Datamodel JSON carries ISO-8601 timestamps ("...Z") and decimal strings
+INSERT_SETTINGS = {
+    "date_time_input_format": "best_effort",
+    "input_format_skip_unknown_fields": 1,
+}
+
+DEFAULT_BATCH_ROWS = int(os.getenv("CLICKHOUSE_SINK_BATCH_ROWS", "100000"))
+
+
+class ClickHouseSink:
+    """Buffers flattened rows per table and inserts them in JSONEachRow batches."""
+
+    def __init__(self, resource: str, ch: Optional[ClickHouseHttp] = None, batch_rows: int = DEFAULT_BATCH_ROWS) -> None:
+        self.model, self.targets = SINK_TARGETS[resource]
+        self.ch = ch or ClickHouseHttp()
+        self.batch_rows = max(1, batch_rows)
+        self.buffers: Dict[str, List[bytes]] = {table: [] for table, _ in self.targets}
+        self.written: Dict[str, int] = {table: 0 for table, _ in self.targets}
+        self.failed_nodes = 0
+
+    def write(self, node: Dict[str, Any]) -> None:
+        try:
+            raw = self.model.model_validate(node)
+            outputs = [(table, transform(raw)) for table, transform in self.targets]
+        except Exception as e:
+            self.failed_nodes += 1
+            log.warning("sink_transform_failed", error=str(e))
+            return
+        for table, rows in outputs:
+            for row in rows if isinstance(rows, list) else [rows]:
+                self.buffers[table].append(orjson.dumps(row.model_dump(mode="json")))
+            if len(self.buffers[table]) >= self.batch_rows:
+                self.flush(table)
+
+    def write_all(self, nodes: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        for node in nodes:
+            self.write(node)
+        return self.close()
+
+    def flush(self, table: str) -> None:
+        rows = self.buffers[table]
+        if not rows:
+            return
+        summary = self.ch.command(
+            f"INSERT INTO {table} FORMAT JSONEachRow",
+            settings=INSERT_SETTINGS,
+            data=b"\n".join(rows),
+        )
+        self.written[table] += len(rows)
+        log.info("sink_batch_inserted", table=table, rows=len(rows), written_bytes=summary.get("written_bytes"))
+        self.buffers[table] = []
+        try:
+            bump_table_version(table)
+        except redis.RedisError as e:
+            log.warning("cache_invalidation_failed", table=table, error=str(e))
+
+    def close(self) -> Dict[str, int]:
+        """Flush every buffer; returns rows written per table."""
+        for table in self.buffers:
+            self.flush(table)
+        return dict(self.written)
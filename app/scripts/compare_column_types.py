@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Storage and scan-speed comparison of plain vs. compact column types for shopify_orders.
+
+Loads the same synthetic orders (default 10M rows, generated server-side and
+deterministic) into two scratch tables: one with the original plain types
+(Nullable(String) dimensions, Float64 money, default codecs) and one with the compact
+types declared in app/datamodels/column_types.py (LowCardinality, Decimal(18, 4),
+Delta+ZSTD timestamps). It then reports compressed/uncompressed size per table and per
+changed column, and the latency and bytes read of a few representative scans.
+
+    python app/scripts/compare_column_types.py --rows 10000000
+    python app/scripts/compare_column_types.py --rows 1000000 --keep   # keep the tables
+
+Scratch tables are created in the configured database (CLICKHOUSE_* / [clickhouse_config]).
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from clickhouse_http import ClickHouseHttp
+
+PLAIN_TABLE = "bench_orders_plain_types"
+COMPACT_TABLE = "bench_orders_compact_types"
+
+# (column, plain type, compact type, synthetic expression)
+COLUMNS: List[Tuple[str, str, str, str]] = [
+    ("id", "String", "String", "concat('gid://shopify/Order/', toString(number))"),
+    (
+        "created_at", "Nullable(DateTime)", "Nullable(DateTime) CODEC(Delta, ZSTD)",
+        "toDateTime('2023-01-01 00:00:00') + intDiv(number * 63072000, {rows:UInt64})",
+    ),
+    (
+        "updated_at", "Nullable(DateTime)", "Nullable(DateTime) CODEC(Delta, ZSTD)",
+        "created_at + cityHash64(number, 1) % 604800",
+    ),
+    (
+        "processed_at", "Nullable(DateTime)", "Nullable(DateTime) CODEC(Delta, ZSTD)",
+        "created_at + cityHash64(number, 2) % 600",
+    ),
+    ("total_price", "Nullable(Float64)", "Nullable(Decimal(18, 4))", "round((cityHash64(number, 3) % 50000) / 100, 2)"),
+    ("subtotal_price", "Nullable(Float64)", "Nullable(Decimal(18, 4))", "round(total_price / 1.1, 2)"),
+    ("total_tax", "Nullable(Float64)", "Nullable(Decimal(18, 4))", "round(total_price - subtotal_price, 2)"),
+    ("total_discounts", "Nullable(Float64)", "Nullable(Decimal(18, 4))", "if(cityHash64(number, 4) % 5 = 0, 5.0, 0.0)"),
+    (
+        "currency", "Nullable(String)", "LowCardinality(Nullable(String))",
+        "['USD', 'USD', 'USD', 'CAD', 'EUR', 'GBP', 'AUD'][cityHash64(number, 5) % 7 + 1]",
+    ),
+    ("presentment_currency", "Nullable(String)", "LowCardinality(Nullable(String))", "currency"),
+    (
+        "financial_status", "Nullable(String)", "LowCardinality(Nullable(String))",
+        "['PAID', 'PAID', 'PAID', 'PENDING', 'REFUNDED', 'PARTIALLY_REFUNDED', 'AUTHORIZED'][cityHash64(number, 6) % 7 + 1]",
+    ),
+    (
+        "fulfillment_status", "Nullable(String)", "LowCardinality(Nullable(String))",
+        "['FULFILLED', 'FULFILLED', 'UNFULFILLED', 'PARTIALLY_FULFILLED'][cityHash64(number, 7) % 4 + 1]",
+    ),
+    (
+        "customer_id", "Nullable(String)", "Nullable(String)",
+        "concat('gid://shopify/Customer/', toString(cityHash64(number, 8) % greatest(intDiv({rows:UInt64}, 5), 1)))",
+    ),
+    (
+        "billing_country", "Nullable(String)", "LowCardinality(Nullable(String))",
+        "['United States', 'United States', 'Canada', 'Germany', 'United Kingdom', 'Australia', 'France'][cityHash64(number, 9) % 7 + 1]",
+    ),
+    (
+        "billing_province", "Nullable(String)", "LowCardinality(Nullable(String))",
+        "concat('Province ', toString(cityHash64(number, 10) % 60))",
+    ),
+    ("shipping_country", "Nullable(String)", "LowCardinality(Nullable(String))", "billing_country"),
+    ("shipping_province", "Nullable(String)", "LowCardinality(Nullable(String))", "billing_province"),
+    (
+        "source_name", "Nullable(String)", "LowCardinality(Nullable(String))",
+        "['web', 'web', 'pos', 'shopify_draft_order', 'iphone'][cityHash64(number, 11) % 5 + 1]",
+    ),
+    ("test", "Nullable(Bool)", "Nullable(Bool)", "cityHash64(number, 12) % 100 = 0"),
+]
+
+SCANS: Dict[str, str] = {
+    "revenue_by_day_currency": (
+        "SELECT toDate(created_at) AS day, currency, count(), sum(total_price) "
+        "FROM {table} GROUP BY day, currency FORMAT Null"
+    ),
+    "status_filter_count": (
+        "SELECT count() FROM {table} "
+        "WHERE financial_status = 'PAID' AND fulfillment_status = 'UNFULFILLED' FORMAT Null"
+    ),
+    "orders_by_country_province": (
+        "SELECT billing_country, billing_province, count(), avg(total_price) "
+        "FROM {table} GROUP BY billing_country, billing_province FORMAT Null"
+    ),
+    "last_30_days": (
+        "SELECT count(), sum(total_price) FROM {table} "
+        "WHERE created_at >= (SELECT max(created_at) FROM {table}) - INTERVAL 30 DAY FORMAT Null"
+    ),
+}
+
+
+def create_and_load(ch: ClickHouseHttp, table: str, compact: bool, rows: int) -> float:
+    ch.command(f"DROP TABLE IF EXISTS {table}")
+    column_defs = ", ".join(f"{name} {compact_type if compact else plain_type}" for name, plain_type, compact_type, _ in COLUMNS)
+    ch.command(f"CREATE TABLE {table} ({column_defs}) ENGINE = ReplacingMergeTree ORDER BY id")
+    select_list = ", ".join(f"{expression} AS {name}" for name, _, _, expression in COLUMNS)
+    start = time.perf_counter()
+    ch.command(f"INSERT INTO {table} SELECT {select_list} FROM numbers({{rows:UInt64}})", {"rows": rows})
+    ch.command(f"OPTIMIZE TABLE {table} FINAL")
+    return time.perf_counter() - start
+
+
+def storage_by_table(ch: ClickHouseHttp) -> Dict[str, Dict[str, int]]:
+    rows = ch.query_rows(
+        "SELECT table, sum(rows) AS rows, sum(data_compressed_bytes) AS compressed, "
+        "sum(data_uncompressed_bytes) AS uncompressed "
+        "FROM system.parts WHERE active AND database = currentDatabase() "
+        "AND table IN ({plain:String}, {compact:String}) GROUP BY table",
+        {"plain": PLAIN_TABLE, "compact": COMPACT_TABLE},
+    )
+    return {row["table"]: {k: int(row[k]) for k in ("rows", "compressed", "uncompressed")} for row in rows}
+
+
+def storage_by_column(ch: ClickHouseHttp) -> Dict[Tuple[str, str], int]:
+    rows = ch.query_rows(
+        "SELECT table, name, data_compressed_bytes AS compressed FROM system.columns "
+        "WHERE database = currentDatabase() AND table IN ({plain:String}, {compact:String})",
+        {"plain": PLAIN_TABLE, "compact": COMPACT_TABLE},
+    )
+    return {(row["table"], row["name"]): int(row["compressed"]) for row in rows}
+
+
+def time_scan(ch: ClickHouseHttp, sql: str, repeat: int) -> Tuple[float, int]:
+    """Median wall time (ms) and bytes read of `repeat` runs (query cache disabled)."""
+    timings = []
+    read_bytes = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        summary = ch.command(sql, settings={"use_query_cache": 0})
+        timings.append((time.perf_counter() - start) * 1000)
+        read_bytes = int(summary.get("read_bytes", 0))
+    return statistics.median(timings), read_bytes
+
+
+def mib(n: int) -> str:
+    return f"{n / (1 << 20):,.1f} MiB"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare plain vs. compact column types on synthetic orders")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scan query (median reported)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch tables afterwards")
+    args = parser.parse_args()
+
+    load_dotenv()
+    ch = ClickHouseHttp(timeout=3600)
+
+    try:
+        for table, compact in ((PLAIN_TABLE, False), (COMPACT_TABLE, True)):
+            elapsed = create_and_load(ch, table, compact, args.rows)
+            print(f"loaded {table}: {args.rows:,} rows in {elapsed:.1f}s")
+
+        print("\n== Storage ==")
+        tables = storage_by_table(ch)
+        for table in (PLAIN_TABLE, COMPACT_TABLE):
+            t = tables.get(table, {"rows": 0, "compressed": 0, "uncompressed": 0})
+            print(f"{table:<28} compressed {mib(t['compressed']):>14}   uncompressed {mib(t['uncompressed']):>14}")
+        plain_total = tables.get(PLAIN_TABLE, {}).get("compressed", 0)
+        compact_total = tables.get(COMPACT_TABLE, {}).get("compressed", 0)
+        if plain_total:
+            print(f"compact / plain (compressed): {compact_total / plain_total:.2%}")
+
+        print("\n== Changed columns (compressed) ==")
+        columns = storage_by_column(ch)
+        for name, plain_type, compact_type, _ in COLUMNS:
+            if plain_type == compact_type:
+                continue
+            plain_bytes = columns.get((PLAIN_TABLE, name), 0)
+            compact_bytes = columns.get((COMPACT_TABLE, name), 0)
+            ratio = f"{compact_bytes / plain_bytes:.2%}" if plain_bytes else "n/a"
+            print(f"{name:<22} {mib(plain_bytes):>12} -> {mib(compact_bytes):>12}  ({ratio})")
+
+        print(f"\n== Scans (median of {args.repeat}) ==")
+        for scan_name, template in SCANS.items():
+            plain_ms, plain_read = time_scan(ch, template.format(table=PLAIN_TABLE), args.repeat)
+            compact_ms, compact_read = time_scan(ch, template.format(table=COMPACT_TABLE), args.repeat)
+            print(
+                f"{scan_name:<28} plain {plain_ms:8.1f} ms / {mib(plain_read):>12}   "
+                f"compact {compact_ms:8.1f} ms / {mib(compact_read):>12}"
+            )
+        return 0
+    finally:
+        if not args.keep:
+            for table in (PLAIN_TABLE, COMPACT_TABLE):
+                ch.command(f"DROP TABLE IF EXISTS {table}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
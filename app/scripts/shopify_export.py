@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Streaming bulk export of Shopify orders/customers straight from ClickHouse.
+
+The result is streamed from the ClickHouse HTTP interface in chunks and written to the
+output as it arrives, so memory stays flat regardless of export size. ClickHouse does
+the encoding (JSONEachRow, CSVWithNames, Parquet or ArrowStream).
+
+    python app/scripts/shopify_export.py --resource orders --format parquet \
+        --start-date 2025-07-01 --end-date 2025-07-31 --output orders-2025-07.parquet
+"""
+import argparse
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+import structlog
+
+from clickhouse_http import ClickHouseHttp
+
+log = structlog.get_logger("shopify_moose_export")
+
+RESOURCE_TABLES = {
+    "orders": "shopify_orders",
+    "customers": "shopify_customers",
+}
+
+EXPORT_FORMATS = {
+    "ndjson": "JSONEachRow",
+    "csv": "CSVWithNames",
+    "parquet": "Parquet",
+    "arrow": "ArrowStream",
+}
+
+
+def configure_logging() -> None:
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    import logging
+
+    # Log to stderr so stdout can carry the export itself
+    logging.basicConfig(level=getattr(logging, level, logging.INFO), stream=sys.stderr)
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, level, logging.INFO)),
+        logger_factory=structlog.PrintLoggerFactory(file=sys.stderr),
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(),
+        ],
+    )
+
+
+def build_export_query(
+    table: str,
+    columns: List[str],
+    fmt: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    final: bool,
+) -> Tuple[str, Dict[str, Any]]:
+    where_sql_parts = []
+    params: Dict[str, Any] = {}
+    if start_date:
+        where_sql_parts.append("created_at >= toDateTime({start_date:Date})")
+        params["start_date"] = start_date
+    if end_date:
+        # end_date is inclusive
+        where_sql_parts.append("created_at < toDateTime({end_date:Date} + 1)")
+        params["end_date"] = end_date
+    where_clause = f"WHERE {' AND '.join(where_sql_parts)}" if where_sql_parts else ""
+    column_list = ", ".join(f"`{c}`" for c in columns)
+    sql = (
+        f"SELECT {column_list} FROM {table} {'FINAL ' if final else ''}"
+        f"{where_clause} "
+        f"FORMAT {EXPORT_FORMATS[fmt]}"
+    )
+    return sql, params
+
+
+def resolve_columns(ch: ClickHouseHttp, table: str, requested: Optional[str]) -> List[str]:
+    available = ch.table_columns(table)
+    if not requested:
+        return available
+    columns = [c.strip() for c in requested.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {', '.join(unknown)}")
+    return columns
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stream Shopify data out of ClickHouse")
+    parser.add_argument("--resource", choices=sorted(RESOURCE_TABLES), default="orders")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--start-date", default=None, help="YYYY-MM-DD (inclusive, on created_at)")
+    parser.add_argument("--end-date", default=None, help="YYYY-MM-DD (inclusive, on created_at)")
+    parser.add_argument("--columns", default=None, help="Comma-separated column list (default: all)")
+    parser.add_argument("--output", default="-", help="Output file, or - for stdout")
+    parser.add_argument("--chunk-size", type=int, default=1 << 20, help="Bytes per streamed chunk")
+    parser.add_argument(
+        "--no-final",
+        action="store_true",
+        help="Skip FINAL (faster, but rows not yet deduplicated by a merge may appear twice)",
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+    configure_logging()
+    table = RESOURCE_TABLES[args.resource]
+    ch = ClickHouseHttp()
+
+    try:
+        columns = resolve_columns(ch, table, args.columns)
+        sql, params = build_export_query(table, columns, args.format, args.start_date, args.end_date, not args.no_final)
+        log.info("export_starting", table=table, format=args.format, columns=len(columns))
+
+        out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        total_bytes = 0
+        try:
+            for chunk in ch.stream(sql, params, chunk_size=args.chunk_size):
+                out.write(chunk)
+                total_bytes += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+            else:
+                out.flush()
+        log.info("export_finished", table=table, bytes=total_bytes, output=args.output)
+        return 0
+    except Exception as e:
+        log.exception("export_failed", error=str(e))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,443 @@
+"""
+Admin GraphQL fetching with selection sets generated from the raw datamodels.
+
+The raw node models in app/datamodels/shopify_raw.py mirror the Shopify GraphQL shapes the
+streaming transforms read, so the selection set of each resource is derived from them: a
+nested model becomes a sub-selection and a connection gets its page-size arguments. Fields
+the transforms never read are therefore never requested, and optional field groups
+(addresses, notes, ...) can be dropped per run to lower query cost and payload size; the
+columns they feed are left NULL.
+
+    python app/scripts/shopify_ingest.py --resource orders --drop-groups addresses,notes
+    python app/scripts/shopify_ingest.py --resource orders --print-query
+"""
+import os
+import sys
+import time
+import typing
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Type
+
+import requests
+import structlog
+from pydantic import BaseModel, ValidationError
+
+# The raw datamodels live in the app package at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.datamodels.shopify_raw import (  # noqa: E402
+    RawInventoryLevelConnection,
+    RawLineItemConnection,
+    RawShopifyCustomer,
+    RawShopifyInventoryItem,
+    RawShopifyOrder,
+)
+
+log = structlog.get_logger("shopify_moose_graphql")
+
+# Page size of nested connections inside a resource query. lineItems is kept small because
+# it multiplies the cost of every order; LineItemPages / InventoryLevelPages fetch the rest
+# 250 at a time.
+CONNECTION_PAGE_SIZES = {
+    "lineItems": 10,
+    "inventoryLevels": 50,
+}
+
+# Other field arguments
+FIELD_ARGUMENTS = {
+    "quantities": '(names: ["available"])',
+}
+
+# Raw model fields whose GraphQL name differs (rendered as an alias), or that are set by the
+# client rather than fetched (None)
+FIELD_OVERRIDES: Dict[str, Optional[str]] = {
+    "orderNumber": "orderNumber: number",
+    "fetchedAt": None,
+}
+
+# Optional field groups that can be dropped per run, by resource
+FIELD_GROUPS: Dict[str, Dict[str, List[str]]] = {
+    "orders": {
+        "addresses": ["billingAddress", "shippingAddress"],
+        "notes": ["note"],
+        "customer": ["customer"],
+        "line_items": ["lineItems"],
+        "price_breakdown": ["subtotalPriceSet", "totalTaxSet", "totalDiscountsSet"],
+        "referral": ["sourceName", "referringSite"],
+    },
+    "customers": {
+        "addresses": ["defaultAddress"],
+        "contact": ["phone"],
+    },
+    "inventory": {},
+}
+
+# Top-level connection and raw model per resource
+RESOURCES: Dict[str, tuple] = {
+    "orders": ("orders", RawShopifyOrder),
+    "customers": ("customers", RawShopifyCustomer),
+    "inventory": ("inventoryItems", RawShopifyInventoryItem),
+}
+
+MAX_PAGE_SIZE = 250
+
+# Shopify rejects queries whose requested cost exceeds this
+MAX_QUERY_COST = 1000
+
+
+def _model_type(annotation: Any) -> Optional[Type[BaseModel]]:
+    """The BaseModel inside Optional[...] / List[...] annotations, if any."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _model_type(arg)
+        if model is not None:
+            return model
+    return None
+
+
+def _arguments(name: str, page_sizes: Dict[str, int]) -> str:
+    if name in page_sizes:
+        return f"(first: {page_sizes[name]})"
+    return FIELD_ARGUMENTS.get(name, "")
+
+
+def selection_set(
+    model: Type[BaseModel],
+    exclude: Sequence[str] = (),
+    indent: int = 1,
+    page_sizes: Optional[Dict[str, int]] = None,
+) -> str:
+    """GraphQL selection set for `model`, skipping top-level fields in `exclude`."""
+    page_sizes = CONNECTION_PAGE_SIZES if page_sizes is None else page_sizes
+    pad = "  " * indent
+    lines = []
+    for name, field in model.model_fields.items():
+        if name in exclude:
+            continue
+        rendered = FIELD_OVERRIDES.get(name, name)
+        if rendered is None:
+            continue
+        nested = _model_type(field.annotation)
+        if nested is None:
+            lines.append(f"{pad}{rendered}")
+        else:
+            sub_selection = selection_set(nested, (), indent + 1, page_sizes)
+            lines.append(f"{pad}{rendered}{_arguments(name, page_sizes)} {sub_selection}")
+    return "{\n" + "\n".join(lines) + "\n" + "  " * (indent - 1) + "}"
+
+
+def node_cost(model: Type[BaseModel], exclude: Sequence[str] = ()) -> int:
+    """Approximate requested cost of one node: 1 per object, nested connections times their page size."""
+    cost = 1
+    for name, field in model.model_fields.items():
+        nested = _model_type(field.annotation)
+        if name in exclude or nested is None or FIELD_OVERRIDES.get(name, name) is None:
+            continue
+        cost += CONNECTION_PAGE_SIZES.get(name, 1) * node_cost(nested)
+    return cost
+
+
+def page_size(resource: str, drop_groups: Iterable[str] = ()) -> int:
+    """Largest top-level page whose requested cost stays under MAX_QUERY_COST."""
+    _, model = RESOURCES[resource]
+    return max(1, min(MAX_PAGE_SIZE, MAX_QUERY_COST // node_cost(model, excluded_fields(resource, drop_groups))))
+
+
+def excluded_fields(resource: str, drop_groups: Iterable[str]) -> List[str]:
+    groups = FIELD_GROUPS[resource]
+    excluded = []
+    for group in drop_groups:
+        if group not in groups:
+            raise ValueError(f"Unknown field group for {resource}: {group} (known: {', '.join(sorted(groups)) or 'none'})")
+        excluded.extend(groups[group])
+    return excluded
+
+
+def resource_query(resource: str, drop_groups: Iterable[str] = ()) -> str:
+    connection, model = RESOURCES[resource]
+    node = selection_set(model, excluded_fields(resource, drop_groups), indent=4)
+    return (
+        f"query Fetch($first: Int!, $after: String, $query: String) {{\n"
+        f"  {connection}(first: $first, after: $after, query: $query) {{\n"
+        f"    pageInfo {{ hasNextPage endCursor }}\n"
+        f"    edges {{\n"
+        f"      node {node}\n"
+        f"    }}\n"
+        f"  }}\n"
+        f"}}"
+    )
+
+
+LINE_ITEMS_QUERY = (
+    "query OrderLineItems($id: ID!, $after: String) {\n"
+    "  order(id: $id) {\n"
+    f"    lineItems(first: 250, after: $after) {selection_set(RawLineItemConnection, (), indent=3, page_sizes={})}\n"
+    "  }\n"
+    "}"
+)
+
+INVENTORY_LEVELS_QUERY = (
+    "query InventoryItemLevels($id: ID!, $after: String) {\n"
+    "  inventoryItem(id: $id) {\n"
+    f"    inventoryLevels(first: 250, after: $after) {selection_set(RawInventoryLevelConnection, (), indent=3, page_sizes={})}\n"
+    "  }\n"
+    "}"
+)
+
+
+class AdminGraphQL:
+    """Minimal Admin GraphQL client with backoff on THROTTLED errors."""
+
+    def __init__(self, cfg: Dict[str, Any], max_retries: int = 5) -> None:
+        self.shop = cfg["shop"]
+        self.url = f"https://{cfg['shop']}/admin/api/{cfg['apiVersion']}/graphql.json"
+        self.timeout = cfg["timeout"] / 1000
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update({"X-Shopify-Access-Token": cfg["accessToken"]})
+
+    def execute(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        for attempt in range(self.max_retries):
+            r = self.session.post(self.url, json={"query": query, "variables": variables}, timeout=self.timeout)
+            r.raise_for_status()
+            body = r.json()
+            errors = body.get("errors") or []
+            if any((e.get("extensions") or {}).get("code") == "THROTTLED" for e in errors):
+                time.sleep(2 ** attempt)
+                continue
+            if errors:
+                raise RuntimeError(f"GraphQL query failed: {errors}")
+            cost = (body.get("extensions") or {}).get("cost") or {}
+            log.debug("graphql_cost", requested=cost.get("requestedQueryCost"), actual=cost.get("actualQueryCost"))
+            return body.get("data") or {}
+        raise RuntimeError("GraphQL query throttled")
+
+
+def created_between(start: datetime, end: datetime) -> str:
+    """Shopify search syntax for start <= created_at < end."""
+    fmt = "%Y-%m-%dT%H:%M:%SZ"
+    return f"created_at:>='{start.strftime(fmt)}' created_at:<'{end.strftime(fmt)}'"
+
+
+def fetch_nodes(
+    api: AdminGraphQL,
+    resource: str,
+    limit: int,
+    drop_groups: Iterable[str] = (),
+    search: Optional[str] = None,
+) -> Iterable[Dict[str, Any]]:
+    """Up to `limit` raw nodes of `resource`, paging the top-level connection.
+
+    `search` is a Shopify search query (e.g. from created_between) applied server-side.
+    """
+    connection, _ = RESOURCES[resource]
+    drop_groups = list(drop_groups)
+    query = resource_query(resource, drop_groups)
+    max_page = page_size(resource, drop_groups)
+    after = None
+    fetched = 0
+    while fetched < limit:
+        data = api.execute(query, {"first": min(max_page, limit - fetched), "after": after, "query": search})
+        page = data.get(connection) or {}
+        for edge in page.get("edges") or []:
+            if isinstance(edge, dict) and isinstance(edge.get("node"), dict):
+                fetched += 1
+                yield edge["node"]
+        info = page.get("pageInfo") or {}
+        if not info.get("hasNextPage"):
+            break
+        after = info.get("endCursor")
+
+
+class ConnectionPages:
+    """Completes a nested connection of a node by following its pageInfo.
+
+    Subclasses set `query` (variables $id and $after), the `root` field it selects the node
+    by, and the connection `field`.
+    """
+
+    query = ""
+    root = ""
+    field = ""
+
+    def __init__(self, api: AdminGraphQL) -> None:
+        self.api = api
+
+    def page(self, node_id: str, after: Any) -> Dict[str, Any]:
+        data = self.api.execute(self.query, {"id": node_id, "after": after})
+        return (data.get(self.root) or {}).get(self.field) or {}
+
+    def reusable(self, page_info: Optional[Dict[str, Any]], edges: List[Dict[str, Any]]) -> bool:
+        """Whether the first page already on the node can be kept and paging resumed after it."""
+        return page_info is not None
+
+    def complete(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """The node with every page of the connection merged into its edges."""
+        connection = node.get(self.field) or {}
+        page_info = connection.get("pageInfo")
+        first_edges = list(connection.get("edges") or [])
+        reusable = self.reusable(page_info, first_edges)
+        if reusable and not page_info.get("hasNextPage"):
+            return node
+
+        edges = first_edges if reusable else []
+        after = page_info.get("endCursor") if reusable else None
+        pages = 0
+        while True:
+            page = self.page(node["id"], after)
+            pages += 1
+            edges.extend(page.get("edges") or [])
+            info = page.get("pageInfo") or {}
+            after = info.get("endCursor")
+            if not info.get("hasNextPage"):
+                break
+        log.debug("connection_paged", field=self.field, node_id=node["id"], pages=pages, edges=len(edges))
+        return {**node, self.field: {"edges": edges, "pageInfo": {"hasNextPage": False, "endCursor": after}}}
+
+
+class LineItemPages(ConnectionPages):
+    """Completes an order's lineItems connection by following its pageInfo."""
+
+    query = LINE_ITEMS_QUERY
+    root = "order"
+    field = "lineItems"
+
+    def reusable(self, page_info: Optional[Dict[str, Any]], edges: List[Dict[str, Any]]) -> bool:
+        """The first page is kept when it carries pageInfo and line item ids, as the generated
+        query's does; otherwise (the connector's fixed query) the line items are re-read from
+        the start with the full field set, one extra request per order.
+        """
+        return page_info is not None and all((edge.get("node") or {}).get("id") for edge in edges)
+
+
+class InventoryLevelPages(ConnectionPages):
+    """Completes an inventory item's inventoryLevels connection (items stocked at many locations)."""
+
+    query = INVENTORY_LEVELS_QUERY
+    root = "inventoryItem"
+    field = "inventoryLevels"
+
+
+# One node per resource as the Admin API returns it for the generated query, with the
+# API's scalar types (Int order number and quantities, Decimal amounts as strings, ...).
+# check_samples() validates them against the raw models, so a model field typed unlike
+# the API fails here instead of rejecting every fetched node at ingest.
+_MONEY = {"shopMoney": {"amount": "19.99", "currencyCode": "USD"}}
+_ADDRESS = {"address1": "1 Main St", "address2": None, "city": "Ottawa", "province": "Ontario", "country": "Canada", "zip": "K1A 0B1"}
+
+SAMPLE_NODES: Dict[str, Dict[str, Any]] = {
+    "orders": {
+        "id": "gid://shopify/Order/1001",
+        "name": "#1001",
+        "orderNumber": 1001,
+        "createdAt": "2025-07-01T10:00:00Z",
+        "updatedAt": "2025-07-01T10:05:00Z",
+        "processedAt": "2025-07-01T10:00:00Z",
+        "cancelledAt": None,
+        "closedAt": None,
+        "currentTotalPriceSet": _MONEY,
+        "subtotalPriceSet": _MONEY,
+        "totalTaxSet": {"shopMoney": {"amount": "0.0", "currencyCode": "USD"}},
+        "totalDiscountsSet": {"shopMoney": {"amount": "0.0", "currencyCode": "USD"}},
+        "presentmentCurrencyCode": "USD",
+        "displayFinancialStatus": "PAID",
+        "displayFulfillmentStatus": "UNFULFILLED",
+        "confirmationNumber": "ABC123XYZ",
+        "customer": {"id": "gid://shopify/Customer/7", "email": "a@example.com", "phone": None},
+        "billingAddress": _ADDRESS,
+        "shippingAddress": _ADDRESS,
+        "test": False,
+        "tags": ["wholesale"],
+        "note": None,
+        "sourceName": "web",
+        "referringSite": None,
+        "lineItems": {
+            "edges": [{"node": {
+                "id": "gid://shopify/LineItem/1",
+                "sku": "SKU-1",
+                "title": "Widget",
+                "vendor": "Acme",
+                "quantity": 2,
+                "product": {"id": "gid://shopify/Product/1"},
+                "variant": {"id": "gid://shopify/ProductVariant/1"},
+                "originalUnitPriceSet": _MONEY,
+                "discountedTotalSet": _MONEY,
+            }}],
+            "pageInfo": {"hasNextPage": False, "endCursor": "eyJsYXN0X2lkIjoxfQ=="},
+        },
+    },
+    "customers": {
+        "id": "gid://shopify/Customer/7",
+        "email": "a@example.com",
+        "firstName": "Ada",
+        "lastName": "Lovelace",
+        "phone": "+16135550100",
+        "createdAt": "2025-06-01T09:00:00Z",
+        "updatedAt": "2025-07-01T09:00:00Z",
+        "verifiedEmail": True,
+        "state": "ENABLED",
+        "defaultAddress": _ADDRESS,
+    },
+    "inventory": {
+        "id": "gid://shopify/InventoryItem/1",
+        "sku": "SKU-1",
+        "tracked": True,
+        "inventoryLevels": {
+            "edges": [{"node": {
+                "location": {"id": "gid://shopify/Location/1", "name": "Warehouse"},
+                "quantities": [{"name": "available", "quantity": 12}],
+            }}],
+            "pageInfo": {"hasNextPage": False, "endCursor": "eyJsYXN0X2lkIjoxfQ=="},
+        },
+    },
+}
+
+
+def _missing_fields(model: Type[BaseModel], node: Any, exclude: Sequence[str] = (), path: str = "") -> List[str]:
+    """Fields the generated selection set requests that are absent from `node`."""
+    if isinstance(node, list):
+        return [m for item in node for m in _missing_fields(model, item, (), path)]
+    if not isinstance(node, dict):
+        return []
+    missing = []
+    for name, field in model.model_fields.items():
+        if name in exclude or FIELD_OVERRIDES.get(name, name) is None:
+            continue
+        if name not in node:
+            missing.append(f"{path}{name}")
+            continue
+        nested = _model_type(field.annotation)
+        if nested is not None:
+            missing.extend(_missing_fields(nested, node[name], (), f"{path}{name}."))
+    return missing
+
+
+def validate_nodes(resource: str, nodes: Iterable[Dict[str, Any]], drop_groups: Iterable[str] = ()) -> List[str]:
+    """Problems found validating response nodes against the raw model of `resource` (empty if none)."""
+    _, model = RESOURCES[resource]
+    exclude = excluded_fields(resource, drop_groups)
+    problems = []
+    for i, node in enumerate(nodes):
+        for name in _missing_fields(model, node, exclude):
+            problems.append(f"{resource}[{i}]: {name} not in response")
+        try:
+            model.model_validate(node)
+        except ValidationError as e:
+            for error in e.errors():
+                location = ".".join(str(part) for part in error["loc"])
+                problems.append(f"{resource}[{i}]: {location}: {error['msg']} (got {error.get('input')!r})")
+    return problems
+
+
+def check_samples() -> List[str]:
+    return [problem for resource, node in SAMPLE_NODES.items() for problem in validate_nodes(resource, [node])]
+
+
+if __name__ == "__main__":
+    # python app/scripts/shopify_graphql.py  -> validates SAMPLE_NODES against the raw models
+    found = check_samples()
+    for problem in found:
+        print(problem)
+    print(f"{len(found)} problem(s) in {len(SAMPLE_NODES)} sample responses")
+    sys.exit(1 if found else 0)
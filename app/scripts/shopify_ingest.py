@@ -4,13 +4,26 @@ import json
 import os
 import sys
 import time
-from typing import Any, Dict, Iterable, List
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
 
 from dotenv import load_dotenv
 import requests
 import structlog
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from shopify_graphql import (
+    FIELD_GROUPS,
+    AdminGraphQL,
+    InventoryLevelPages,
+    LineItemPages,
+    created_between,
+    fetch_nodes,
+    resource_query,
+    validate_nodes,
+)
+from work_queue import LeaseKeeper, WorkQueue, plan_shards, worker_id
+
 # Import from local wheel (installed in venv)
 try:
     from shopify_connector import ShopifyConnector
@@ -22,6 +35,32 @@ except Exception as e:
 
 log = structlog.get_logger("shopify_moose_demo")
 
+RESOURCE_MODELS = {
+    "inventory": "shopify_raw_inventory_items",
+    "orders": "shopify_raw_orders",
+    "customers": "shopify_raw_customers",
+}
+
+# Models the script posted flattened rows to before it forwarded raw nodes, under their
+# table and PascalCase names. Raw nodes sent there fail validation row by row.
+FLATTENED_MODELS = {
+    "shopifyinventorylevels": "inventory",
+    "shopifyorders": "orders",
+    "shopifycustomers": "customers",
+}
+
+
+def flattened_model_error(model: Optional[str]) -> Optional[str]:
+    """Error message when `model` names a flattened model, which cannot take raw nodes."""
+    resource = FLATTENED_MODELS.get((model or "").replace("_", "").lower())
+    if resource is None:
+        return None
+    return (
+        f"--model {model} is a flattened model, but the script now sends raw GraphQL nodes; "
+        f"drop --model to ingest into {RESOURCE_MODELS[resource]}, whose stream transform "
+        "fills the flattened tables"
+    )
+
 
 def configure_logging() -> None:
     level = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -54,155 +93,82 @@ def load_config() -> Dict[str, Any]:
     }
 
 
+def edge_nodes(connection: Any) -> Iterable[Dict[str, Any]]:
+    """Nodes of a GraphQL connection ({"edges": [{"node": {...}}]})."""
+    for edge in (connection or {}).get("edges") or []:
+        if isinstance(edge, dict) and isinstance(edge.get("node"), dict):
+            yield edge["node"]
+
+
+# Raw GraphQL nodes are forwarded as-is; the streaming transforms in
+# app/ingest/shopify_transforms.py flatten them into the table models.
+
+def stamp_fetched_at(items: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    # GraphQL has no per-level timestamp; the fetch time becomes updated_at
+    fetched_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    for item in items:
+        yield {**item, "fetchedAt": fetched_at}
+
+
 def fetch_inventory(connector: ShopifyConnector, limit: int) -> Iterable[Dict[str, Any]]:
     resp = connector.get("/inventory", {"query": {"limit": limit, "mode": "levels"}})
     data = resp.get("data") or {}
-    inv_edges = (data.get("inventoryItems") or {}).get("edges", [])
-    for edge in inv_edges:
-        node = edge.get("node", {}) if isinstance(edge, dict) else {}
-        levels_edges = ((node.get("inventoryLevels") or {}).get("edges") or [])
-        for lvl in levels_edges:
-            lvl_node = lvl.get("node", {}) if isinstance(lvl, dict) else {}
-            loc = lvl_node.get("location") or {}
-            
-            # Extract available quantity from quantities array
-            available_qty = None
-            quantities = lvl_node.get("quantities", [])
-            for qty in quantities:
-                if isinstance(qty, dict) and qty.get("name") == "available":
-                    available_qty = qty.get("quantity")
-                    break
-            
-            # Use current timestamp for updated_at since it's not provided by GraphQL
-            from datetime import datetime, timezone
-            current_time = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-            
-            yield {
-                "sku": node.get("sku"),
-                "tracked": node.get("tracked"),
-                "available": float(available_qty) if available_qty is not None else None,
-                "location_id": loc.get("id"),
-                "location_name": loc.get("name"),
-                "updated_at": current_time,  # Use current time as fallback
-            }
-
-
-def fetch_orders(connector: ShopifyConnector, limit: int) -> Iterable[Dict[str, Any]]:
+    yield from stamp_fetched_at(edge_nodes(data.get("inventoryItems")))
+
+
+def fetch_orders(
+    connector: ShopifyConnector, limit: int, line_items: Optional[LineItemPages] = None
+) -> Iterable[Dict[str, Any]]:
+    """Orders from the connector's fixed query.
+
+    That query selects neither lineItems.pageInfo nor line item ids, so `line_items` cannot
+    tell a complete first page from a truncated one and re-reads every order's line items
+    from the start. This is a paging-only fallback: pass --first-line-items-page-only to
+    skip the extra request per order, or use the generated GraphQL query (the default
+    fetcher), whose first page is reused.
+    """
     resp = connector.get("/orders", {"limit": limit, "status": "any"})
     data = resp.get("data") or {}
-    orders = (data.get("orders") or {}).get("edges", [])
-    for o_edge in orders:
-        order = o_edge.get("node", {}) if isinstance(o_edge, dict) else {}
-        
-        # Extract financial information
-        total_price_set = order.get("currentTotalPriceSet") or {}
-        shop_money = total_price_set.get("shopMoney") or {}
-        subtotal_price_set = order.get("subtotalPriceSet") or {}
-        total_tax_set = order.get("totalTaxSet") or {}
-        total_discounts_set = order.get("totalDiscountsSet") or {}
-        
-        # Extract customer information
-        customer = order.get("customer") or {}
-        
-        # Extract billing address
-        billing_address = order.get("billingAddress") or {}
-        
-        # Extract shipping address
-        shipping_address = order.get("shippingAddress") or {}
-        
-        # Extract line items summary
-        line_items = order.get("lineItems") or {}
-        line_items_edges = line_items.get("edges") or []
-        
-        total_quantity = sum(
-            (edge.get("node") or {}).get("quantity", 0) 
-            for edge in line_items_edges 
-            if isinstance(edge, dict)
-        )
-        
-        yield {
-            # Core order information
-            "id": order.get("id"),
-            "name": order.get("name"),
-            "order_number": order.get("orderNumber"),
-            "created_at": order.get("createdAt"),
-            "updated_at": order.get("updatedAt"),
-            "processed_at": order.get("processedAt"),
-            "cancelled_at": order.get("cancelledAt"),
-            "closed_at": order.get("closedAt"),
-            
-            # Financial information
-            "total_price": float(shop_money.get("amount", 0)) if shop_money.get("amount") else None,
-            "subtotal_price": float((subtotal_price_set.get("shopMoney") or {}).get("amount", 0)) if (subtotal_price_set.get("shopMoney") or {}).get("amount") else None,
-            "total_tax": float((total_tax_set.get("shopMoney") or {}).get("amount", 0)) if (total_tax_set.get("shopMoney") or {}).get("amount") else None,
-            "total_discounts": float((total_discounts_set.get("shopMoney") or {}).get("amount", 0)) if (total_discounts_set.get("shopMoney") or {}).get("amount") else None,
-            "currency": shop_money.get("currencyCode"),
-            "presentment_currency": order.get("presentmentCurrencyCode"),
-            
-            # Status information
-            "financial_status": order.get("displayFinancialStatus"),
-            "fulfillment_status": order.get("displayFulfillmentStatus"),
-            "confirmation_number": order.get("confirmationNumber"),
-            
-            # Customer information
-            "customer_id": customer.get("id"),
-            "customer_email": customer.get("email"),
-            "customer_phone": customer.get("phone"),
-            
-            # Billing address (flattened)
-            "billing_address1": billing_address.get("address1"),
-            "billing_address2": billing_address.get("address2"),
-            "billing_city": billing_address.get("city"),
-            "billing_province": billing_address.get("province"),
-            "billing_country": billing_address.get("country"),
-            "billing_zip": billing_address.get("zip"),
-            
-            # Shipping address (flattened)
-            "shipping_address1": shipping_address.get("address1"),
-            "shipping_address2": shipping_address.get("address2"),
-            "shipping_city": shipping_address.get("city"),
-            "shipping_province": shipping_address.get("province"),
-            "shipping_country": shipping_address.get("country"),
-            "shipping_zip": shipping_address.get("zip"),
-            
-            # Order metadata
-            "test": order.get("test"),
-            "tags": ", ".join(order.get("tags", [])) if order.get("tags") else None,
-            "note": order.get("note"),
-            "source_name": order.get("sourceName"),
-            "referring_site": order.get("referringSite"),
-            
-            # Line items summary
-            "total_line_items_quantity": total_quantity if total_quantity > 0 else None,
-            "line_items_count": len(line_items_edges),
-        }
+    for order in edge_nodes(data.get("orders")):
+        yield line_items.complete(order) if line_items and order.get("id") else order
 
 
 def fetch_customers(connector: ShopifyConnector, limit: int) -> Iterable[Dict[str, Any]]:
     resp = connector.get("/customers", {"query": {"limit": limit}})
     data = resp.get("data") or {}
-    customers = (data.get("customers") or {}).get("edges", [])
-    for c_edge in customers:
-        customer = c_edge.get("node", {}) if isinstance(c_edge, dict) else {}
-        address = customer.get("defaultAddress") or {}
-        yield {
-            "id": customer.get("id"),
-            "email": customer.get("email"),
-            "first_name": customer.get("firstName"),
-            "last_name": customer.get("lastName"),
-            "phone": customer.get("phone"),
-            "created_at": customer.get("createdAt"),
-            "updated_at": customer.get("updatedAt"),
-            "verified_email": customer.get("verifiedEmail"),
-            "state": customer.get("state"),
-            # Flattened address fields
-            "address1": address.get("address1"),
-            "address2": address.get("address2"),
-            "city": address.get("city"),
-            "province": address.get("province"),
-            "country": address.get("country"),
-            "zip": address.get("zip"),
-        }
+    yield from edge_nodes(data.get("customers"))
+
+
+def fetch_graphql(
+    api: AdminGraphQL,
+    resource: str,
+    limit: int,
+    drop_groups: List[str],
+    line_items: Optional[LineItemPages] = None,
+    search: Optional[str] = None,
+) -> Iterable[Dict[str, Any]]:
+    """Raw nodes fetched with the selection set generated from app/datamodels/shopify_raw.py.
+
+    Nested connections are completed page by page: every inventory item's inventoryLevels,
+    and lineItems when `line_items` is given.
+    """
+    nodes = fetch_nodes(api, resource, limit, drop_groups, search)
+    if resource == "inventory":
+        levels = InventoryLevelPages(api)
+        yield from stamp_fetched_at(levels.complete(item) if item.get("id") else item for item in nodes)
+    elif resource == "orders" and line_items and "line_items" not in drop_groups:
+        for order in nodes:
+            yield line_items.complete(order) if order.get("id") else order
+    else:
+        yield from nodes
+
+
+def read_nodes(path: str) -> Iterable[Dict[str, Any]]:
+    """Raw nodes from an NDJSON file (one GraphQL node per line), e.g. a saved fetch."""
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
 
 
 def moose_ingest(model: str, rows: Iterable[Dict[str, Any]], concurrency: int) -> int:
@@ -232,7 +198,93 @@ def moose_ingest(model: str, rows: Iterable[Dict[str, Any]], concurrency: int) -
     return total_ingested
 
 
+def ingest_nodes(args: argparse.Namespace, resource: str, nodes: Iterable[Dict[str, Any]]) -> int:
+    """Send raw nodes to the selected sink; returns how many of them did not make it.
+
+    With --sink clickhouse those are nodes that failed validation or the transforms, with
+    --sink moose rows whose POST to /ingest failed.
+    """
+    if args.sink == "clickhouse":
+        # Imported here: it pulls in the app package (datamodels, transforms, cache)
+        from clickhouse_sink import ClickHouseSink
+
+        # Nodes are streamed into batches rather than collected, so memory stays bounded
+        sink = ClickHouseSink(resource, batch_rows=args.batch_rows)
+        written = sink.write_all(nodes)
+        log.info("inserted_rows", tables=written, failed_nodes=sink.failed_nodes)
+        return sink.failed_nodes
+
+    rows = list(nodes)
+    log.info("fetched_rows", count=len(rows))
+
+    # Default model based on resource if not explicitly provided
+    ingested = moose_ingest(args.model or RESOURCE_MODELS[resource], rows, args.concurrency)
+    log.info("ingested_rows", count=ingested, failed=len(rows) - ingested)
+    return len(rows) - ingested
+
+
+def run_coordinator(args: argparse.Namespace) -> int:
+    """Enqueue the shards of a backfill for workers on any host."""
+    if not args.shop:
+        log.error("missing_shop", hint="Set SHOPIFY_SHOP or pass --shop")
+        return 2
+    start = date.fromisoformat(args.start_date) if args.start_date else None
+    end = date.fromisoformat(args.end_date) if args.end_date else datetime.now(timezone.utc).date()
+    # Inventory items are not filtered by creation date: one unbounded shard
+    window = (start, end) if start is not None and args.resource != "inventory" else (None, None)
+    shards = plan_shards(args.shop, args.resource, window[0], window[1], args.shard_days)
+    queue = WorkQueue(args.shop)
+    added = queue.enqueue(shards, reset=args.reset_queue)
+    log.info("shards_enqueued", shop=args.shop, resource=args.resource, planned=len(shards), added=added, **queue.status())
+    return 0
+
+
+def run_worker(args: argparse.Namespace, api: AdminGraphQL, line_items: Optional[LineItemPages], drop_groups: List[str]) -> int:
+    """Claim shards until the queue is drained; exits once nothing is pending or leased."""
+    queue = WorkQueue(api.shop, max_attempts=args.max_attempts)
+    worker = worker_id()
+    processed = 0
+    while True:
+        shard = queue.claim(worker, args.lease_seconds)
+        if shard is None:
+            status = queue.status()
+            if status["pending"] == 0 and status["leased"] == 0:
+                log.info("queue_drained", worker=worker, processed=processed, **status)
+                return 0
+            # Shards leased elsewhere come back here if their worker dies
+            time.sleep(args.poll_seconds)
+            continue
+
+        log.info("shard_claimed", worker=worker, shard=shard.id)
+        search = None
+        if shard.start_date:
+            search = created_between(
+                datetime.fromisoformat(shard.start_date).replace(tzinfo=timezone.utc),
+                datetime.fromisoformat(shard.end_date).replace(tzinfo=timezone.utc),
+            )
+        try:
+            with LeaseKeeper(queue, shard, worker, args.lease_seconds) as lease:
+                nodes = fetch_graphql(api, shard.resource, sys.maxsize, drop_groups, line_items, search)
+                failed = ingest_nodes(args, shard.resource, nodes)
+        except Exception as e:
+            log.exception("shard_failed_attempt", worker=worker, shard=shard.id, error=str(e))
+            queue.retry(shard, worker)
+            continue
+        if failed > args.max_failed_nodes:
+            # Rows are missing from the tables; hand the shard back rather than marking it done
+            log.warning("shard_incomplete", worker=worker, shard=shard.id, failed=failed)
+            queue.retry(shard, worker)
+            continue
+        if lease.lost or not queue.complete(shard, worker):
+            # Another worker holds the shard now; re-ingesting the same records is harmless
+            log.warning("shard_completed_without_lease", worker=worker, shard=shard.id)
+        processed += 1
+        log.info("shard_done", worker=worker, shard=shard.id)
+
+
 def main() -> int:
+    # Before the parser: several defaults (SHOPIFY_SHOP, INGEST_LEASE_SECONDS, ...) come from .env
+    load_dotenv()
     parser = argparse.ArgumentParser(description="Shopify → Moose Python demo")
     parser.add_argument("--resource", choices=["inventory", "orders", "customers"], default="inventory")
     parser.add_argument("--limit", type=int, default=25)
@@ -243,46 +295,141 @@ def main() -> int:
         default=int(os.getenv("MOOSE_INGEST_CONCURRENCY", "4")),
         help="Number of concurrent HTTP posts to Moose ingest",
     )
+    parser.add_argument(
+        "--first-line-items-page-only",
+        action="store_true",
+        help="Forward orders with their first lineItems page only (skip nested paging)",
+    )
+    parser.add_argument(
+        "--fetcher",
+        choices=["graphql", "connector"],
+        default="graphql",
+        help="graphql: Admin GraphQL with selection sets generated from the raw datamodels; "
+             "connector: the shopify-connector's fixed queries (orders' line items are re-read per order)",
+    )
+    parser.add_argument(
+        "--drop-groups",
+        default="",
+        help="Comma-separated optional field groups to leave out of the GraphQL query (their columns stay NULL): "
+             + "; ".join(f"{r}: {', '.join(sorted(g))}" for r, g in FIELD_GROUPS.items() if g),
+    )
+    parser.add_argument("--print-query", action="store_true", help="Print the generated GraphQL query and exit")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Fetch up to --limit nodes with the generated query, validate them against the raw datamodels and exit",
+    )
+    parser.add_argument(
+        "--sink",
+        choices=["moose", "clickhouse"],
+        default="moose",
+        help="moose: post rows to /ingest/{model}; clickhouse: flatten in-process and bulk-insert "
+             "JSONEachRow batches straight into the tables (backfills)",
+    )
+    parser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=int(os.getenv("CLICKHOUSE_SINK_BATCH_ROWS", "100000")),
+        help="Rows per INSERT with --sink clickhouse",
+    )
+    parser.add_argument(
+        "--max-failed-nodes",
+        type=int,
+        default=0,
+        help="Exit non-zero when more nodes than this fail to transform or ingest",
+    )
+    parser.add_argument("--input", default=None, help="Read raw nodes from an NDJSON file instead of fetching from Shopify")
+    parser.add_argument(
+        "--mode",
+        choices=["single", "coordinator", "worker"],
+        default="single",
+        help="single: one fetch on this host; coordinator: enqueue shards in Redis; worker: claim and ingest shards",
+    )
+    parser.add_argument("--shop", default=os.getenv("SHOPIFY_SHOP"), help="Shop whose queue the coordinator fills")
+    parser.add_argument("--start-date", default=None, help="Coordinator: first created_at day (UTC) to shard")
+    parser.add_argument("--end-date", default=None, help="Coordinator: last created_at day, inclusive (default: today)")
+    parser.add_argument("--shard-days", type=int, default=1, help="Coordinator: days per shard")
+    parser.add_argument("--reset-queue", action="store_true", help="Coordinator: clear the queue (including done shards) first")
+    parser.add_argument("--lease-seconds", type=int, default=int(os.getenv("INGEST_LEASE_SECONDS", "60")))
+    parser.add_argument("--poll-seconds", type=float, default=5.0, help="Worker: wait between claims while others hold leases")
+    parser.add_argument("--max-attempts", type=int, default=5, help="Worker: claims per shard before it is marked failed")
     args = parser.parse_args()
-    
-    # Set default model based on resource if not explicitly provided
-    if args.model is None:
-        resource_model_map = {
-            "inventory": "shopify_inventory_levels",
-            "orders": "shopify_orders",
-            "customers": "shopify_customers"
-        }
-        args.model = resource_model_map.get(args.resource, "shopify_inventory_levels")
+    drop_groups = [g.strip() for g in args.drop_groups.split(",") if g.strip()]
+    if drop_groups and args.fetcher != "graphql":
+        parser.error("--drop-groups requires --fetcher graphql")
+    if args.sink == "clickhouse" and args.model is not None:
+        parser.error("--model does not apply to --sink clickhouse (rows go to the resource's tables)")
+    model_error = flattened_model_error(args.model)
+    if model_error:
+        parser.error(model_error)
+    if args.check and (args.fetcher != "graphql" or args.input is not None):
+        parser.error("--check requires --fetcher graphql and no --input")
+    if args.mode != "single" and (args.fetcher != "graphql" or args.input is not None):
+        parser.error("--mode coordinator/worker requires --fetcher graphql and no --input")
+    if args.shard_days < 1:
+        parser.error("--shard-days must be at least 1")
+
+    if args.print_query:
+        print(resource_query(args.resource, drop_groups))
+        return 0
 
     configure_logging()
-    cfg = load_config()
-    log.info("starting", resource=args.resource, limit=args.limit, model=args.model, api_version=cfg["apiVersion"])
+    log.info(
+        "starting", resource=args.resource, limit=args.limit, model=args.model or RESOURCE_MODELS[args.resource],
+        fetcher=args.fetcher, drop_groups=drop_groups, sink=args.sink, input=args.input, mode=args.mode,
+    )
 
-    connector = ShopifyConnector(cfg)
-    connector.connect()
+    if args.mode == "coordinator":
+        return run_coordinator(args)
+
+    if args.check:
+        problems = validate_nodes(
+            args.resource, fetch_nodes(AdminGraphQL(load_config()), args.resource, args.limit, drop_groups), drop_groups
+        )
+        for problem in problems:
+            print(problem)
+        log.info("check_done", resource=args.resource, problems=len(problems))
+        return 1 if problems else 0
+
+    connector = None
+    if args.input is None:
+        cfg = load_config()
+        api = AdminGraphQL(cfg)
+        line_items = None if args.first_line_items_page_only else LineItemPages(api)
+        if args.fetcher == "connector":
+            connector = ShopifyConnector(cfg)
+            connector.connect()
 
     try:
-        if args.resource == "inventory":
-            rows = list(fetch_inventory(connector, args.limit))
+        if args.mode == "worker":
+            return run_worker(args, api, line_items, drop_groups)
+        if args.input is not None:
+            nodes = read_nodes(args.input)
+        elif connector is None:
+            nodes = fetch_graphql(api, args.resource, args.limit, drop_groups, line_items)
+        elif args.resource == "inventory":
+            nodes = fetch_inventory(connector, args.limit)
         elif args.resource == "orders":
-            rows = list(fetch_orders(connector, args.limit))
+            nodes = fetch_orders(connector, args.limit, line_items)
         elif args.resource == "customers":
-            rows = list(fetch_customers(connector, args.limit))
+            nodes = fetch_customers(connector, args.limit)
         else:
             raise ValueError(f"Unknown resource: {args.resource}")
-        log.info("fetched_rows", count=len(rows))
 
-        ingested = moose_ingest(args.model, rows, args.concurrency)
-        log.info("ingested_rows", count=ingested)
+        failed = ingest_nodes(args, args.resource, nodes)
+        if failed > args.max_failed_nodes:
+            log.error("too_many_failed_nodes", failed=failed, max_failed_nodes=args.max_failed_nodes)
+            return 1
         return 0
     except Exception as e:
         log.exception("run_failed", error=str(e))
         return 1
     finally:
-        try:
-            connector.disconnect()
-        except Exception:
-            pass
+        if connector is not None:
+            try:
+                connector.disconnect()
+            except Exception:
+                pass
 
 
 if __name__ == "__main__":
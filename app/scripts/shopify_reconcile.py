@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Per-day reconciliation of Shopify orders/customers against ClickHouse.
+
+For every day in the window the record count and a content checksum are computed on both
+sides, and only the days that differ are re-fetched and re-ingested:
+
+  - Shopify: `ordersCount` / `customersCount` for the count, then a lightweight id/updatedAt
+    scan of the day for the checksum (skipped with --counts-only, or when counts differ)
+  - ClickHouse: one GROUP BY day over the deduplicated table (FINAL) returning count() and
+    groupBitXor of a 64-bit hash of id|updated_at per day
+
+The checksum is an XOR of md5(id|updated_at) truncated to 64 bits, so it is order-independent
+and identical on both sides; an order updated in Shopify after it was ingested changes its
+day's checksum even when the count still matches.
+
+    python app/scripts/shopify_reconcile.py --resource orders --start-date 2025-07-01 --end-date 2025-07-31
+    python app/scripts/shopify_reconcile.py --resource customers --days-back 7 --dry-run
+"""
+import argparse
+import hashlib
+import json
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from clickhouse_http import ClickHouseHttp
+from shopify_graphql import RESOURCES, AdminGraphQL, LineItemPages, created_between
+from shopify_ingest import configure_logging, fetch_graphql, flattened_model_error, load_config, moose_ingest
+
+log = structlog.get_logger("shopify_moose_reconcile")
+
+RESOURCE_TABLES = {
+    "orders": "shopify_orders",
+    "customers": "shopify_customers",
+}
+
+RESOURCE_MODELS = {
+    "orders": "shopify_raw_orders",
+    "customers": "shopify_raw_customers",
+}
+
+COUNT_FIELDS = {
+    "orders": "ordersCount",
+    "customers": "customersCount",
+}
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# count() and checksum per UTC day; the hash input must match row_hash() exactly
+CLICKHOUSE_DAY_SQL = """
+SELECT
+    toString(toDate(created_at, 'UTC')) AS day,
+    count() AS records,
+    toString(groupBitXor(reinterpretAsUInt64(MD5(concat(
+        id, '|', ifNull(formatDateTime(updated_at, '%Y-%m-%dT%H:%i:%SZ', 'UTC'), '')
+    ))))) AS checksum
+FROM {table} FINAL
+WHERE created_at >= toDateTime({{start_date:Date}}, 'UTC')
+  AND created_at < toDateTime({{end_date:Date}} + 1, 'UTC')
+GROUP BY day
+ORDER BY day
+"""
+
+
+def row_hash(record_id: str, updated_at: Optional[str]) -> int:
+    """64-bit hash of id|updated_at, the Python side of CLICKHOUSE_DAY_SQL's checksum."""
+    ts = ""
+    if updated_at:
+        ts = datetime.fromisoformat(updated_at.replace("Z", "+00:00")).astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+    return int.from_bytes(hashlib.md5(f"{record_id}|{ts}".encode()).digest()[:8], "little")
+
+
+def count_query(resource: str) -> str:
+    return f"query Count($query: String) {{ {COUNT_FIELDS[resource]}(query: $query, limit: null) {{ count precision }} }}"
+
+
+def scan_query(resource: str) -> str:
+    connection, _ = RESOURCES[resource]
+    return (
+        "query Scan($after: String, $query: String) {\n"
+        f"  {connection}(first: 250, after: $after, query: $query) {{\n"
+        "    pageInfo { hasNextPage endCursor }\n"
+        "    edges { node { id updatedAt } }\n"
+        "  }\n"
+        "}"
+    )
+
+
+def day_window(day: date) -> str:
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return created_between(start, start + timedelta(days=1))
+
+
+def shopify_count(api: AdminGraphQL, resource: str, day: date) -> int:
+    data = api.execute(count_query(resource), {"query": day_window(day)})
+    result = data.get(COUNT_FIELDS[resource]) or {}
+    if result.get("precision") not in (None, "EXACT"):
+        log.warning("inexact_shopify_count", resource=resource, day=day.isoformat(), precision=result.get("precision"))
+    return int(result.get("count") or 0)
+
+
+def shopify_checksum(api: AdminGraphQL, resource: str, day: date) -> Tuple[int, int]:
+    """(records, checksum) of a day from an id/updatedAt scan."""
+    connection, _ = RESOURCES[resource]
+    query = scan_query(resource)
+    search = day_window(day)
+    records = checksum = 0
+    after = None
+    while True:
+        page = api.execute(query, {"after": after, "query": search}).get(connection) or {}
+        for edge in page.get("edges") or []:
+            node = edge.get("node") or {}
+            if node.get("id"):
+                records += 1
+                checksum ^= row_hash(node["id"], node.get("updatedAt"))
+        info = page.get("pageInfo") or {}
+        if not info.get("hasNextPage"):
+            return records, checksum
+        after = info.get("endCursor")
+
+
+def clickhouse_days(ch: ClickHouseHttp, resource: str, start: date, end: date) -> Dict[str, Dict[str, int]]:
+    rows = ch.query_rows(
+        CLICKHOUSE_DAY_SQL.format(table=RESOURCE_TABLES[resource]),
+        {"start_date": start.isoformat(), "end_date": end.isoformat()},
+    )
+    return {row["day"]: {"records": int(row["records"]), "checksum": int(row["checksum"])} for row in rows}
+
+
+def days_between(start: date, end: date) -> Iterable[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def reconcile_day(
+    api: AdminGraphQL, resource: str, day: date, stored: Dict[str, int], counts_only: bool
+) -> Optional[Dict[str, Any]]:
+    """Description of the divergence on `day`, or None when both sides agree."""
+    shop_records = shopify_count(api, resource, day)
+    if shop_records != stored["records"]:
+        return {"day": day.isoformat(), "reason": "count", "shopify": shop_records, "clickhouse": stored["records"]}
+    if counts_only or shop_records == 0:
+        return None
+    shop_records, checksum = shopify_checksum(api, resource, day)
+    if shop_records != stored["records"]:
+        # Records were created while the day was being compared
+        return {"day": day.isoformat(), "reason": "count", "shopify": shop_records, "clickhouse": stored["records"]}
+    if checksum != stored["checksum"]:
+        return {"day": day.isoformat(), "reason": "checksum", "shopify": shop_records, "clickhouse": stored["records"]}
+    return None
+
+
+def resync_day(api: AdminGraphQL, resource: str, day: date, records: int, model: str, concurrency: int) -> int:
+    line_items = LineItemPages(api) if resource == "orders" else None
+    rows = list(fetch_graphql(api, resource, max(records, 1), [], line_items, search=day_window(day)))
+    return moose_ingest(model, rows, concurrency)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reconcile Shopify and ClickHouse per day and re-sync divergent days")
+    parser.add_argument("--resource", choices=sorted(RESOURCE_TABLES), default="orders")
+    parser.add_argument("--start-date", help="First day to compare (UTC, YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Last day to compare, inclusive (default: today)")
+    parser.add_argument("--days-back", type=int, default=30, help="Window size when --start-date is not given")
+    parser.add_argument("--counts-only", action="store_true", help="Compare counts only (skip the id/updatedAt scans)")
+    parser.add_argument("--dry-run", action="store_true", help="Report divergent days without re-fetching them")
+    parser.add_argument("--model", default=None, help="Ingest model for re-fetched records (default: the raw model)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent HTTP posts to Moose ingest")
+    args = parser.parse_args(argv)
+    model_error = flattened_model_error(args.model)
+    if model_error:
+        parser.error(model_error)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_logging()
+    end = date.fromisoformat(args.end_date) if args.end_date else datetime.now(timezone.utc).date()
+    start = date.fromisoformat(args.start_date) if args.start_date else end - timedelta(days=args.days_back - 1)
+    if start > end:
+        log.error("invalid_window", start_date=start.isoformat(), end_date=end.isoformat())
+        return 2
+    model = args.model or RESOURCE_MODELS[args.resource]
+
+    try:
+        api = AdminGraphQL(load_config())
+        stored_days = clickhouse_days(ClickHouseHttp(), args.resource, start, end)
+        divergent = []
+        for day in days_between(start, end):
+            stored = stored_days.get(day.isoformat(), {"records": 0, "checksum": 0})
+            diff = reconcile_day(api, args.resource, day, stored, args.counts_only)
+            if diff is None:
+                continue
+            log.info("divergent_day", resource=args.resource, **diff)
+            if diff["shopify"] < diff["clickhouse"]:
+                # Re-ingesting cannot remove rows for records deleted in Shopify
+                log.warning("extra_rows_in_clickhouse", resource=args.resource, day=diff["day"])
+            if not args.dry_run and diff["shopify"] > 0:
+                diff["resynced"] = resync_day(api, args.resource, day, diff["shopify"], model, args.concurrency)
+            divergent.append(diff)
+    except Exception as e:
+        log.exception("reconcile_failed", error=str(e))
+        return 1
+
+    summary = {
+        "resource": args.resource,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "days_compared": (end - start).days + 1,
+        "divergent_days": divergent,
+    }
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Redis-coordinated work queue for running shopify_ingest.py on several hosts.
+
+A coordinator splits a backfill into shards (resource + created_at window) and enqueues
+them; workers on any number of hosts claim shards under a lease, keep the lease alive with
+heartbeats while fetching, and mark the shard done. A lease that stops being renewed (the
+worker died or hung) expires and the shard goes back to the pending list, where the next
+worker to claim picks it up. Shards are idempotent to re-run: the tables are
+ReplacingMergeTrees keyed by id, so a shard processed twice leaves no duplicates.
+
+Keys, under `{REDIS_KEY_PREFIX}::ingest_queue::{shop}::`:
+
+  pending   LIST  shard ids waiting to be claimed
+  shards    HASH  shard id -> shard descriptor (JSON)
+  leases    ZSET  shard id -> lease expiry (Redis server time, seconds)
+  owners    HASH  shard id -> worker id holding the lease
+  attempts  HASH  shard id -> claims so far
+  done      SET   finished shard ids
+  failed    SET   shards that exhausted max_attempts
+
+Every transition is a Lua script, so claims are atomic across hosts, and lease times come
+from the Redis server clock rather than each host's.
+"""
+import os
+import socket
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import orjson
+import redis
+import structlog
+
+log = structlog.get_logger("shopify_moose_work_queue")
+
+# KEYS: leases, pending, owners. Moves shards whose lease expired back to pending.
+_REQUEUE_EXPIRED = """
+local now = tonumber(redis.call('TIME')[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now)
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('HDEL', KEYS[3], id)
+    redis.call('RPUSH', KEYS[2], id)
+end
+return #expired
+"""
+
+# KEYS: pending, leases, owners, attempts. ARGV: worker id, lease seconds.
+_CLAIM = """
+local id = redis.call('LPOP', KEYS[1])
+if not id then return false end
+local now = tonumber(redis.call('TIME')[1])
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), id)
+redis.call('HSET', KEYS[3], id, ARGV[1])
+local attempt = redis.call('HINCRBY', KEYS[4], id, 1)
+return {id, attempt}
+"""
+
+# KEYS: leases, owners. ARGV: shard id, worker id, lease seconds. 0 if the lease was lost.
+_HEARTBEAT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return 0 end
+local now = tonumber(redis.call('TIME')[1])
+redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# KEYS: leases, owners, target set (done/failed) or pending list. ARGV: shard id, worker id, 'set'|'list'.
+_RELEASE = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return 0 end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if ARGV[3] == 'set' then
+    redis.call('SADD', KEYS[3], ARGV[1])
+else
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+end
+return 1
+"""
+
+
+@dataclass
+class Shard:
+    """One unit of ingest work: a resource, optionally limited to a created_at window (UTC days)."""
+
+    shop: str
+    resource: str
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None  # exclusive
+
+    @property
+    def id(self) -> str:
+        return f"{self.resource}:{self.start_date or '*'}:{self.end_date or '*'}"
+
+
+def plan_shards(shop: str, resource: str, start: Optional[date], end: Optional[date], shard_days: int) -> List[Shard]:
+    """Shards covering [start, end] in windows of `shard_days`; a single unbounded shard without a window."""
+    if start is None or end is None:
+        return [Shard(shop, resource)]
+    shards = []
+    day = start
+    while day <= end:
+        window_end = min(day + timedelta(days=shard_days), end + timedelta(days=1))
+        shards.append(Shard(shop, resource, day.isoformat(), window_end.isoformat()))
+        day = window_end
+    return shards
+
+
+class WorkQueue:
+    """Shard queue of one shop, shared by a coordinator and any number of workers."""
+
+    def __init__(self, shop: str, client: Optional[redis.Redis] = None, max_attempts: int = 5) -> None:
+        # Read here rather than at import, so a .env loaded by the caller applies.
+        # Defaults mirror [redis_config] in moose.config.toml
+        self.redis = client or redis.Redis.from_url(os.getenv("REDIS_URL", "redis://127.0.0.1:6379"))
+        self.max_attempts = max_attempts
+        base = f"{os.getenv('REDIS_KEY_PREFIX', 'MS')}::ingest_queue::{shop}::"
+        self.keys = {name: base + name for name in ("pending", "shards", "leases", "owners", "attempts", "done", "failed")}
+        self._requeue_expired = self.redis.register_script(_REQUEUE_EXPIRED)
+        self._claim = self.redis.register_script(_CLAIM)
+        self._heartbeat = self.redis.register_script(_HEARTBEAT)
+        self._release = self.redis.register_script(_RELEASE)
+
+    def enqueue(self, shards: List[Shard], reset: bool = False) -> int:
+        """Add shards that are not already known (done, pending or leased); returns how many were added.
+
+        `reset` first clears the queue, e.g. to re-run a finished backfill.
+        """
+        if reset:
+            self.redis.delete(*self.keys.values())
+        added = 0
+        for shard in shards:
+            # HSETNX makes re-running the coordinator safe while workers are busy
+            if self.redis.hsetnx(self.keys["shards"], shard.id, orjson.dumps(asdict(shard))):
+                self.redis.rpush(self.keys["pending"], shard.id)
+                added += 1
+        return added
+
+    def requeue_expired(self) -> int:
+        k = self.keys
+        return int(self._requeue_expired(keys=[k["leases"], k["pending"], k["owners"]]))
+
+    def claim(self, worker_id: str, lease_seconds: int) -> Optional[Shard]:
+        """Lease the next pending shard, after re-queuing any expired leases."""
+        requeued = self.requeue_expired()
+        if requeued:
+            log.info("leases_expired", requeued=requeued)
+        k = self.keys
+        while True:
+            claimed = self._claim(keys=[k["pending"], k["leases"], k["owners"], k["attempts"]], args=[worker_id, lease_seconds])
+            if not claimed:
+                return None
+            shard_id, attempt = claimed[0].decode(), int(claimed[1])
+            if attempt > self.max_attempts:
+                self._release(keys=[k["leases"], k["owners"], k["failed"]], args=[shard_id, worker_id, "set"])
+                log.error("shard_failed", shard=shard_id, attempts=attempt - 1)
+                continue
+            return Shard(**orjson.loads(self.redis.hget(k["shards"], shard_id)))
+
+    def heartbeat(self, shard: Shard, worker_id: str, lease_seconds: int) -> bool:
+        """Extend the lease; False when it already expired and the shard was handed to someone else."""
+        k = self.keys
+        return bool(self._heartbeat(keys=[k["leases"], k["owners"]], args=[shard.id, worker_id, lease_seconds]))
+
+    def complete(self, shard: Shard, worker_id: str) -> bool:
+        k = self.keys
+        return bool(self._release(keys=[k["leases"], k["owners"], k["done"]], args=[shard.id, worker_id, "set"]))
+
+    def retry(self, shard: Shard, worker_id: str) -> bool:
+        """Give a shard back after a failure; it is claimed again (up to max_attempts)."""
+        k = self.keys
+        return bool(self._release(keys=[k["leases"], k["owners"], k["pending"]], args=[shard.id, worker_id, "list"]))
+
+    def status(self) -> Dict[str, int]:
+        k = self.keys
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hlen(k["shards"]).llen(k["pending"]).zcard(k["leases"]).scard(k["done"]).scard(k["failed"])
+        total, pending, leased, done, failed = pipe.execute()
+        return {"shards": total, "pending": pending, "leased": leased, "done": done, "failed": failed}
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseKeeper:
+    """Background heartbeat for the shard a worker is processing."""
+
+    def __init__(self, queue: WorkQueue, shard: Shard, worker: str, lease_seconds: int) -> None:
+        self.queue = queue
+        self.shard = shard
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        # Renew well before expiry so one slow heartbeat does not lose the lease
+        while not self._stop.wait(max(1, self.lease_seconds // 3)):
+            try:
+                if not self.queue.heartbeat(self.shard, self.worker, self.lease_seconds):
+                    self.lost = True
+                    log.warning("lease_lost", shard=self.shard.id, worker=self.worker)
+                    return
+            except redis.RedisError as e:
+                log.warning("heartbeat_failed", shard=self.shard.id, error=str(e))
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,4 @@
+"""
+Shared helpers for the consumption APIs (caching, pagination, ...).
+Keep imports light; modules here are imported by app/apis/* at startup.
+"""
@@ -0,0 +1,34 @@
+"""
+Multi-value (batch) lookup helpers for consumption APIs.
+
+Batch parameters are comma-separated strings (`order_ids=a,b,c`) that compile into a
+single parameterized `IN (...)` predicate, one query parameter per value, so one request
+resolves a whole batch instead of one HTTP call and one query per value.
+"""
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+# Per-request cap on the number of values in a batch lookup
+MAX_BATCH_SIZE = int(os.getenv("API_MAX_BATCH_SIZE", "250"))
+
+
+def batch_values(single: Optional[str], many: Optional[str], max_items: int = MAX_BATCH_SIZE) -> List[str]:
+    """Merge a single-value parameter and a comma-separated batch parameter (order kept, duplicates dropped)."""
+    values: List[str] = []
+    for raw in [single, *(many.split(",") if many else [])]:
+        value = (raw or "").strip()
+        if value and value not in values:
+            values.append(value)
+    if len(values) > max_items:
+        raise ValueError(f"Too many values in batch lookup: {len(values)} (max {max_items})")
+    return values
+
+
+def in_predicate(column: str, values: Sequence[Any], args: Dict[str, Any], prefix: str) -> str:
+    """Build `column IN ({prefix_0}, {prefix_1}, ...)` and add the values to `args`."""
+    placeholders = []
+    for i, value in enumerate(values):
+        name = f"{prefix}_{i}"
+        args[name] = value
+        placeholders.append(f"{{{name}}}")
+    return f"{column} IN ({', '.join(placeholders)})"
@@ -0,0 +1,221 @@
+"""
+Redis-backed response cache for consumption APIs.
+
+Entries are keyed by API name, the current data version of every table the API reads,
+and the normalized query model. Ingest bumps a table's version (see
+app/ingest/cache_invalidation.py), so new data makes old entries unreachable and they
+simply expire with their TTL. Hit/miss counters are kept per API in a Redis hash.
+
+The same versions double as a data watermark. A request that supplies `if_none_match`
+(any value, e.g. "*" on the first poll) is answered with {"etag", "not_modified", "data"}
+instead of the plain row list: the etag hashes the table versions and the normalized query,
+and a request whose `if_none_match` equals the current etag gets not_modified=true and no
+data, without touching the cache or ClickHouse. Requests without it get the rows as before.
+Rollups are kept by insert-triggered materialized views, so they move with their source
+table's version; a request that reads a source refreshed on a schedule instead (the
+customers dictionary) gets a null etag and is only cached for the TTL.
+
+Stream consumers bump a version when a record lands on the stream, before the
+stream-to-table sync has written it. For SYNC_GRACE_SECONDS after a bump, responses are
+therefore not cached, carry a provisional etag that can never match once the tables have
+settled, and are never answered with not_modified; a client that read rows mid-sync
+fetches them again on its next poll instead of keeping them indefinitely.
+"""
+import functools
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Mirrors [redis_config] in moose.config.toml
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379")
+KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "MS")
+
+STATS_KEY = f"{KEY_PREFIX}::api_cache_stats"
+
+# Query model field holding the ETag a client already has; never part of the cache key
+IF_NONE_MATCH_FIELD = "if_none_match"
+
+# How long after a version bump a table's rows may still be syncing from its stream
+SYNC_GRACE_SECONDS = float(os.getenv("CACHE_SYNC_GRACE_SECONDS", "10"))
+
+# Tables read by each cached API, registered by cached_query (used by getShopifyDataVersion)
+API_TABLES: Dict[str, List[str]] = {}
+
+_redis_client = None
+
+
+def get_redis() -> redis.Redis:
+    """Return a lazily created, process-wide Redis client."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _redis_client
+
+
+def table_version_key(table: str) -> str:
+    return f"{KEY_PREFIX}::table_version::{table}"
+
+
+def table_modified_key(table: str) -> str:
+    return f"{KEY_PREFIX}::table_modified::{table}"
+
+
+def bump_table_version(table: str) -> int:
+    """Invalidate every cached response that depends on `table` and stamp its modified time."""
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.incr(table_version_key(table))
+    pipe.set(table_modified_key(table), time.time())
+    return pipe.execute()[0]
+
+
+def get_table_modified(tables: Iterable[str]) -> Optional[datetime]:
+    """Latest ingest time across `tables`, or None if none of them has been written yet."""
+    tables = list(tables)
+    if not tables:
+        return None
+    stamps = [float(v) for v in get_redis().mget([table_modified_key(t) for t in tables]) if v is not None]
+    return datetime.fromtimestamp(max(stamps), tz=timezone.utc) if stamps else None
+
+
+def get_table_state(tables: Iterable[str]) -> Tuple[List[int], bool]:
+    """Versions of `tables`, and whether their last bump is more than SYNC_GRACE_SECONDS old."""
+    tables = list(tables)
+    if not tables:
+        return [], True
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.mget([table_version_key(t) for t in tables])
+    pipe.mget([table_modified_key(t) for t in tables])
+    versions, stamps = pipe.execute()
+    stamps = [float(v) for v in stamps if v is not None]
+    settled = not stamps or time.time() - max(stamps) >= SYNC_GRACE_SECONDS
+    return [int(v) if v is not None else 0 for v in versions], settled
+
+
+def data_etag(tables: List[str], versions: List[int], settled: bool = True, params: Any = None) -> str:
+    """ETag for the data behind `tables` (and the query `params`, when given).
+
+    Changes whenever any table is ingested into, and once more when the tables settle, so
+    an etag handed out while rows were still syncing never matches afterwards.
+    """
+    tag = "|".join(f"{t}={v}" for t, v in zip(tables, versions))
+    if not settled:
+        tag += "|syncing"
+    digest = hashlib.sha1(tag.encode())
+    if params is not None:
+        digest.update(b"|" + normalize_params(params))
+    return digest.hexdigest()[:16]
+
+
+def _json_default(value: Any) -> Any:
+    # Decimal money columns must come back as numbers, not strings, on a cache hit
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def normalize_params(params: Any) -> bytes:
+    """Stable byte representation of a query model (unset/None fields dropped, keys sorted)."""
+    data = params.model_dump(exclude_none=True) if hasattr(params, "model_dump") else dict(params or {})
+    data.pop(IF_NONE_MATCH_FIELD, None)
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS, default=str)
+
+
+def cache_key(api_name: str, params: Any, versions: List[int]) -> str:
+    digest = hashlib.sha1(normalize_params(params)).hexdigest()
+    version_tag = ".".join(str(v) for v in versions) or "0"
+    return f"{KEY_PREFIX}::api_cache::{api_name}::{version_tag}::{digest}"
+
+
+def _record(api_name: str, outcome: str) -> None:
+    try:
+        get_redis().hincrby(STATS_KEY, f"{api_name}:{outcome}", 1)
+    except redis.RedisError:
+        pass
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Per-API hit/miss counters, e.g. {"getShopifyOrderAnalytics": {"hits": 10, "misses": 2}}."""
+    stats: Dict[str, Dict[str, int]] = {}
+    for field, value in get_redis().hgetall(STATS_KEY).items():
+        api_name, _, outcome = field.decode().rpartition(":")
+        stats.setdefault(api_name, {"hits": 0, "misses": 0, "errors": 0, "not_modified": 0})[outcome] = int(value)
+    return stats
+
+
+def cached_query(
+    api_name: str,
+    tables: Iterable[str],
+    ttl: int,
+    unversioned: Optional[Callable[[Any], bool]] = None,
+) -> Callable:
+    """Cache a query function's result in Redis for `ttl` seconds.
+
+    Args:
+        api_name: Consumption API name, used in the cache key and the stats hash
+        tables: Tables the query reads; a version bump on any of them misses the cache
+        ttl: Time-to-live in seconds for cached responses
+        unversioned: True for requests that also read a source the table versions do not
+            track (refreshed on a schedule); those get a null etag and never not_modified
+
+    If the request supplies `if_none_match`, the result is returned as
+    {"etag", "not_modified", "data"}; when `if_none_match` equals the current etag, the
+    client's copy is still current and not_modified is true. Otherwise the rows are
+    returned unchanged.
+
+    Redis errors never fail the request; the query function is called directly instead
+    (with a null etag for conditional requests).
+    """
+    tables = list(tables)
+    API_TABLES[api_name] = tables
+
+    def decorator(query_function: Callable) -> Callable:
+        @functools.wraps(query_function)
+        def wrapper(client, params):
+            if_none_match = getattr(params, IF_NONE_MATCH_FIELD, None)
+            conditional = if_none_match is not None
+            versioned = unversioned is None or not unversioned(params)
+
+            def respond(result: Any, etag: Optional[str], not_modified: bool = False) -> Any:
+                if not conditional:
+                    return result
+                return {"etag": etag, "not_modified": not_modified, "data": result}
+
+            try:
+                versions, settled = get_table_state(tables)
+                etag = data_etag(tables, versions, settled, params) if versioned else None
+                if etag and settled and if_none_match == etag:
+                    _record(api_name, "not_modified")
+                    return respond([], etag, not_modified=True)
+                key = cache_key(api_name, params, versions)
+                cached = get_redis().get(key)
+            except redis.RedisError as e:
+                logger.warning("api_cache_unavailable api=%s error=%s", api_name, e)
+                _record(api_name, "errors")
+                return respond(query_function(client, params), None)
+
+            if cached is not None:
+                _record(api_name, "hits")
+                return respond(orjson.loads(cached), etag)
+
+            _record(api_name, "misses")
+            result = query_function(client, params)
+            if settled:
+                # While rows may still be syncing the result could already be stale; don't keep it
+                try:
+                    get_redis().set(key, orjson.dumps(result, default=_json_default), ex=ttl)
+                except (redis.RedisError, TypeError) as e:
+                    logger.warning("api_cache_store_failed api=%s error=%s", api_name, e)
+            return respond(result, etag)
+
+        return wrapper
+
+    return decorator
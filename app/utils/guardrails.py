@@ -0,0 +1,91 @@
+"""
+Per-API ClickHouse execution limits ("guardrails") for consumption APIs.
+
+Each query function declares a limits profile through `instrumented(api_name, limits=...)`;
+the settings are appended to every query it runs, so ClickHouse itself aborts a query that
+reads too much or runs too long instead of letting it starve everything else:
+
+  - INTERACTIVE_LIMITS: point lookups (tight limits, high priority)
+  - ANALYTICAL_LIMITS: scans and aggregations (looser limits, lower priority)
+
+In ClickHouse a lower non-zero `priority` wins, so while an analytical query is running,
+interactive ones are scheduled ahead of it. A query stopped by a limit is re-raised as
+QueryTooExpensiveError, whose message is a JSON object the caller can act on.
+"""
+import os
+import re
+from typing import Any, Dict, Optional
+
+import orjson
+
+# ClickHouse error codes raised when a read/time limit is exceeded, and the setting behind each
+LIMIT_ERROR_CODES = {
+    158: "max_rows_to_read",    # TOO_MANY_ROWS
+    159: "max_execution_time",  # TIMEOUT_EXCEEDED
+    307: "max_bytes_to_read",   # TOO_MANY_BYTES
+}
+
+_ERROR_CODE_RE = re.compile(r"Code:\s*(\d+)")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+INTERACTIVE_LIMITS: Dict[str, Any] = {
+    "max_execution_time": _env_int("API_INTERACTIVE_MAX_EXECUTION_TIME", 5),
+    "max_rows_to_read": _env_int("API_INTERACTIVE_MAX_ROWS_TO_READ", 20_000_000),
+    "max_bytes_to_read": _env_int("API_INTERACTIVE_MAX_BYTES_TO_READ", 2 << 30),
+    "priority": 1,
+}
+
+ANALYTICAL_LIMITS: Dict[str, Any] = {
+    "max_execution_time": _env_int("API_ANALYTICAL_MAX_EXECUTION_TIME", 30),
+    "max_rows_to_read": _env_int("API_ANALYTICAL_MAX_ROWS_TO_READ", 1_000_000_000),
+    "max_bytes_to_read": _env_int("API_ANALYTICAL_MAX_BYTES_TO_READ", 100 << 30),
+    "priority": 10,
+}
+
+
+def query_limits(profile: Dict[str, Any], **overrides: Any) -> Dict[str, Any]:
+    """A limits profile with some settings overridden, e.g. query_limits(INTERACTIVE_LIMITS, max_execution_time=2)."""
+    return {**profile, **overrides}
+
+
+def clickhouse_error_code(error: BaseException) -> Optional[int]:
+    """ClickHouse error code of a driver exception (`code` attribute or "Code: N." in the message)."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    match = _ERROR_CODE_RE.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+class QueryTooExpensiveError(Exception):
+    """A consumption query was stopped by one of its API's execution limits."""
+
+    def __init__(self, api_name: str, code: int, setting: str, limit: Any) -> None:
+        self.api_name = api_name
+        self.code = code
+        self.setting = setting
+        self.limit = limit
+        super().__init__(orjson.dumps(self.to_dict()).decode())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": "query_too_expensive",
+            "api_name": self.api_name,
+            "clickhouse_code": self.code,
+            "limit": self.setting,
+            "limit_value": self.limit,
+            "hint": "Narrow the filters (shorter date range, more specific keys) or page with a smaller limit",
+        }
+
+
+def too_expensive_error(api_name: str, error: BaseException, settings: Dict[str, Any]) -> Optional[QueryTooExpensiveError]:
+    """QueryTooExpensiveError for a limit violation, or None if `error` is anything else."""
+    code = clickhouse_error_code(error)
+    if code not in LIMIT_ERROR_CODES:
+        return None
+    setting = LIMIT_ERROR_CODES[code]
+    return QueryTooExpensiveError(api_name, code, setting, settings.get(setting))
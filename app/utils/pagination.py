@@ -0,0 +1,122 @@
+"""
+Keyset (cursor) pagination helpers for list-style consumption APIs.
+
+A cursor is an opaque, URL-safe token holding the sort-key values of the last row of a
+page. The next page is fetched with a `WHERE (k1, k2) < (v1, v2)` predicate on the sort
+key instead of OFFSET, so a deep page costs the same as the first one.
+
+Nullable sort-key columns are passed as `nullable`, mapping each to the value that stands
+in for NULL (NULL_DATETIME, NULL_STRING, ...); the ORDER BY (order_by_sql) and the
+predicate both sort ifNull(column, stand-in), and a cursor taken on a NULL carries null.
+
+Usage in a query function:
+
+    cursor_sql = keyset_predicate(params.cursor, ["created_at", "id"], args, descending=True,
+                                  datetime_columns=("created_at",), nullable={"created_at": NULL_DATETIME})
+    ...
+    sql = f"... ORDER BY {order_by_sql(['created_at', 'id'], descending=True, nullable=...)} LIMIT {{limit}}"
+    rows = client.query.execute(sql, args)  # limit + 1
+    return paginate(rows, limit, ["created_at", "id"])
+"""
+import base64
+import binascii
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import orjson
+
+# NULL stand-ins for nullable sort keys: they sort below every real value
+NULL_DATETIME = "toDateTime(0)"
+NULL_STRING = "''"
+
+
+def _cursor_value(value: Any) -> Any:
+    # ClickHouse hands back naive UTC datetimes; spell the offset out so the cursor
+    # does not depend on the server's timezone when it is parsed back
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = orjson.dumps([_cursor_value(v) for v in values])
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int, nullable_positions: Iterable[int] = ()) -> List[Any]:
+    """Cursor values; null is only accepted at `nullable_positions`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    nullable_positions = set(nullable_positions)
+    if any(v is None and i not in nullable_positions for i, v in enumerate(values)):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def sort_expressions(columns: Sequence[str], nullable: Optional[Dict[str, str]] = None) -> List[str]:
+    """The sort-key columns, with nullable ones wrapped in ifNull(column, stand-in)."""
+    nullable = nullable or {}
+    return [f"ifNull({c}, {nullable[c]})" if c in nullable else c for c in columns]
+
+
+def order_by_sql(columns: Sequence[str], descending: bool = False, nullable: Optional[Dict[str, str]] = None) -> str:
+    """ORDER BY list matching keyset_predicate() for the same arguments."""
+    direction = " DESC" if descending else ""
+    return ", ".join(f"{expression}{direction}" for expression in sort_expressions(columns, nullable))
+
+
+def keyset_predicate(
+    cursor: Optional[str],
+    columns: Sequence[str],
+    args: Dict[str, Any],
+    descending: bool = False,
+    datetime_columns: Iterable[str] = (),
+    nullable: Optional[Dict[str, str]] = None,
+) -> Optional[str]:
+    """Build the SQL predicate selecting rows after `cursor`, adding its values to `args`.
+
+    `columns` must match the query's ORDER BY, all in the same direction; with `nullable`,
+    use order_by_sql() so both sides coalesce NULLs the same way.
+    Returns None when no cursor was given (first page).
+    """
+    if not cursor:
+        return None
+    nullable = nullable or {}
+    datetime_columns = set(datetime_columns)
+    values = decode_cursor(cursor, len(columns), [i for i, c in enumerate(columns) if c in nullable])
+    placeholders = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        if value is None:
+            placeholders.append(nullable[column])
+            continue
+        name = f"cursor_{i}"
+        args[name] = value
+        placeholder = f"{{{name}}}"
+        if column in datetime_columns:
+            placeholder = f"parseDateTime64BestEffort({placeholder}, 6)"
+        placeholders.append(placeholder)
+    expressions = sort_expressions(columns, nullable)
+    op = "<" if descending else ">"
+    if len(columns) == 1:
+        return f"{expressions[0]} {op} {placeholders[0]}"
+    return f"({', '.join(expressions)}) {op} ({', '.join(placeholders)})"
+
+
+def paginate(rows: Iterable[Dict[str, Any]], limit: int, key_fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Trim a `limit + 1` result to `limit` rows and set `next_cursor` on the last row.
+
+    `next_cursor` is only set when more rows exist; pass it back as `cursor` to get the next page.
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    last = rows[-1]
+    rows[-1] = {**last, "next_cursor": encode_cursor([last[f] for f in key_fields])}
+    return rows
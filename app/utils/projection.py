@@ -0,0 +1,51 @@
+"""
+Column projection (`fields=`) for consumption APIs.
+
+`fields` is a comma-separated list whitelisted against the API's response model. Only the
+requested columns are selected from ClickHouse and returned, which cuts column reads,
+serialization time and response size. Columns the API needs for itself (the id and the
+pagination sort key) are always selected, so projected rows still validate against the
+response model: every other field on it is optional.
+"""
+from typing import List, Mapping, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+# Response-model fields computed in Python rather than selected from the table
+NON_COLUMN_FIELDS = ("next_cursor",)
+
+
+def response_columns(response_model: Type[BaseModel]) -> List[str]:
+    """All selectable columns of a response model, in declaration order."""
+    return [name for name in response_model.model_fields if name not in NON_COLUMN_FIELDS]
+
+
+def select_columns(
+    response_model: Type[BaseModel],
+    fields: Optional[str],
+    required: Sequence[str] = (),
+    computed: Optional[Mapping[str, str]] = None,
+    include_computed: bool = False,
+) -> List[str]:
+    """Resolve a `fields` parameter to the list of SELECT items.
+
+    `computed` maps response fields that are not table columns to SQL expressions; they are
+    selected (as `expr AS name`) only when named in `fields` or when `include_computed` is set.
+    Raises ValueError on fields that are not part of the response model.
+    """
+    computed = computed or {}
+    columns = [c for c in response_columns(response_model) if c not in computed]
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = sorted(requested - set(columns) - set(computed))
+        if unknown:
+            allowed = [*columns, *computed]
+            raise ValueError(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+        wanted = requested | set(required)
+    else:
+        wanted = set(columns)
+    if include_computed:
+        wanted |= set(computed)
+    return [c for c in columns if c in wanted] + [
+        f"{expression} AS {name}" for name, expression in computed.items() if name in wanted
+    ]
@@ -0,0 +1,213 @@
+"""
+Query timing, slow-query log and EXPLAIN capture for consumption APIs.
+
+`instrumented(api_name)` wraps a query function so every `client.query.execute` it makes is:
+  - tagged with `SETTINGS log_comment = 'moose_api:<api_name>'`, so rows/bytes read per API
+    can be pulled from system.query_log (see query_log_stats),
+  - timed into a per-API latency histogram together with result row counts and errors,
+  - written to the slow-query log (with its parameters) when it takes longer than
+    API_SLOW_QUERY_MS, plus its `EXPLAIN indexes = 1` plan when API_SLOW_QUERY_EXPLAIN is set,
+  - run with the API's execution limits (see app/utils/guardrails.py), if it declares any;
+    a query stopped by one of them is counted as `too_expensive` and re-raised as
+    QueryTooExpensiveError.
+
+Histograms are kept in-process (one set per consumption worker).
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils.guardrails import too_expensive_error
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("moose_api.slow_query")
+
+SLOW_QUERY_MS = float(os.getenv("API_SLOW_QUERY_MS", "500"))
+SLOW_QUERY_EXPLAIN = os.getenv("API_SLOW_QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LOG_COMMENT_PREFIX = "moose_api:"
+
+
+class ApiQueryStats:
+    """Counters and latency histogram for one consumption API."""
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.errors = 0
+        self.too_expensive = 0
+        self.slow_queries = 0
+        self.result_rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms: float, result_rows: int, error: bool, too_expensive: bool = False) -> None:
+        self.queries += 1
+        self.errors += int(error)
+        self.too_expensive += int(too_expensive)
+        self.slow_queries += int(elapsed_ms >= SLOW_QUERY_MS)
+        self.result_rows += result_rows
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def quantile_ms(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile (None for the +Inf bucket)."""
+        if not self.queries:
+            return None
+        target = q * self.queries
+        seen = 0
+        for i, count in enumerate(self.bucket_counts):
+            seen += count
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "queries": self.queries,
+            "errors": self.errors,
+            "too_expensive": self.too_expensive,
+            "slow_queries": self.slow_queries,
+            "result_rows": self.result_rows,
+            "avg_ms": self.total_ms / self.queries if self.queries else 0.0,
+            "p50_ms": self.quantile_ms(0.5),
+            "p95_ms": self.quantile_ms(0.95),
+            "max_ms": self.max_ms,
+            "latency_histogram": dict(zip(labels, self.bucket_counts)),
+        }
+
+
+_stats: Dict[str, ApiQueryStats] = {}
+_stats_lock = threading.Lock()
+
+
+def record_query(
+    api_name: str, elapsed_ms: float, result_rows: int, error: bool = False, too_expensive: bool = False
+) -> None:
+    with _stats_lock:
+        _stats.setdefault(api_name, ApiQueryStats()).observe(elapsed_ms, result_rows, error, too_expensive)
+
+
+def get_query_stats() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        return {api_name: stats.snapshot() for api_name, stats in _stats.items()}
+
+
+def with_settings(sql: str, settings: Dict[str, Any]) -> str:
+    """Append a SETTINGS clause; values are literals chosen by the code, never user input."""
+    if not settings:
+        return sql
+    rendered = ", ".join(
+        f"{name} = '{value}'" if isinstance(value, str) else f"{name} = {value}"
+        for name, value in settings.items()
+    )
+    return f"{sql.rstrip()} SETTINGS {rendered}"
+
+
+class InstrumentedQuery:
+    """Stand-in for `client.query` that times and tags every execute call."""
+
+    def __init__(self, query: Any, api_name: str, limits: Optional[Dict[str, Any]] = None) -> None:
+        self._query = query
+        self.api_name = api_name
+        self.settings: Dict[str, Any] = {"log_comment": f"{LOG_COMMENT_PREFIX}{api_name}", **(limits or {})}
+
+    def execute(self, sql: str, variables: Dict[str, Any], *args, **kwargs):
+        tagged_sql = with_settings(sql, self.settings)
+        start = time.perf_counter()
+        try:
+            result = self._query.execute(tagged_sql, variables, *args, **kwargs)
+        except Exception as e:
+            limit_error = too_expensive_error(self.api_name, e, self.settings)
+            record_query(
+                self.api_name, (time.perf_counter() - start) * 1000, 0, error=True, too_expensive=limit_error is not None
+            )
+            if limit_error is not None:
+                raise limit_error from e
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        result_rows = len(result) if hasattr(result, "__len__") else 0
+        record_query(self.api_name, elapsed_ms, result_rows)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            self._log_slow_query(sql, variables, elapsed_ms, result_rows)
+        return result
+
+    def _log_slow_query(self, sql: str, variables: Dict[str, Any], elapsed_ms: float, result_rows: int) -> None:
+        plan: Optional[List[str]] = None
+        if SLOW_QUERY_EXPLAIN:
+            try:
+                rows = self._query.execute(f"EXPLAIN indexes = 1 {sql}", variables)
+                plan = [row.get("explain", "") if isinstance(row, dict) else str(row) for row in rows]
+            except Exception as e:
+                logger.warning("slow_query_explain_failed api=%s error=%s", self.api_name, e)
+        slow_query_logger.warning(
+            "slow_query api=%s elapsed_ms=%.1f result_rows=%d params=%s sql=%s%s",
+            self.api_name,
+            elapsed_ms,
+            result_rows,
+            variables,
+            " ".join(sql.split()),
+            f" plan={plan}" if plan is not None else "",
+        )
+
+
+class InstrumentedClient:
+    """Proxy for the Moose client whose `query` is an InstrumentedQuery."""
+
+    def __init__(self, client: Any, api_name: str, limits: Optional[Dict[str, Any]] = None) -> None:
+        self._client = client
+        self.query = InstrumentedQuery(client.query, api_name, limits)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def instrumented(api_name: str, limits: Optional[Dict[str, Any]] = None) -> Callable:
+    """Time, tag and slow-log every ClickHouse query made by a query function.
+
+    Args:
+        api_name: Consumption API name, used in log_comment and the stats
+        limits: ClickHouse execution settings for every query, e.g. guardrails.INTERACTIVE_LIMITS
+    """
+
+    def decorator(query_function: Callable) -> Callable:
+        @functools.wraps(query_function)
+        def wrapper(client, params):
+            return query_function(InstrumentedClient(client, api_name, limits), params)
+
+        return wrapper
+
+    return decorator
+
+
+def query_log_stats(client: Any, minutes_back: int = 60) -> Dict[str, Dict[str, Any]]:
+    """Rows/bytes read per API over the last `minutes_back` minutes, from system.query_log."""
+    rows = client.query.execute(
+        (
+            "SELECT substring(log_comment, {prefix_length}) AS api_name, "
+            "count() AS logged_queries, "
+            "sum(read_rows) AS rows_read, "
+            "sum(read_bytes) AS bytes_read, "
+            "quantile(0.95)(query_duration_ms) AS server_p95_ms "
+            "FROM system.query_log "
+            "WHERE type = 'QueryFinish' "
+            "AND event_time >= now() - INTERVAL {minutes_back} MINUTE "
+            "AND startsWith(log_comment, {prefix}) "
+            "GROUP BY api_name"
+        ),
+        {"prefix": LOG_COMMENT_PREFIX, "prefix_length": len(LOG_COMMENT_PREFIX) + 1, "minutes_back": int(minutes_back)},
+    )
+    return {row["api_name"]: row for row in rows}
@@ -0,0 +1,118 @@
+"""
+In-process single-flight (request coalescing) for consumption API queries.
+
+Concurrent calls with the same API name and normalized query parameters share one
+in-flight ClickHouse query: the first caller (the leader) runs it, the others wait for
+and reuse its result or error. A dashboard refreshed by 50 viewers then costs one query
+per worker instead of 50. Sits inside the response cache, so only cache misses coalesce.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils.cache import normalize_params
+
+# Bound on the number of distinct keys whose metrics are retained (least recently seen evicted)
+MAX_TRACKED_KEYS = 1000
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "followers")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class KeyStats:
+    """Per-key single-flight counters."""
+
+    def __init__(self, api_name: str, params: str) -> None:
+        self.api_name = api_name
+        self.params = params
+        self.executions = 0
+        self.coalesced = 0
+        self.max_followers = 0
+        self.last_seen = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "api_name": self.api_name,
+            "params": self.params,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "max_followers": self.max_followers,
+            "last_seen": self.last_seen,
+        }
+
+
+_lock = threading.Lock()
+_in_flight: Dict[str, _Call] = {}
+_key_stats: "OrderedDict[str, KeyStats]" = OrderedDict()
+
+
+def _stats_for(key: str, api_name: str, params: str) -> KeyStats:
+    stats = _key_stats.get(key)
+    if stats is None:
+        stats = _key_stats[key] = KeyStats(api_name, params)
+        if len(_key_stats) > MAX_TRACKED_KEYS:
+            _key_stats.popitem(last=False)
+    else:
+        _key_stats.move_to_end(key)
+    stats.last_seen = time.time()
+    return stats
+
+
+def get_single_flight_stats(api_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-key metrics, most coalesced first."""
+    with _lock:
+        rows = [s.snapshot() for s in _key_stats.values() if not api_name or s.api_name == api_name]
+    return sorted(rows, key=lambda r: (-r["coalesced"], r["api_name"], r["params"]))
+
+
+def single_flight(api_name: str) -> Callable:
+    """Share one execution of a query function between identical concurrent calls."""
+
+    def decorator(query_function: Callable) -> Callable:
+        @functools.wraps(query_function)
+        def wrapper(client, params):
+            normalized = normalize_params(params).decode()
+            key = f"{api_name}:{normalized}"
+            with _lock:
+                call = _in_flight.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = _in_flight[key] = _Call()
+                else:
+                    call.followers += 1
+                stats = _stats_for(key, api_name, normalized)
+                if is_leader:
+                    stats.executions += 1
+                else:
+                    stats.coalesced += 1
+                    stats.max_followers = max(stats.max_followers, call.followers)
+
+            if not is_leader:
+                call.event.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.result
+
+            try:
+                call.result = query_function(client, params)
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with _lock:
+                    _in_flight.pop(key, None)
+                call.event.set()
+
+        return wrapper
+
+    return decorator
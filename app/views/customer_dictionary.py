@@ -0,0 +1,74 @@
+import os
+
+from moose_lib import SqlResource, View
+
+from app.datamodels.shopify_customers import pipeline as shopify_customers_pipeline
+from app.datamodels.shopify_orders import pipeline as shopify_orders_pipeline
+
+# In-memory dictionary of customer attributes keyed by customer id.
+# Sourced from the deduplicated (FINAL) shopify_customers table and reloaded every 5-10 minutes,
+# so order queries can enrich rows with dictGet instead of joining the customers table.
+#
+#   dictGetOrNull('shopify_customers_dict', 'country', tuple(customer_id))
+
+CUSTOMERS_DICT = "shopify_customers_dict"
+
+# The dictionary source connects back to ClickHouse. Credentials never go into the DDL (it is
+# readable through SHOW CREATE DICTIONARY and system tables): the source takes host, user and
+# password from the server-side named collection CLICKHOUSE_DICT_SOURCE (default shopify_source,
+# shipped for the dev stack in clickhouse/named_collections.xml). The dev container replaces the
+# default user with CLICKHOUSE_USER, so a source without credentials could not log in there.
+# Setting CLICKHOUSE_DICT_SOURCE to an empty value queries the local server as the default
+# user instead, for servers that still have one (e.g. a bare `clickhouse server`).
+_db = os.getenv("CLICKHOUSE_DB", "local")
+_named_collection = os.getenv("CLICKHOUSE_DICT_SOURCE", "shopify_source")
+_source_connection = f"NAME {_named_collection} " if _named_collection else ""
+
+create_sql = (
+    f"CREATE DICTIONARY IF NOT EXISTS {CUSTOMERS_DICT} ("
+    "id String, "
+    "email Nullable(String), "
+    "city Nullable(String), "
+    "province Nullable(String), "
+    "country Nullable(String), "
+    "state Nullable(String), "
+    "verified_email Nullable(Bool), "
+    "created_at Nullable(DateTime)"
+    ") "
+    "PRIMARY KEY id "
+    "SOURCE(CLICKHOUSE("
+    f"{_source_connection}"
+    "QUERY 'SELECT id, email, city, province, country, state, verified_email, created_at "
+    f"FROM {_db}.shopify_customers FINAL' "
+    f"DB '{_db}'"
+    ")) "
+    "LIFETIME(MIN 300 MAX 600) "
+    "LAYOUT(COMPLEX_KEY_HASHED())"
+)
+
+customers_dictionary = SqlResource(
+    CUSTOMERS_DICT,
+    setup=[create_sql],
+    teardown=[f"DROP DICTIONARY IF EXISTS {CUSTOMERS_DICT}"],
+    pulls_data_from=[shopify_customers_pipeline.table],
+)
+
+
+def customer_attribute(attribute: str, key_column: str = "customer_id") -> str:
+    """SQL expression looking up a customer attribute for the row's customer id (NULL if unknown)."""
+    return f"dictGetOrNull('{CUSTOMERS_DICT}', '{attribute}', tuple(ifNull({key_column}, '')))"
+
+
+# Orders enriched with customer attributes through the dictionary (no join)
+orders_enriched_view = View(
+    "shopify_orders_enriched",
+    (
+        "SELECT *, "
+        f"{customer_attribute('country')} AS customer_country, "
+        f"{customer_attribute('province')} AS customer_province, "
+        f"{customer_attribute('state')} AS customer_state, "
+        f"{customer_attribute('verified_email')} AS customer_verified_email "
+        "FROM shopify_orders"
+    ),
+    [shopify_orders_pipeline.table, customers_dictionary],
+)
@@ -0,0 +1,40 @@
+from moose_lib import AggregateFunction
+from pydantic import BaseModel
+from typing import Annotated
+from datetime import datetime
+
+from app.datamodels.shopify_orders import pipeline as shopify_orders_pipeline
+from app.views.incremental_rollup import incremental_rollup
+
+# Customer lifetime-value rollup keyed by (customer_id, id): one row per order of a customer.
+# argMax states of the total and test flag are versioned by updated_at (see incremental_rollup.py),
+# so a re-ingested order is summed once, at its latest total. Merge per order with
+# argMaxMerge/minMerge, drop test orders, then count/sum/min/max per customer.
+
+class CustomerLifetimeValue(BaseModel):
+    customer_id: str
+    id: str
+    total_price: Annotated[float, AggregateFunction(agg_func="argMax", param_types=[float, datetime])]
+    test: Annotated[bool, AggregateFunction(agg_func="argMax", param_types=[bool, datetime])]
+    created_at: Annotated[datetime, AggregateFunction(agg_func="min", param_types=[datetime])]
+
+select_sql = (
+    "SELECT assumeNotNull(customer_id) AS customer_id, "
+    "id, "
+    # Source columns are qualified where a bare name would resolve to an alias of this SELECT
+    "argMaxState(toFloat64(ifNull(shopify_orders.total_price, 0)), ifNull(updated_at, toDateTime(0))) AS total_price, "
+    "argMaxState(ifNull(shopify_orders.test, false), ifNull(updated_at, toDateTime(0))) AS test, "
+    "minState(assumeNotNull(shopify_orders.created_at)) AS created_at "
+    "FROM shopify_orders "
+    "WHERE shopify_orders.customer_id IS NOT NULL "
+    "AND shopify_orders.created_at IS NOT NULL "
+    "GROUP BY customer_id, id"
+)
+
+customer_ltv_mv, customer_ltv_backfill = incremental_rollup(
+    "shopify_customer_ltv",
+    CustomerLifetimeValue,
+    ["customer_id", "id"],
+    select_sql,
+    shopify_orders_pipeline.table,
+)
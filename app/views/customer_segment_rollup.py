@@ -0,0 +1,43 @@
+from moose_lib import AggregateFunction
+from pydantic import BaseModel
+from typing import Annotated
+from datetime import date, datetime
+
+from app.datamodels.shopify_customers import pipeline as shopify_customers_pipeline
+from app.views.incremental_rollup import incremental_rollup
+
+# Customer segment rollup keyed by (created_day, id): one row per customer.
+# The segment columns (country/province/city/state) and verified_email are argMax states
+# versioned by updated_at (see incremental_rollup.py), so a customer who moves is counted once,
+# in their latest segment; keying on the segment instead would leave them in every segment
+# they passed through. Keeping the signup day in the key lets "new customers in the last
+# N days" be answered from the rollup as well.
+
+class CustomerSegmentRollup(BaseModel):
+    created_day: date
+    id: str
+    country: Annotated[str, AggregateFunction(agg_func="argMax", param_types=[str, datetime])]
+    province: Annotated[str, AggregateFunction(agg_func="argMax", param_types=[str, datetime])]
+    city: Annotated[str, AggregateFunction(agg_func="argMax", param_types=[str, datetime])]
+    state: Annotated[str, AggregateFunction(agg_func="argMax", param_types=[str, datetime])]
+    verified_email: Annotated[bool, AggregateFunction(agg_func="argMax", param_types=[bool, datetime])]
+
+select_sql = (
+    "SELECT toDate(ifNull(created_at, toDateTime(0))) AS created_day, "
+    "id, "
+    "argMaxState(CAST(ifNull(shopify_customers.country, '') AS String), ifNull(updated_at, toDateTime(0))) AS country, "
+    "argMaxState(CAST(ifNull(shopify_customers.province, '') AS String), ifNull(updated_at, toDateTime(0))) AS province, "
+    "argMaxState(ifNull(shopify_customers.city, ''), ifNull(updated_at, toDateTime(0))) AS city, "
+    "argMaxState(CAST(ifNull(shopify_customers.state, '') AS String), ifNull(updated_at, toDateTime(0))) AS state, "
+    "argMaxState(ifNull(shopify_customers.verified_email, false), ifNull(updated_at, toDateTime(0))) AS verified_email "
+    "FROM shopify_customers "
+    "GROUP BY created_day, id"
+)
+
+customer_segment_rollup_mv, customer_segment_rollup_backfill = incremental_rollup(
+    "shopify_customer_segments",
+    CustomerSegmentRollup,
+    ["created_day", "id"],
+    select_sql,
+    shopify_customers_pipeline.table,
+)
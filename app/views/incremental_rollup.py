@@ -0,0 +1,43 @@
+from typing import Any, List, Tuple, Type
+
+from moose_lib import ClickHouseEngines, MaterializedView, MaterializedViewOptions, SqlResource
+
+# Rollups of per-id aggregate states, kept current by insert-triggered materialized views.
+#
+# The Shopify tables are ReplacingMergeTrees: re-ingesting an order (every ingest run re-posts
+# the latest N, and the reconcile / backfill paths re-insert whole days) only collapses at merge
+# time, after an insert-triggered view has already aggregated it again. These rollups therefore
+# keep one row per source id (the id is the last sorting key column) holding argMax states
+# versioned by the source row's updated_at. A re-ingested version lands on the same key, the
+# AggregatingMergeTree merges it into the existing row and the latest version wins, so queries
+# first merge per id (argMaxMerge ... GROUP BY ..., id) and then aggregate the finalized rows.
+# Rows are a few narrow columns, there is no refresh lag, and nothing is rebuilt as history grows.
+#
+# The view only sees new inserts; the backfill re-aggregates the rows already in the source
+# table when the rollup is created. Rows seen by both collapse like any other re-ingest.
+
+
+def incremental_rollup(
+    table_name: str,
+    model: Type[Any],
+    order_by_fields: List[str],
+    select_sql: str,
+    source_table: Any,
+) -> Tuple[MaterializedView, SqlResource]:
+    """AggregatingMergeTree `table_name` fed by a view over `select_sql`, plus its one-off backfill."""
+    mv = MaterializedView[model](MaterializedViewOptions(
+        select_statement=select_sql,
+        select_tables=[source_table],
+        table_name=table_name,
+        materialized_view_name=f"{table_name}_mv",
+        engine=ClickHouseEngines.AggregatingMergeTree,
+        order_by_fields=order_by_fields,
+    ))
+    backfill = SqlResource(
+        f"{table_name}_backfill",
+        setup=[f"INSERT INTO {table_name} {select_sql}"],
+        teardown=[],
+        pulls_data_from=[source_table],
+        pushes_data_to=[mv.target_table],
+    )
+    return mv, backfill
@@ -0,0 +1,76 @@
+from moose_lib import MaterializedView, MaterializedViewOptions, View, AggregateFunction, ClickHouseEngines
+from pydantic import BaseModel
+from typing import Annotated
+from datetime import datetime
+
+from app.datamodels.shopify_inventory_levels import pipeline as shopify_inventory_levels_pipeline
+
+# Latest inventory state per (location_id, sku).
+# shopify_inventory_levels keeps one row per snapshot (updated_at is part of the key), so the
+# rollup keeps argMax states and only the newest snapshot of each SKU/location survives a merge.
+
+class InventoryLatestByLocation(BaseModel):
+    location_id: str
+    sku: str
+    location_name: Annotated[str, AggregateFunction(agg_func="argMax", param_types=[str, datetime])]
+    available: Annotated[float, AggregateFunction(agg_func="argMax", param_types=[float, datetime])]
+    tracked: Annotated[bool, AggregateFunction(agg_func="argMax", param_types=[bool, datetime])]
+    updated_at: Annotated[datetime, AggregateFunction(agg_func="max", param_types=[datetime])]
+
+select_sql = (
+    "SELECT location_id, "
+    "assumeNotNull(sku) AS sku, "
+    # updated_at is qualified throughout: bare, it would resolve to the maxState alias below
+    "argMaxState(CAST(ifNull(location_name, '') AS String), assumeNotNull(shopify_inventory_levels.updated_at)) AS location_name, "
+    "argMaxState(ifNull(available, 0), assumeNotNull(shopify_inventory_levels.updated_at)) AS available, "
+    "argMaxState(tracked, assumeNotNull(shopify_inventory_levels.updated_at)) AS tracked, "
+    "maxState(assumeNotNull(shopify_inventory_levels.updated_at)) AS updated_at "
+    "FROM shopify_inventory_levels "
+    "WHERE sku IS NOT NULL "
+    "AND shopify_inventory_levels.updated_at IS NOT NULL "
+    "GROUP BY location_id, sku"
+)
+
+inventory_latest_mv = MaterializedView[InventoryLatestByLocation](MaterializedViewOptions(
+    select_statement=select_sql,
+    select_tables=[shopify_inventory_levels_pipeline.table],
+    table_name="shopify_inventory_latest",
+    materialized_view_name="shopify_inventory_latest_mv",
+    engine=ClickHouseEngines.AggregatingMergeTree,
+    order_by_fields=["location_id", "sku"],
+))
+
+# Finalized latest level per SKU/location; the low-stock API filters this by threshold
+latest_levels_sql = (
+    "SELECT location_id, sku, "
+    "argMaxMerge(location_name) AS location_name, "
+    "argMaxMerge(available) AS available, "
+    "argMaxMerge(tracked) AS tracked, "
+    "maxMerge(updated_at) AS updated_at "
+    "FROM shopify_inventory_latest "
+    "GROUP BY location_id, sku"
+)
+
+inventory_latest_levels_view = View(
+    "shopify_inventory_latest_levels",
+    latest_levels_sql,
+    [inventory_latest_mv.target_table],
+)
+
+# Per-location totals over the latest levels
+location_totals_sql = (
+    "SELECT location_id, "
+    "any(location_name) AS location_name, "
+    "count() AS sku_count, "
+    "sum(available) AS total_available, "
+    "countIf(tracked AND available <= 0) AS out_of_stock_skus, "
+    "max(updated_at) AS updated_at "
+    "FROM shopify_inventory_latest_levels "
+    "GROUP BY location_id"
+)
+
+inventory_location_totals_view = View(
+    "shopify_inventory_location_totals",
+    location_totals_sql,
+    [inventory_latest_levels_view],
+)
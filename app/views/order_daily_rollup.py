@@ -0,0 +1,40 @@
+from moose_lib import AggregateFunction
+from pydantic import BaseModel
+from typing import Annotated
+from datetime import date, datetime
+
+from app.datamodels.shopify_orders import pipeline as shopify_orders_pipeline
+from app.views.incremental_rollup import incremental_rollup
+
+# Per-order rollup keyed by (currency, day, id).
+# Each order keeps argMax states of its total and test flag, versioned by updated_at (see
+# incremental_rollup.py), so a re-ingested order collapses into one row at its latest total.
+# Read it with argMaxMerge grouped by (currency, day, id), drop test orders, then aggregate into
+# day/week/month buckets; only the three key columns and two small states are scanned.
+
+class OrderDailyRollup(BaseModel):
+    currency: str
+    day: date
+    id: str
+    total_price: Annotated[float, AggregateFunction(agg_func="argMax", param_types=[float, datetime])]
+    test: Annotated[bool, AggregateFunction(agg_func="argMax", param_types=[bool, datetime])]
+
+select_sql = (
+    "SELECT ifNull(currency, '') AS currency, "
+    "toDate(created_at) AS day, "
+    "id, "
+    # total_price / test are qualified: bare, they would resolve to the state aliases
+    "argMaxState(toFloat64(ifNull(shopify_orders.total_price, 0)), ifNull(updated_at, toDateTime(0))) AS total_price, "
+    "argMaxState(ifNull(shopify_orders.test, false), ifNull(updated_at, toDateTime(0))) AS test "
+    "FROM shopify_orders "
+    "WHERE created_at IS NOT NULL "
+    "GROUP BY currency, day, id"
+)
+
+order_daily_rollup_mv, order_daily_rollup_backfill = incremental_rollup(
+    "shopify_orders_daily_rollup",
+    OrderDailyRollup,
+    ["currency", "day", "id"],
+    select_sql,
+    shopify_orders_pipeline.table,
+)
@@ -0,0 +1,64 @@
+from moose_lib import SqlResource
+
+from app.datamodels.shopify_orders import pipeline as shopify_orders_pipeline
+
+# Narrow, sampleable copy of shopify_orders for approximate analytics.
+# shopify_orders keeps its id-first sorting key (point lookups depend on it), so the
+# SAMPLE BY key lives on this copy instead: sample_key hashes the order id, so `SAMPLE k`
+# reads a fixed fraction of orders and order counts and totals scale back up by
+# _sample_factor. The id never changes, so a re-ingested order keeps its (sample_key, id)
+# and ReplacingMergeTree collapses it on merge (a hash of the nullable, mutable customer_id
+# would file an order whose customer changed under a second key and count it twice).
+# The materialized view only sees new inserts; the INSERT ... SELECT below backfills the
+# orders already in shopify_orders, skipping ids the view has copied in the meantime.
+
+ORDERS_SAMPLE_TABLE = "shopify_orders_sample"
+
+orders_sample = SqlResource(
+    ORDERS_SAMPLE_TABLE,
+    setup=[
+        (
+            f"CREATE TABLE IF NOT EXISTS {ORDERS_SAMPLE_TABLE} ("
+            "id String, "
+            "sample_key UInt64, "
+            "created_at DateTime CODEC(Delta, ZSTD), "
+            "currency LowCardinality(String), "
+            "total_price Float64, "
+            "customer_id Nullable(String)"
+            ") ENGINE = ReplacingMergeTree "
+            "PARTITION BY toYYYYMM(created_at) "
+            "ORDER BY (sample_key, id) "
+            "SAMPLE BY sample_key"
+        ),
+        (
+            f"CREATE MATERIALIZED VIEW IF NOT EXISTS {ORDERS_SAMPLE_TABLE}_mv TO {ORDERS_SAMPLE_TABLE} AS "
+            "SELECT id, "
+            "cityHash64(id) AS sample_key, "
+            "assumeNotNull(created_at) AS created_at, "
+            "ifNull(currency, '') AS currency, "
+            "toFloat64(ifNull(total_price, 0)) AS total_price, "
+            "customer_id "
+            "FROM shopify_orders "
+            "WHERE created_at IS NOT NULL "
+            "AND (test = false OR test IS NULL)"
+        ),
+        (
+            f"INSERT INTO {ORDERS_SAMPLE_TABLE} "
+            "SELECT id, "
+            "cityHash64(id) AS sample_key, "
+            "assumeNotNull(created_at) AS created_at, "
+            "ifNull(currency, '') AS currency, "
+            "toFloat64(ifNull(total_price, 0)) AS total_price, "
+            "customer_id "
+            "FROM shopify_orders FINAL "
+            "WHERE created_at IS NOT NULL "
+            "AND (test = false OR test IS NULL) "
+            f"AND id NOT IN (SELECT id FROM {ORDERS_SAMPLE_TABLE})"
+        ),
+    ],
+    teardown=[
+        f"DROP VIEW IF EXISTS {ORDERS_SAMPLE_TABLE}_mv",
+        f"DROP TABLE IF EXISTS {ORDERS_SAMPLE_TABLE}",
+    ],
+    pulls_data_from=[shopify_orders_pipeline.table],
+)
@@ -0,0 +1,48 @@
+from moose_lib import AggregateFunction
+from pydantic import BaseModel
+from typing import Annotated
+from datetime import date, datetime
+
+from app.datamodels.shopify_order_line_items import pipeline as shopify_order_line_items_pipeline
+from app.views.incremental_rollup import incremental_rollup
+
+# Per-line-item sales rollup keyed by (sku, day, currency, order_id, id), from
+# shopify_order_line_items. Title, quantity, total and test flag are argMax states (see
+# incremental_rollup.py); line items carry no updated_at, so the version is the insert time and
+# a re-ingested line item collapses to its most recently ingested values. Merge per line item
+# with argMaxMerge, drop test orders, then sum units/revenue and count distinct orders per SKU
+# over any date range. Line items without a SKU roll up under ''.
+
+class SkuSalesDaily(BaseModel):
+    sku: str
+    day: date
+    currency: str
+    order_id: str
+    id: str
+    title: Annotated[str, AggregateFunction(agg_func="argMax", param_types=[str, datetime])]
+    quantity: Annotated[int, AggregateFunction(agg_func="argMax", param_types=[int, datetime])]
+    discounted_total: Annotated[float, AggregateFunction(agg_func="argMax", param_types=[float, datetime])]
+    test: Annotated[bool, AggregateFunction(agg_func="argMax", param_types=[bool, datetime])]
+
+select_sql = (
+    "SELECT ifNull(sku, '') AS sku, "
+    "toDate(order_created_at) AS day, "
+    "CAST(ifNull(currency, '') AS String) AS currency, "
+    "order_id, "
+    "id, "
+    "argMaxState(ifNull(shopify_order_line_items.title, ''), now()) AS title, "
+    "argMaxState(toInt64(shopify_order_line_items.quantity), now()) AS quantity, "
+    "argMaxState(toFloat64(ifNull(shopify_order_line_items.discounted_total, 0)), now()) AS discounted_total, "
+    "argMaxState(ifNull(shopify_order_line_items.test, false), now()) AS test "
+    "FROM shopify_order_line_items "
+    "WHERE order_created_at IS NOT NULL "
+    "GROUP BY sku, day, currency, order_id, id"
+)
+
+sku_sales_rollup_mv, sku_sales_rollup_backfill = incremental_rollup(
+    "shopify_sku_sales_daily",
+    SkuSalesDaily,
+    ["sku", "day", "currency", "order_id", "id"],
+    select_sql,
+    shopify_order_line_items_pipeline.table,
+)